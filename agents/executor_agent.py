@@ -1,37 +1,184 @@
 import asyncio
-from typing import Any
+from typing import Any, Dict, Iterator, List, Optional, Set
 
+from config import settings
 from tool_manager import ToolManager
+from tracing import span
+
+
+def iter_steps(step: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """Yield nested ``substeps`` depth-first, each before its parent."""
+    for sub in step.get("substeps", []):
+        yield from iter_steps(sub)
+    yield step
+
 
 class ExecutorAgent:
-    """Agent that executes planned steps."""
+    """Agent that executes planned steps.
+
+    Steps run concurrently on up to ``max_workers`` workers. A step listing
+    step ids in ``depends_on`` starts only after those steps have finished.
+    Results are emitted in plan order regardless of completion order.
+    """
 
-    def __init__(self, tool_manager: ToolManager | None = None, llm: Any | None = None) -> None:
+    def __init__(
+        self,
+        tool_manager: ToolManager | None = None,
+        llm: Any | None = None,
+        *,
+        max_workers: Optional[int] = None,
+        step_timeout: Optional[float] = None,
+    ) -> None:
         self.tool_manager = tool_manager or ToolManager()
         self.llm = llm
+        self.max_workers = max_workers or settings.executor_workers
+        if step_timeout is None:
+            step_timeout = settings.executor_step_timeout or None
+        self.step_timeout = step_timeout
+
+    async def _call_llm(self, action: str) -> Any:
+        if not self.llm:
+            raise RuntimeError("No LLM client configured")
+        with span("executor.llm_call"):
+            llm_result = await self.llm(action)
+        if isinstance(llm_result, dict):
+            return (
+                llm_result.get("choices", [{}])[0]
+                .get("message", {})
+                .get("content", "")
+            )
+        return llm_result
 
     async def execute(self, plan_queue: asyncio.Queue, result_queue: asyncio.Queue) -> None:
         """Consume steps from ``plan_queue`` and push execution results to ``result_queue``.
 
-        A ``None`` value is pushed when execution is finished.
+        A ``None`` value is pushed when execution is finished. A step whose
+        dependency failed or timed out, whose dependencies form a cycle, or
+        whose LLM call raised is reported with an ``error`` key instead.
+
+        A worker slot is taken before each step is read from ``plan_queue``,
+        so a slow executor leaves the planner blocked on a full queue. Steps
+        waiting on dependencies give their slot back until those finish, and
+        at most ``pipeline_queue_size`` finished or waiting steps are held
+        back for in-order emission.
         """
-        while True:
-            step = await plan_queue.get()
-            if step is None:
-                await result_queue.put(None)
-                break
-
-            action = step.get("action", "")
-            if self.llm:
-                llm_result = await self.llm(action)
-                if isinstance(llm_result, dict):
-                    result = (
-                        llm_result.get("choices", [{}])[0]
-                        .get("message", {})
-                        .get("content", "")
-                    )
-                else:
-                    result = llm_result
-            else:
-                raise RuntimeError("No LLM client configured")
-            await result_queue.put({"step": step.get("step"), "result": result})
+        if not self.llm:
+            raise RuntimeError("No LLM client configured")
+        slots = asyncio.Semaphore(self.max_workers)
+        finished: Dict[Any, asyncio.Event] = {}
+        succeeded: Dict[Any, bool] = {}
+        depends: Dict[Any, List[Any]] = {}
+        cyclic: Set[Any] = set()
+        ordered: asyncio.Queue = asyncio.Queue(
+            maxsize=max(settings.pipeline_queue_size, self.max_workers)
+        )
+        tasks: Set[asyncio.Task] = set()
+
+        def event_for(step_id: Any) -> asyncio.Event:
+            return finished.setdefault(step_id, asyncio.Event())
+
+        def register(step: Dict[str, Any]) -> None:
+            step_id = step.get("step")
+            depends[step_id] = list(step.get("depends_on", []))
+            ahead = _reachable(depends, step_id)
+            if step_id in ahead:
+                cyclic.add(step_id)
+                cyclic.update(n for n in ahead if step_id in _reachable(depends, n))
+
+        def fail_unknown() -> None:
+            # Dependencies that never appeared in the plan can't be satisfied.
+            for step_id, event in list(finished.items()):
+                if step_id not in depends:
+                    succeeded[step_id] = False
+                    event.set()
+
+        async def run_step(step: Dict[str, Any]) -> Dict[str, Any]:
+            # Entered holding a worker slot taken by the reader loop.
+            step_id = step.get("step")
+            ok = False
+            holding = True
+            try:
+                with span("executor.step", step=step_id):
+                    deps = depends.get(step_id, [])
+                    if deps and step_id not in cyclic:
+                        slots.release()
+                        holding = False
+                        with span("executor.wait_dependencies", count=len(deps)):
+                            for dep in deps:
+                                await event_for(dep).wait()
+                                if step_id in cyclic:
+                                    break
+                                if not succeeded.get(dep):
+                                    return {"step": step_id, "error": f"dependency {dep} failed"}
+                    if step_id in cyclic:
+                        return {"step": step_id, "error": "dependency cycle"}
+                    if not holding:
+                        with span("executor.wait_worker"):
+                            await slots.acquire()
+                        holding = True
+                    try:
+                        result = await asyncio.wait_for(
+                            self._call_llm(step.get("action", "")), self.step_timeout
+                        )
+                    except asyncio.TimeoutError:
+                        return {"step": step_id, "error": "timeout"}
+                    except Exception as exc:
+                        return {"step": step_id, "error": str(exc)}
+                    ok = True
+                    return {"step": step_id, "result": result}
+            finally:
+                if holding:
+                    slots.release()
+                succeeded[step_id] = ok
+                event_for(step_id).set()
+
+        async def emit() -> None:
+            while True:
+                task = await ordered.get()
+                if task is None:
+                    break
+                await result_queue.put(await task)
+            await result_queue.put(None)
+
+        emitter = asyncio.create_task(emit())
+        try:
+            while True:
+                with span("executor.queue_wait"):
+                    await slots.acquire()
+                    step = await plan_queue.get()
+                if step is None:
+                    slots.release()
+                    break
+                for n, item in enumerate(iter_steps(step)):
+                    if n:
+                        await slots.acquire()
+                    register(item)
+                    task = asyncio.create_task(run_step(item))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+                    if ordered.full():
+                        # The emitter may be stuck behind a step waiting on one
+                        # we can no longer read in time; fail those waits.
+                        fail_unknown()
+                    await ordered.put(task)
+            fail_unknown()
+            await ordered.put(None)
+            await emitter
+        finally:
+            for task in list(tasks) + [emitter]:
+                if not task.done():
+                    task.cancel()
+                elif not task.cancelled():
+                    task.exception()
+
+
+def _reachable(graph: Dict[Any, List[Any]], start: Any) -> Set[Any]:
+    """Return every node reachable from ``start`` along ``graph`` edges."""
+    seen: Set[Any] = set()
+    stack = list(graph.get(start, ()))
+    while stack:
+        node = stack.pop()
+        if node not in seen:
+            seen.add(node)
+            stack.extend(graph.get(node, ()))
+    return seen
@@ -1,5 +1,6 @@
 import asyncio
 from planner import Planner
+from tracing import span
 
 class PlannerAgent:
     """Agent responsible for generating a task plan."""
@@ -12,7 +13,9 @@ class PlannerAgent:
 
         A ``None`` value is placed onto the queue when planning is complete.
         """
-        steps = self.planner.create_plan(query)
+        with span("planner.plan"):
+            steps = self.planner.create_plan(query)
         for step in steps:
-            await queue.put(step)
+            with span("planner.queue_put", step=step.get("step")):
+                await queue.put(step)
         await queue.put(None)
@@ -1,9 +1,11 @@
 
 """FastAPI interface for Cappuccino agent and Realtime utilities."""
 
-from typing import Any, AsyncGenerator, Dict, List
+from typing import Any, AsyncGenerator, Dict, List, Optional
 import asyncio
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+import time
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Response, WebSocket, WebSocketDisconnect
 from pydantic import BaseModel
 import os
 from types import SimpleNamespace
@@ -14,6 +16,8 @@ from state_manager import StateManager
 from goal_manager import GoalManager
 from tool_manager import ToolManager
 from cappuccino_agent import CappuccinoAgent
+from metrics import Counter, Gauge, LoopLagMonitor, registry
+from tracing import to_chrome_trace, tracer
 
 load_dotenv()
 llm = OllamaLLM(os.getenv("OLLAMA_MODEL", "llama3"))
@@ -40,7 +44,82 @@ async def stream_events(query: str) -> AsyncGenerator[str, None]:
 
 tool_manager = ToolManager(db_path=":memory:")
 agent = CappuccinoAgent(model=os.getenv("OLLAMA_MODEL", "llama3"), tool_manager=tool_manager)
-app = FastAPI()
+
+
+HTTP_REQUESTS = registry.counter(
+    "cappuccino_http_requests_total", "HTTP requests served.", ["method", "route", "status"]
+)
+HTTP_SECONDS = registry.histogram(
+    "cappuccino_http_request_seconds", "HTTP request latency.", ["method", "route"]
+)
+loop_lag = LoopLagMonitor(
+    registry.histogram("cappuccino_event_loop_lag_seconds", "Event loop scheduling delay."),
+    registry.gauge("cappuccino_event_loop_lag_last_seconds", "Most recent event loop delay."),
+)
+
+
+class MetricsMiddleware:
+    """ASGI middleware counting HTTP requests per route template and status."""
+
+    def __init__(self, app: Any) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message: Dict[str, Any]) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = getattr(scope.get("route"), "path", "unmatched")
+            HTTP_SECONDS.observe(time.perf_counter() - start, scope["method"], route)
+            HTTP_REQUESTS.inc(scope["method"], route, status)
+
+
+def _collect_runtime_metrics() -> List[Any]:
+    """Read cache counters and pipeline queue depths at scrape time."""
+    cache = Counter("cappuccino_cache_lookups_total", "Result cache lookups.", ["namespace", "result"])
+    ratio = Gauge("cappuccino_cache_hit_ratio", "Share of cache lookups served from either tier.", ["namespace"])
+    for namespace, counts in tool_manager.cache_stats()["namespaces"].items():
+        for field, value in counts.items():
+            cache.inc(namespace or "default", field, amount=value)
+        total = sum(counts.values())
+        if total:
+            hits = counts.get("memory_hits", 0) + counts.get("disk_hits", 0)
+            ratio.set(hits / total, namespace or "default")
+    depth = Gauge("cappuccino_pipeline_queue_depth", "Items waiting between pipeline stages.", ["queue"])
+    stats = agent.pipeline_stats()
+    depth.set(stats["plan_queue"], "plan")
+    depth.set(stats["result_queue"], "result")
+    runs = Gauge("cappuccino_pipeline_runs", "Agent pipelines currently running.")
+    runs.set(stats["runs"])
+    return [cache, ratio, depth, runs]
+
+
+registry.add_collector(_collect_runtime_metrics)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
+    """Warm up media models and start the loop-lag probe; flush tool state on shutdown."""
+    await tool_manager.warm_up_models()
+    loop_lag.start()
+    yield
+    await loop_lag.stop()
+    await tool_manager.close()
+
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(MetricsMiddleware)
 
 state_manager = StateManager()
 planner = Planner()
@@ -49,6 +128,8 @@ goal_manager = GoalManager(state_manager, {"interests": ["python"]})
 
 class RunRequest(BaseModel):
     query: str
+    deadline: Optional[float] = None
+    trace: bool = False
 
 
 class RunResponse(BaseModel):
@@ -85,8 +166,41 @@ class RealtimeSessionParams(BaseModel):
 
 
 @app.post("/agent/run", response_model=RunResponse)
-async def run_agent(request: RunRequest) -> Dict[str, List[str]]:
-    return await call_openai(request.query)
+async def run_agent(request: RunRequest, response: Response) -> Dict[str, List[str]]:
+    with tracer.trace("api.agent_run", force=request.trace) as trace:
+        if trace is not None:
+            response.headers["X-Trace-Id"] = trace.trace_id
+        try:
+            return await asyncio.wait_for(call_openai(request.query), request.deadline)
+        except asyncio.TimeoutError:
+            raise HTTPException(status_code=504, detail="deadline exceeded")
+
+
+@app.get("/metrics")
+async def metrics() -> Response:
+    """Expose collected metrics in the Prometheus text format."""
+    return Response(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@app.get("/traces")
+async def list_traces() -> Dict[str, Any]:
+    """Summarise the most recent sampled traces, newest first."""
+    return {"sample_rate": tracer.sample_rate, "traces": tracer.summaries()}
+
+
+@app.get("/traces/chrome")
+async def export_traces() -> Dict[str, Any]:
+    """Export every buffered trace as Chrome trace-event JSON."""
+    return to_chrome_trace(tracer.traces)
+
+
+@app.get("/traces/{trace_id}")
+async def get_trace(trace_id: str) -> Dict[str, Any]:
+    """Export one trace as Chrome trace-event JSON."""
+    trace = tracer.get(trace_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail="trace not found")
+    return to_chrome_trace([trace])
 
 
 @app.get("/agent/status")
@@ -157,13 +271,37 @@ async def realtime_session(params: RealtimeSessionParams = RealtimeSessionParams
         return {"error": str(exc)}
 
 
+async def _forward_until_disconnect(
+    websocket: WebSocket, chunks: AsyncGenerator[str, None]
+) -> None:
+    """Send ``chunks`` to ``websocket``, cancelling the producer on disconnect."""
+
+    async def forward() -> None:
+        async for chunk in chunks:
+            await websocket.send_text(chunk)
+
+    async def watch() -> None:
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+
+    tasks = [asyncio.create_task(forward()), asyncio.create_task(watch())]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        if tasks[0] in done:
+            tasks[0].result()
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await chunks.aclose()
+
+
 @app.websocket("/agent/stream")
 async def agent_stream(websocket: WebSocket) -> None:
     await websocket.accept()
     try:
         query = await websocket.receive_text()
-        async for chunk in agent.stream_responses(query):
-            await websocket.send_text(chunk)
+        await _forward_until_disconnect(websocket, agent.stream_responses(query))
     except WebSocketDisconnect:
         pass
 
@@ -174,8 +312,6 @@ async def agent_events(websocket: WebSocket) -> None:
     try:
         data = await websocket.receive_json()
         query = data.get("query", "")
-        async for chunk in agent.stream_events(query):
-            await websocket.send_text(chunk)
+        await _forward_until_disconnect(websocket, agent.stream_events(query))
     except WebSocketDisconnect:
         pass
-
@@ -0,0 +1,126 @@
+"""Silence-based chunking and per-chunk transcription for long WAV recordings."""
+
+import io
+import wave
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+_WORKER_MODEL: Any = None
+
+
+def _rms(frames: bytes, sampwidth: int, channels: int) -> float:
+    """Return the RMS level of PCM ``frames`` normalized to ``[0, 1]``."""
+    if sampwidth == 1:
+        data = np.frombuffer(frames, dtype=np.uint8).astype(np.float32) - 128.0
+        scale = 128.0
+    else:
+        dtype = {2: np.int16, 4: np.int32}[sampwidth]
+        data = np.frombuffer(frames, dtype=dtype).astype(np.float32)
+        scale = float(2 ** (8 * sampwidth - 1))
+    if channels > 1:
+        data = data[: len(data) // channels * channels].reshape(-1, channels).mean(axis=1)
+    if not len(data):
+        return 0.0
+    return float(np.sqrt(np.mean(np.square(data)))) / scale
+
+
+def wav_chunks(
+    path: str,
+    *,
+    min_chunk: float = 10.0,
+    max_chunk: float = 30.0,
+    window: float = 0.03,
+    silence_threshold: float = 0.01,
+) -> List[Tuple[int, int]]:
+    """Split a WAV file into ``(start_frame, frame_count)`` chunks.
+
+    A chunk ends at the first silent window after ``min_chunk`` seconds, or
+    at ``max_chunk`` seconds if no silence is found. The file is scanned one
+    window at a time so memory stays constant regardless of its length.
+    """
+    chunks: List[Tuple[int, int]] = []
+    with wave.open(path, "rb") as wav:
+        rate = wav.getframerate()
+        sampwidth = wav.getsampwidth()
+        channels = wav.getnchannels()
+        total = wav.getnframes()
+        step = max(1, int(rate * window))
+        min_frames = int(rate * min_chunk)
+        max_frames = int(rate * max_chunk)
+        start = pos = 0
+        while pos < total:
+            frames = wav.readframes(step)
+            if not frames:
+                break
+            pos += len(frames) // (sampwidth * channels)
+            length = pos - start
+            silent = _rms(frames, sampwidth, channels) < silence_threshold
+            if (length >= min_frames and silent) or length >= max_frames:
+                chunks.append((start, length))
+                start = pos
+        if pos > start:
+            chunks.append((start, pos - start))
+    return chunks
+
+
+def wav_duration(path: str) -> float:
+    """Return the length of a WAV file in seconds."""
+    with wave.open(path, "rb") as wav:
+        return wav.getnframes() / float(wav.getframerate())
+
+
+def read_wav_range(path: str, start: int, count: int) -> io.BytesIO:
+    """Return frames ``[start, start + count)`` as an in-memory WAV file."""
+    with wave.open(path, "rb") as src:
+        params = src.getparams()
+        src.setpos(start)
+        frames = src.readframes(count)
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as dst:
+        dst.setparams(params)
+        dst.writeframes(frames)
+    buf.seek(0)
+    return buf
+
+
+def transcribe_wav_chunk(path: str, start: int, count: int, model_size: str = "tiny") -> List[Dict[str, Any]]:
+    """Transcribe one chunk with Whisper, returning segments timed from file start.
+
+    Runs inside process-pool workers; each worker loads its own model once
+    and keeps it for the life of the process, so the pool running this
+    should be sized to the memory those copies may take.
+    """
+    global _WORKER_MODEL
+    if _WORKER_MODEL is None:
+        from faster_whisper import WhisperModel
+
+        _WORKER_MODEL = WhisperModel(model_size, device="cpu", compute_type="int8")
+    with wave.open(path, "rb") as wav:
+        offset = start / float(wav.getframerate())
+    segments, _ = _WORKER_MODEL.transcribe(read_wav_range(path, start, count))
+    return [
+        {"start": offset + seg.start, "end": offset + seg.end, "text": seg.text}
+        for seg in segments
+    ]
+
+
+def recognize_wav_chunk(path: str, start: int = 0, count: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Transcribe a chunk, or the whole file when ``count`` is ``None``, with Sphinx."""
+    import speech_recognition as sr
+
+    offset = end = None
+    recognizer = sr.Recognizer()
+    with sr.AudioFile(path) as source:
+        if count is None:
+            audio = recognizer.record(source)
+        else:
+            with wave.open(path, "rb") as wav:
+                rate = float(wav.getframerate())
+            offset, end = start / rate, (start + count) / rate
+            audio = recognizer.record(source, offset=offset, duration=end - offset)
+    try:
+        text = recognizer.recognize_sphinx(audio)
+    except Exception:
+        return [{"start": offset, "end": end, "error": "recognition failed"}]
+    return [{"start": offset, "end": end, "text": text}]
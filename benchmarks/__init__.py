@@ -0,0 +1,10 @@
+"""Performance benchmarks for Cappuccino driven by a deterministic fake LLM.
+
+Run ``python -m benchmarks --help`` for options.
+"""
+
+from benchmarks.fake_llm import FakeLLM
+from benchmarks.harness import compare, load_results, measure, save_results
+from benchmarks.scenarios import SCENARIOS, BenchConfig
+
+__all__ = ["FakeLLM", "BenchConfig", "SCENARIOS", "measure", "compare", "load_results", "save_results"]
@@ -0,0 +1,94 @@
+"""Command line entry point: ``python -m benchmarks``."""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+from dataclasses import asdict
+from typing import Any, Dict, List, Optional
+
+from benchmarks.harness import (
+    compare,
+    config_mismatches,
+    format_table,
+    load_config,
+    load_results,
+    save_results,
+)
+from benchmarks.scenarios import SCENARIOS, BenchConfig
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run Cappuccino performance benchmarks.")
+    parser.add_argument("--only", nargs="+", choices=sorted(SCENARIOS), help="scenarios to run (default: all)")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.0, help="fake LLM seconds to first token")
+    parser.add_argument("--token-rate", type=float, default=0.0, help="fake LLM tokens per second (0: instant)")
+    parser.add_argument("--tokens", type=int, default=16, help="fake LLM tokens per reply")
+    parser.add_argument("--output", help="write this run's results as JSON")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline JSON to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="relative slowdown flagged as a regression")
+    return parser.parse_args(argv)
+
+
+async def run(cfg: BenchConfig, names: List[str]) -> List[Dict[str, Any]]:
+    results: List[Dict[str, Any]] = []
+    for name in names:
+        results.extend(await SCENARIOS[name](cfg))
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    names = args.only or list(SCENARIOS)
+    with tempfile.TemporaryDirectory(prefix="cappuccino-bench-") as workdir:
+        cfg = BenchConfig(
+            workdir=workdir,
+            iterations=args.iterations,
+            concurrency=args.concurrency,
+            warmup=args.warmup,
+            latency=args.latency,
+            tokens_per_second=args.token_rate,
+            tokens=args.tokens,
+        )
+        results = asyncio.run(run(cfg, names))
+    config = {k: v for k, v in asdict(cfg).items() if k != "workdir"}
+    print(format_table(results))
+
+    if args.output:
+        save_results(args.output, results, config)
+    status = 0
+    if args.save_baseline:
+        save_results(args.baseline, results, config)
+        print(f"baseline written to {args.baseline}")
+    elif os.path.exists(args.baseline):
+        mismatches = config_mismatches(load_config(args.baseline), config)
+        if mismatches:
+            print(
+                f"baseline {args.baseline} was recorded with different settings"
+                f" ({', '.join(mismatches)}); rerun with matching options or --save-baseline",
+                file=sys.stderr,
+            )
+            return 2
+        regressions = compare(results, load_results(args.baseline), args.tolerance)
+        for r in regressions:
+            print(
+                f"REGRESSION {r['name']} {r['metric']}: {r['baseline']:.6g} -> {r['current']:.6g}"
+                f" ({r['change']:+.0%})",
+                file=sys.stderr,
+            )
+        if regressions:
+            status = 1
+        else:
+            print(f"no regressions beyond {args.tolerance:.0%} against {args.baseline}")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,54 @@
+"""Deterministic stand-in for the Ollama client used by the benchmarks."""
+
+import asyncio
+import hashlib
+from typing import AsyncIterator, List
+
+_WORDS = (
+    "espresso latte crema roast grind brew steam milk foam bean cup aroma "
+    "origin blend shot pour filter body acidity sweet finish"
+).split()
+
+
+class FakeLLM:
+    """Async LLM whose reply depends only on the prompt.
+
+    ``latency`` seconds pass before the first token and every further token
+    takes ``1 / tokens_per_second`` seconds, so a full reply of ``tokens``
+    tokens costs ``latency + (tokens - 1) / tokens_per_second``. A rate of
+    zero streams all tokens at once. It can be called like ``OllamaLLM``
+    (``await llm(prompt)``) or streamed with :meth:`stream`.
+    """
+
+    def __init__(
+        self,
+        *,
+        latency: float = 0.0,
+        tokens_per_second: float = 0.0,
+        tokens: int = 16,
+        model: str = "fake",
+    ) -> None:
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.tokens = tokens
+        self.model = model
+        self.calls = 0
+
+    def reply_tokens(self, prompt: str) -> List[str]:
+        seed = hashlib.sha256(prompt.encode("utf-8")).digest()
+        return [
+            _WORDS[seed[i % len(seed)] % len(_WORDS)] + ("" if i == self.tokens - 1 else " ")
+            for i in range(self.tokens)
+        ]
+
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        self.calls += 1
+        gap = 1.0 / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+        for i, token in enumerate(self.reply_tokens(prompt)):
+            delay = self.latency if i == 0 else gap
+            if delay:
+                await asyncio.sleep(delay)
+            yield token
+
+    async def __call__(self, prompt: str) -> str:
+        return "".join([token async for token in self.stream(prompt)])
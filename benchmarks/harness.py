@@ -0,0 +1,153 @@
+"""Timing, memory measurement and baseline comparison for benchmark scenarios."""
+
+import asyncio
+import gc
+import json
+import platform
+import time
+import tracemalloc
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+Operation = Callable[[int], Awaitable[Any]]
+
+# (metric, True when larger is better)
+COMPARED_METRICS = (("throughput", True), ("p50", False), ("p99", False), ("peak_kib", False))
+# Run settings that change what is measured; a baseline is only comparable if they match.
+COMPARED_CONFIG = ("iterations", "concurrency", "latency", "tokens_per_second", "tokens")
+
+
+def percentile(samples: List[float], q: float) -> float:
+    """Return the ``q`` percentile of ``samples`` by linear interpolation."""
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    pos = (len(ordered) - 1) * q
+    low = int(pos)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (pos - low)
+
+
+async def _drive(op: Operation, iterations: int, concurrency: int, latencies: Optional[List[float]]) -> None:
+    counter = iter(range(iterations))
+
+    async def worker() -> None:
+        for i in counter:
+            start = time.perf_counter()
+            await op(i)
+            if latencies is not None:
+                latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+
+
+async def measure(
+    name: str,
+    op: Operation,
+    *,
+    iterations: int = 200,
+    concurrency: int = 1,
+    warmup: int = 10,
+    memory_iterations: int = 20,
+) -> Dict[str, Any]:
+    """Run ``op(i)`` ``iterations`` times on ``concurrency`` workers and summarise it.
+
+    Timing runs without tracemalloc, whose hooks would distort latencies;
+    ``peak_kib`` comes from a separate, shorter pass with tracing enabled.
+    """
+    await _drive(op, warmup, concurrency, None)
+    gc.collect()
+    latencies: List[float] = []
+    start = time.perf_counter()
+    await _drive(op, iterations, concurrency, latencies)
+    elapsed = time.perf_counter() - start
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        await _drive(op, min(iterations, memory_iterations), concurrency, None)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "name": name,
+        "iterations": iterations,
+        "concurrency": concurrency,
+        "seconds": elapsed,
+        "throughput": iterations / elapsed if elapsed else 0.0,
+        "p50": percentile(latencies, 0.5),
+        "p99": percentile(latencies, 0.99),
+        "mean": sum(latencies) / len(latencies) if latencies else 0.0,
+        "peak_kib": peak / 1024,
+    }
+
+
+def environment() -> Dict[str, str]:
+    return {"python": platform.python_version(), "machine": platform.machine(), "system": platform.system()}
+
+
+def save_results(path: str, results: List[Dict[str, Any]], config: Dict[str, Any]) -> None:
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump(
+            {"created": time.time(), "environment": environment(), "config": config, "results": results},
+            fh,
+            indent=2,
+        )
+
+
+def load_results(path: str) -> Dict[str, Dict[str, Any]]:
+    """Return a saved run's results keyed by benchmark name."""
+    with open(path, encoding="utf-8") as fh:
+        data = json.load(fh)
+    return {r["name"]: r for r in data.get("results", [])}
+
+
+def load_config(path: str) -> Dict[str, Any]:
+    """Return the benchmark config a saved run was recorded with."""
+    with open(path, encoding="utf-8") as fh:
+        return json.load(fh).get("config", {})
+
+
+def config_mismatches(saved: Dict[str, Any], current: Dict[str, Any]) -> List[str]:
+    """Return ``"field saved -> current"`` for each compared config field that differs."""
+    return [
+        f"{key} {saved.get(key)!r} -> {current.get(key)!r}"
+        for key in COMPARED_CONFIG
+        if saved.get(key) != current.get(key)
+    ]
+
+
+def compare(
+    results: List[Dict[str, Any]], baseline: Dict[str, Dict[str, Any]], tolerance: float = 0.25
+) -> List[Dict[str, Any]]:
+    """Return one entry per metric that is worse than the baseline by more than ``tolerance``.
+
+    ``tolerance`` is relative: 0.25 flags a p50 25% slower or a throughput
+    25% lower than the baseline. Benchmarks missing from the baseline are
+    skipped.
+    """
+    regressions = []
+    for result in results:
+        base = baseline.get(result["name"])
+        if base is None:
+            continue
+        for metric, higher_is_better in COMPARED_METRICS:
+            old, new = base.get(metric), result.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            if (higher_is_better and change < -tolerance) or (not higher_is_better and change > tolerance):
+                regressions.append(
+                    {"name": result["name"], "metric": metric, "baseline": old, "current": new, "change": change}
+                )
+    return regressions
+
+
+def format_table(results: List[Dict[str, Any]]) -> str:
+    lines = [f"{'benchmark':<28}{'ops/s':>12}{'p50 ms':>10}{'p99 ms':>10}{'peak KiB':>11}"]
+    for r in results:
+        lines.append(
+            f"{r['name']:<28}{r['throughput']:>12.1f}{r['p50'] * 1000:>10.3f}"
+            f"{r['p99'] * 1000:>10.3f}{r['peak_kib']:>11.1f}"
+        )
+    return "\n".join(lines)
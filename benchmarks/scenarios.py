@@ -0,0 +1,158 @@
+"""Benchmark scenarios covering the agent, persistence, caches, graph and API."""
+
+import os
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List
+
+from benchmarks.fake_llm import FakeLLM
+from benchmarks.harness import measure
+
+
+@dataclass
+class BenchConfig:
+    workdir: str
+    iterations: int = 200
+    concurrency: int = 1
+    warmup: int = 10
+    latency: float = 0.0
+    tokens_per_second: float = 0.0
+    tokens: int = 16
+
+    def llm(self) -> FakeLLM:
+        return FakeLLM(latency=self.latency, tokens_per_second=self.tokens_per_second, tokens=self.tokens)
+
+    def measure(self, name: str, op: Callable[[int], Awaitable[Any]], **overrides: Any):
+        options = {"iterations": self.iterations, "concurrency": self.concurrency, "warmup": self.warmup}
+        options.update(overrides)
+        return measure(name, op, **options)
+
+    def db(self, name: str) -> str:
+        return os.path.join(self.workdir, name)
+
+
+async def bench_agent(cfg: BenchConfig) -> List[Dict[str, Any]]:
+    """``CappuccinoAgent.run`` end to end, plus cold and cached ``call_llm``."""
+    from cappuccino_agent import CappuccinoAgent
+    from tool_manager import ToolManager
+
+    path = cfg.db("agent.db")
+    agent = CappuccinoAgent(llm=cfg.llm(), tool_manager=ToolManager(db_path=path), db_path=path)
+    try:
+        results = [
+            await cfg.measure("agent_run", lambda i: agent.run(f"look up bean {i}. then brew cup {i}")),
+            await cfg.measure("agent_call_llm", lambda i: agent.call_llm(f"describe roast {i}")),
+        ]
+        await agent.call_llm("describe the house blend")
+        results.append(
+            await cfg.measure("agent_call_llm_cached", lambda i: agent.call_llm("describe the house blend"))
+        )
+        return results
+    finally:
+        await agent.close()
+
+
+async def bench_state(cfg: BenchConfig) -> List[Dict[str, Any]]:
+    """``StateManager.save`` and ``load`` with a growing conversation."""
+    from state_manager import StateManager
+
+    manager = StateManager(cfg.db("state.db"))
+    plan = [{"step": n, "action": f"step {n}"} for n in range(10)]
+    history: List[Dict[str, Any]] = []
+
+    async def save(i: int) -> None:
+        history.append({"role": "user" if i % 2 else "assistant", "content": f"message {i} " * 8})
+        await manager.save(plan, history, i % 10)
+
+    try:
+        return [
+            await cfg.measure("state_save", save),
+            await cfg.measure("state_load", lambda i: manager.load()),
+        ]
+    finally:
+        await manager.close()
+
+
+async def bench_cache(cfg: BenchConfig) -> List[Dict[str, Any]]:
+    """ToolManager result cache writes, memory hits and SQLite hits."""
+    from tool_manager import ToolManager
+
+    tm = ToolManager(db_path=cfg.db("cache.db"))
+    value = "x" * 512
+    try:
+        results = [
+            await cfg.measure("cache_set", lambda i: tm.set_cached_result(f"bench:{i}", value)),
+            await cfg.measure("cache_get_memory", lambda i: tm.get_cached_result(f"bench:{i % 100}")),
+        ]
+
+        async def disk_get(i: int) -> Any:
+            tm.cache.memory.clear()
+            return await tm.get_cached_result(f"bench:{i % 100}")
+
+        results.append(await cfg.measure("cache_get_disk", disk_get))
+        return results
+    finally:
+        await tm.close()
+
+
+async def bench_graph(cfg: BenchConfig) -> List[Dict[str, Any]]:
+    """In-memory KnowledgeGraph updates and queries, and SQLite-backed edges."""
+    from knowledge_graph import KnowledgeGraph
+    from state_manager import StateManager
+
+    graph = KnowledgeGraph()
+
+    async def update_and_query(i: int) -> None:
+        graph.add_entity(f"bean{i}", origin=f"farm{i % 7}")
+        graph.add_relation(f"bean{i}", f"farm{i % 7}", "grown_at")
+        graph.query(f"bean{i}")
+        graph.edges_by_relation("grown_at")
+
+    manager = StateManager(cfg.db("graph.db"))
+
+    async def persist_and_find(i: int) -> None:
+        await manager.upsert_graph_edge(f"bean{i}", f"farm{i % 7}", "grown_at", {"year": 2024})
+        await manager.find_graph_edges(target=f"farm{i % 7}", limit=20)
+
+    try:
+        return [
+            await cfg.measure("graph_update_query", update_and_query),
+            await cfg.measure("graph_persist_find", persist_and_find),
+        ]
+    finally:
+        await manager.close()
+
+
+async def bench_api(cfg: BenchConfig) -> List[Dict[str, Any]]:
+    """FastAPI ``/agent/run`` and ``/metrics`` through an in-process ASGI transport."""
+    import httpx
+
+    import api
+
+    original = api.llm
+    api.llm = cfg.llm()
+    transport = httpx.ASGITransport(app=api.app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+
+            async def run(i: int) -> None:
+                resp = await client.post("/agent/run", json={"query": f"brew {i}"})
+                resp.raise_for_status()
+
+            async def scrape(i: int) -> None:
+                (await client.get("/metrics")).raise_for_status()
+
+            return [
+                await cfg.measure("api_agent_run", run),
+                await cfg.measure("api_metrics", scrape),
+            ]
+    finally:
+        api.llm = original
+
+
+SCENARIOS: Dict[str, Callable[[BenchConfig], Awaitable[List[Dict[str, Any]]]]] = {
+    "agent": bench_agent,
+    "state": bench_state,
+    "cache": bench_cache,
+    "graph": bench_graph,
+    "api": bench_api,
+}
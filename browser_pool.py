@@ -0,0 +1,61 @@
+"""One shared headless Chromium handing out isolated contexts per browsing session."""
+
+import asyncio
+import logging
+from typing import Any, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+WAIT_UNTIL = ("commit", "domcontentloaded", "load", "networkidle")
+
+
+class BrowserPool:
+    """Launch Playwright and Chromium once and create contexts on demand.
+
+    Contexts created here abort requests whose resource type is listed in
+    ``block_resources`` (for example images, fonts and media), which most
+    text-oriented browsing does not need.
+    """
+
+    def __init__(self, block_resources: Iterable[str] = ()) -> None:
+        self.block_resources = frozenset(block_resources)
+        self.blocked = 0
+        self._playwright: Any = None
+        self._browser: Any = None
+        self._lock = asyncio.Lock()
+
+    async def browser(self) -> Any:
+        async with self._lock:
+            if self._browser is None:
+                from playwright.async_api import async_playwright
+
+                self._playwright = await async_playwright().start()
+                self._browser = await self._playwright.chromium.launch(headless=True)
+        return self._browser
+
+    async def _route(self, route: Any) -> None:
+        if route.request.resource_type in self.block_resources:
+            self.blocked += 1
+            await route.abort()
+        else:
+            await route.continue_()
+
+    async def new_context(self) -> Any:
+        browser = await self.browser()
+        context = await browser.new_context()
+        if self.block_resources:
+            await context.route("**/*", self._route)
+        return context
+
+    async def close(self) -> None:
+        browser, self._browser = self._browser, None
+        playwright, self._playwright = self._playwright, None
+        if browser is not None:
+            await browser.close()
+        if playwright is not None:
+            await playwright.stop()
+
+
+def parse_resource_types(value: Optional[str]) -> frozenset:
+    """Parse a comma separated list such as ``"image,font,media"``."""
+    return frozenset(t.strip() for t in (value or "").split(",") if t.strip())
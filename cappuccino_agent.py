@@ -6,12 +6,16 @@ import logging
 from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 from typing import Any, Dict, List, Optional, AsyncGenerator
 
+from config import settings
+from llm_cache import llm_cache_key
 from ollama_client import OllamaLLM
 
 from tool_manager import ToolManager
 from state_manager import StateManager
 from self_improver import SelfImprover
+from single_flight import SingleFlight
 from agents import PlannerAgent, ExecutorAgent, AnalyzerAgent
+from tracing import span, tracer
 
 
 
@@ -45,6 +49,8 @@ class CappuccinoAgent:
         self.messages: List[Dict[str, Any]] = []
         self.task_plan: List[Dict[str, Any]] = []
         self.current_phase_id = 0
+        self.single_flight = SingleFlight()
+        self._pipelines: List[tuple[asyncio.Queue, asyncio.Queue]] = []
         self.thread_executor = (
             ThreadPoolExecutor(max_workers=thread_workers)
             if thread_workers is not None
@@ -55,7 +61,13 @@ class CappuccinoAgent:
             if process_workers is not None
             else None
         )
-        self.state_manager = StateManager(db_path or "agent_state.db")
+        state_path = db_path or "agent_state.db"
+        # Share the tool manager's connection when both use the same file so
+        # history writes join its group commits instead of waiting on them.
+        shared = getattr(self.tool_manager, "database", None)
+        if getattr(self.tool_manager, "db_path", None) != state_path:
+            shared = None
+        self.state_manager = StateManager(state_path, shared=shared)
         self.self_improver = SelfImprover(self.state_manager, self.tool_manager, model)
         self._initialize_system_prompt()
 
@@ -99,15 +111,15 @@ class CappuccinoAgent:
 
     async def set_task_plan(self, plan: List[Dict[str, Any]]) -> None:
         self.task_plan = plan
-        await self.state_manager.save(self.task_plan, self.messages, self.current_phase_id)
+        await self.state_manager.save_task_plan(self.task_plan)
 
     async def add_message(self, role: str, content: str) -> None:
         await self._add_message(role, content)
-        await self.state_manager.save(self.task_plan, self.messages, self.current_phase_id)
+        await self.state_manager.save_history(self.messages)
 
     async def advance_phase(self) -> None:
         self.current_phase_id += 1
-        await self.state_manager.save(self.task_plan, self.messages, self.current_phase_id)
+        await self.state_manager.save_phase(self.current_phase_id)
         if self.self_improver:
             try:
                 await self.self_improver.improve()
@@ -138,33 +150,67 @@ class CappuccinoAgent:
         )
         return await loop.run_in_executor(executor, lambda: func(*args, **kwargs))
 
-    async def call_llm(self, prompt: str) -> str:
-        """Call the LLM with emotion context and cache the result."""
-        cache_key = f"llm:{prompt}"
-        cached = await self.get_cached_result(cache_key)
+    async def _prepare_llm_prompt(self, prompt: str, temperature: float = 0) -> tuple[str, str]:
+        """Return the cache key and sentiment-annotated prompt for ``prompt``.
+
+        Sentiment analysis runs in the thread executor unless the prompt's
+        sentiment is already memoised.
+        """
+        from emotion_recognizer import cached_emotion, detect_emotion
+
+        emotion = cached_emotion(prompt)
+        if emotion is None:
+            emotion = await self._run_sync(detect_emotion, prompt)
+        cache_key = llm_cache_key(
+            [{"role": "user", "content": prompt}],
+            model=getattr(self.client, "model", None),
+            temperature=temperature,
+            sentiment=emotion,
+        )
+        return cache_key, f"{prompt}\n[User sentiment: {emotion}]"
+
+    async def call_llm(self, prompt: str, temperature: float = 0) -> str:
+        """Call the LLM with emotion context and cache the result.
+
+        Results are cached under a hash of the model, normalized prompt,
+        temperature and sentiment tag; the prompt itself is stored once
+        alongside under ``llm_prompt:<hash>``. Concurrent calls with the
+        same key share a single LLM request.
+        """
+        with tracer.trace("agent.call_llm"):
+            return await self._call_llm(prompt, temperature)
+
+    async def _call_llm(self, prompt: str, temperature: float) -> str:
+        model = getattr(self.client, "model", None)
+        with span("llm.prepare_prompt"):
+            cache_key, prompt_with_emotion = await self._prepare_llm_prompt(prompt, temperature)
+        with span("llm.cache_lookup"):
+            cached = await self.get_cached_result(cache_key)
         if cached is not None:
             return cached
 
-        from emotion_recognizer import detect_emotion
-
-        emotion = detect_emotion(prompt)
-        prompt_with_emotion = f"{prompt}\n[User sentiment: {emotion}]"
-
         if not self.client:
             raise RuntimeError("No LLM client configured")
 
-        if hasattr(self.client, "chat"):
-            resp = await self.client.chat.completions.create(
-                model=getattr(self.client, "model", "model"),
-                messages=[{"role": "user", "content": prompt_with_emotion}],
-            )
-            result = resp.choices[0].message.content or ""
-        else:
-            resp = await self.client(prompt_with_emotion)
-            result = resp if isinstance(resp, str) else str(resp)
+        async def _call() -> str:
+            if hasattr(self.client, "chat"):
+                resp = await self.client.chat.completions.create(
+                    model=model or "model",
+                    messages=[{"role": "user", "content": prompt_with_emotion}],
+                    temperature=temperature,
+                )
+                result = resp.choices[0].message.content or ""
+            else:
+                resp = await self.client(prompt_with_emotion)
+                result = resp if isinstance(resp, str) else str(resp)
+
+            digest = cache_key.split(":", 1)[1]
+            await self.set_cached_result(f"llm_prompt:{digest}", prompt)
+            await self.set_cached_result(cache_key, result)
+            return result
 
-        await self.set_cached_result(cache_key, result)
-        return result
+        with span("llm.request", model=model):
+            return await self.single_flight.do(cache_key, _call)
 
     async def call_llm_with_tools(
         self,
@@ -265,39 +311,101 @@ class CappuccinoAgent:
         self.messages.append(message)
         logging.info(f"Added message: {message}")
 
-        conn = await self.tool_manager._get_db_connection()
-        await conn.execute(
-            "CREATE TABLE IF NOT EXISTS history (id INTEGER PRIMARY KEY AUTOINCREMENT, role TEXT, content TEXT)"
-        )
-        await conn.execute(
-            "INSERT INTO history (role, content) VALUES (?, ?)",
-            (role, content),
-        )
-        await conn.commit()
+        await self.tool_manager._add_history_entry(role, content)
 
     async def run(
-        self, user_query: str, tools_schema: Optional[List[Dict[str, Any]]] = None
+        self,
+        user_query: str,
+        tools_schema: Optional[List[Dict[str, Any]]] = None,
+        *,
+        deadline: Optional[float] = None,
     ) -> Any:
-        """Run the planner, executor and analyzer pipeline."""
-
-        plan_queue: asyncio.Queue = asyncio.Queue()
-        result_queue: asyncio.Queue = asyncio.Queue()
-
-        await self.add_message("user", user_query)
-
-        planner_task = asyncio.create_task(self.planner_agent.plan(user_query, plan_queue))
-        executor_task = asyncio.create_task(self.executor_agent.execute(plan_queue, result_queue))
+        """Run the planner, executor and analyzer pipeline.
+
+        The stages run concurrently over bounded queues, so a slow consumer
+        throttles its producer. If any stage fails, the run is cancelled or
+        ``deadline`` seconds elapse, every stage is cancelled, including
+        in-flight LLM calls. A missed deadline raises ``asyncio.TimeoutError``.
+        """
+        with tracer.trace("agent.run", query=user_query):
+            with span("agent.add_message", role="user"):
+                await self.add_message("user", user_query)
+
+            with span("agent.pipeline"):
+                results = await asyncio.wait_for(self._run_pipeline(user_query), deadline)
+            if len(results) == 1 and isinstance(results[0], dict) and "result" in results[0]:
+                output = results[0]["result"]
+            else:
+                output = results
+
+            with span("agent.add_message", role="assistant"):
+                await self.add_message("assistant", str(output))
+            return output
+
+    async def _run_pipeline(self, user_query: str) -> List[Dict[str, Any]]:
+        plan_queue: asyncio.Queue = asyncio.Queue(maxsize=settings.pipeline_queue_size)
+        result_queue: asyncio.Queue = asyncio.Queue(maxsize=settings.pipeline_queue_size)
+
+        queues = (plan_queue, result_queue)
+        self._pipelines.append(queues)
+        tasks = [
+            asyncio.create_task(self.planner_agent.plan(user_query, plan_queue)),
+            asyncio.create_task(self.executor_agent.execute(plan_queue, result_queue)),
+            asyncio.create_task(self.analyzer_agent.analyze(result_queue)),
+        ]
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+            for task in done:
+                if task.exception() is not None:
+                    raise task.exception()
+            return tasks[-1].result()
+        finally:
+            self._pipelines.remove(queues)
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def pipeline_stats(self) -> Dict[str, int]:
+        """Return the number of running pipelines and items waiting in their queues."""
+        return {
+            "runs": len(self._pipelines),
+            "plan_queue": sum(plan.qsize() for plan, _ in self._pipelines),
+            "result_queue": sum(result.qsize() for _, result in self._pipelines),
+        }
+
+    async def stream_responses(self, query: str) -> AsyncGenerator[str, None]:
+        """Yield the LLM response to ``query`` token by token.
+
+        Clients without a ``stream`` method yield their full response as a
+        single chunk. Cached responses are replayed without calling the LLM.
+        """
+        if not self.client:
+            raise RuntimeError("No LLM client configured")
 
-        await planner_task
-        await executor_task
-        results = await self.analyzer_agent.analyze(result_queue)
-        if len(results) == 1 and isinstance(results[0], dict) and "result" in results[0]:
-            output = results[0]["result"]
+        await self.add_message("user", query)
+        cache_key, prompt_with_emotion = await self._prepare_llm_prompt(query)
+        cached = await self.get_cached_result(cache_key)
+        parts: List[str] = []
+        if cached is not None:
+            parts.append(cached)
+            yield cached
+        elif hasattr(self.client, "stream"):
+            async for token in self.client.stream(prompt_with_emotion):
+                parts.append(token)
+                yield token
         else:
-            output = results
-
-        await self.add_message("assistant", str(output))
-        return output
+            resp = await self.client(prompt_with_emotion)
+            text = resp if isinstance(resp, str) else str(resp)
+            parts.append(text)
+            yield text
+
+        result = "".join(parts)
+        if cached is None:
+            digest = cache_key.split(":", 1)[1]
+            await self.set_cached_result(f"llm_prompt:{digest}", query)
+            await self.set_cached_result(cache_key, result)
+        await self.add_message("assistant", result)
 
     async def stream_events(self, query: str) -> AsyncGenerator[str, None]:
         """Yield placeholder events for streaming APIs."""
@@ -1,9 +1,12 @@
+import argparse
 import asyncio
-from typing import Optional
+import json
+from typing import List, Optional
 
 from cappuccino_agent import CappuccinoAgent
 from tool_manager import ToolManager
 from config import settings
+from tracing import to_chrome_trace, tracer
 
 
 async def chat_once(agent: CappuccinoAgent, message: str) -> str:
@@ -30,5 +33,29 @@ async def chat_loop(model: Optional[str] = None) -> None:
         await agent.close()
 
 
+def write_trace(path: str) -> None:
+    """Write every buffered trace to ``path`` as Chrome trace-event JSON."""
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump(to_chrome_trace(tracer.traces), fh)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Chat with the Cappuccino agent.")
+    parser.add_argument("--model", help="Ollama model to use")
+    parser.add_argument(
+        "--trace",
+        metavar="FILE",
+        help="trace every message and write a Chrome trace (chrome://tracing, Perfetto) on exit",
+    )
+    args = parser.parse_args(argv)
+    if args.trace:
+        tracer.sample_rate = 1.0
+    try:
+        asyncio.run(chat_loop(args.model))
+    finally:
+        if args.trace:
+            write_trace(args.trace)
+
+
 if __name__ == "__main__":  # pragma: no cover - manual run
-    asyncio.run(chat_loop())
+    main()
@@ -13,6 +13,40 @@ class Settings:
     anthropic_api_key: str | None = os.getenv("ANTHROPIC_API_KEY")
     fractal_depth: int = int(os.getenv("FRACTAL_DEPTH", "2"))
     fractal_breadth: int = int(os.getenv("FRACTAL_BREADTH", "3"))
+    executor_workers: int = int(os.getenv("EXECUTOR_WORKERS", "4"))
+    executor_step_timeout: float = float(os.getenv("EXECUTOR_STEP_TIMEOUT", "0"))
+    pipeline_queue_size: int = int(os.getenv("PIPELINE_QUEUE_SIZE", "16"))
+    model_idle_timeout: float = float(os.getenv("MODEL_IDLE_TIMEOUT", "900"))
+    model_memory_budget_mb: float = float(os.getenv("MODEL_MEMORY_BUDGET_MB", "0"))
+    model_warmup: str = os.getenv("MODEL_WARMUP", "")
+    media_process_workers: int = int(os.getenv("MEDIA_PROCESS_WORKERS", "0"))
+    video_frame_budget: int = int(os.getenv("VIDEO_FRAME_BUDGET", "64"))
+    video_workers: int = int(os.getenv("VIDEO_WORKERS", "4"))
+    audio_chunk_seconds: float = float(os.getenv("AUDIO_CHUNK_SECONDS", "30"))
+    db_commit_latency: float = float(os.getenv("DB_COMMIT_LATENCY", "0.05"))
+    db_commit_batch: int = int(os.getenv("DB_COMMIT_BATCH", "100"))
+    cache_memory_entries: int = int(os.getenv("CACHE_MEMORY_ENTRIES", "1024"))
+    cache_max_rows: int = int(os.getenv("CACHE_MAX_ROWS", "10000"))
+    shell_buffer_bytes: int = int(os.getenv("SHELL_BUFFER_BYTES", str(1 << 20)))
+    shell_reap_after: float = float(os.getenv("SHELL_REAP_AFTER", "300"))
+    shell_pool_size: int = int(os.getenv("SHELL_POOL_SIZE", "8"))
+    shell_idle_timeout: float = float(os.getenv("SHELL_IDLE_TIMEOUT", "600"))
+    shell_command_timeout: float = float(os.getenv("SHELL_COMMAND_TIMEOUT", "120"))
+    browser_block_resources: str = os.getenv("BROWSER_BLOCK_RESOURCES", "image,font,media")
+    browser_wait_until: str = os.getenv("BROWSER_WAIT_UNTIL", "domcontentloaded")
+    browser_max_sessions: int = int(os.getenv("BROWSER_MAX_SESSIONS", "8"))
+    browser_view_chars: int = int(os.getenv("BROWSER_VIEW_CHARS", "4000"))
+    browser_view_links: int = int(os.getenv("BROWSER_VIEW_LINKS", "50"))
+    http_pool_size: int = int(os.getenv("HTTP_POOL_SIZE", "100"))
+    http_pool_per_host: int = int(os.getenv("HTTP_POOL_PER_HOST", "10"))
+    http_timeout: float = float(os.getenv("HTTP_TIMEOUT", "30"))
+    http_retries: int = int(os.getenv("HTTP_RETRIES", "2"))
+    http_backoff: float = float(os.getenv("HTTP_BACKOFF", "0.5"))
+    tool_cache_hash_max_mb: float = float(os.getenv("TOOL_CACHE_HASH_MAX_MB", "256"))
+    emotion_memo_size: int = int(os.getenv("EMOTION_MEMO_SIZE", "4096"))
+    tool_log_param_chars: int = int(os.getenv("TOOL_LOG_PARAM_CHARS", "200"))
+    trace_sample_rate: float = float(os.getenv("TRACE_SAMPLE_RATE", "0"))
+    trace_buffer_size: int = int(os.getenv("TRACE_BUFFER_SIZE", "50"))
 
 
 settings = Settings()
@@ -25,6 +25,7 @@ import aiohttp
 import feedparser
 import json
 from cappuccino_agent import CappuccinoAgent
+from http_client import default_http_client as http
 from ollama_client import OllamaLLM
 from PIL import Image
 import numpy as np
@@ -145,6 +146,12 @@ cappuccino_agent = CappuccinoAgent(model=OLLAMA_MODEL)
 # Local LLM client for bot commands
 openai_client = OllamaLLM(OLLAMA_MODEL)
 
+# Per-request timeout for outbound HTTP calls made through the shared client
+HTTP_TIMEOUT = aiohttp.ClientTimeout(total=10)
+
+# Minimum seconds between message edits while streaming y? responses
+GPT_STREAM_EDIT_INTERVAL = float(os.getenv("GPT_STREAM_EDIT_INTERVAL", "1.0"))
+
 def _guess_mime(fname: str) -> str:
     mime, _ = mimetypes.guess_type(fname)
     return mime or "application/octet-stream"
@@ -817,27 +824,25 @@ async def make_quote_image(user, text, color=False) -> pathlib.Path:
         "color"       : color,
     }
 
-    async with aiohttp.ClientSession() as sess:
-        async with sess.post(
-            FAKEQUOTE_URL,
-            json=payload,
-            headers={"Accept": "text/plain"},
-            timeout=10
-        ) as r:
-            # 200, 201 どちらも成功扱いにする
-            raw = await r.text()
-            # Content-Type が text/plain でも JSON が来るので自前でパースを試みる
-            try:
-                data = json.loads(raw)
-                if not data.get("success", True):
-                    raise RuntimeError(data)
-                img_url = data["url"]
-            except json.JSONDecodeError:
-                # プレーンで URL だけ返ってきた場合
-                img_url = raw.strip()
+    # 200, 201 どちらも成功扱いにする
+    raw = await http.fetch(
+        "POST",
+        FAKEQUOTE_URL,
+        json=payload,
+        headers={"Accept": "text/plain"},
+        timeout=HTTP_TIMEOUT,
+    )
+    # Content-Type が text/plain でも JSON が来るので自前でパースを試みる
+    try:
+        data = json.loads(raw)
+        if not data.get("success", True):
+            raise RuntimeError(data)
+        img_url = data["url"]
+    except json.JSONDecodeError:
+        # プレーンで URL だけ返ってきた場合
+        img_url = raw.strip()
 
-        async with sess.get(img_url) as img:
-            img_bytes = await img.read()
+    img_bytes = await http.get_bytes(img_url)
 
     with tempfile.NamedTemporaryFile(delete=False, suffix=".jpg") as tmp:
         tmp.write(img_bytes)
@@ -1484,11 +1489,6 @@ async def cmd_gpt(msg: discord.Message, user_text: str):
 
     history = await _gather_reply_chain(msg, limit=20)
 
-    # 履歴＋今回のメッセージから画像を全部抽出
-    all_attachments = []
-    for m in history + [msg]:
-        all_attachments.extend(m.attachments)
-
     def format_history(messages: list[discord.Message]) -> str:
         lines = []
         for m in messages:
@@ -1524,14 +1524,21 @@ async def cmd_gpt(msg: discord.Message, user_text: str):
         f"{user_text}"
     )
     reply = await msg.reply("…")
+    response_text = ""
+    last_edit = time.monotonic()
     try:
-        # 履歴含めた添付画像を送る
-        response_text, files = await call_openai_api(prompt, ctx=msg, files=all_attachments)
+        # トークンを受け取りながら一定間隔でメッセージを更新する
+        async for token in openai_client.stream(prompt):
+            response_text += token
+            now = time.monotonic()
+            if now - last_edit >= GPT_STREAM_EDIT_INTERVAL and response_text.strip():
+                last_edit = now
+                await reply.edit(content=response_text[:1900])
     except Exception as exc:
         await reply.edit(content=f"Error: {exc}")
         return
 
-    await reply.edit(content=response_text[:1900], attachments=files if files else [])
+    await reply.edit(content=response_text[:1900] or "…")
 # ──────────── 🎵  コマンド郡 ────────────
 
 async def cmd_play(msg: discord.Message, query: str = "", *, first_query: bool = False, split_commas: bool = False):
@@ -2407,21 +2414,11 @@ def _resolve_google_news_url(url: str) -> str:
     return url
 
 # --------------- サムネイル取得 ---------------
-aiohttp_session: aiohttp.ClientSession | None = None  # 使い回し
-
-async def _get_session() -> aiohttp.ClientSession:
-    global aiohttp_session
-    if aiohttp_session is None or aiohttp_session.closed:
-        aiohttp_session = aiohttp.ClientSession()
-    return aiohttp_session
-
 async def _fetch_thumbnail(url: str) -> str | None:
     """記事から og:image を抜く"""
     try:
         url = _resolve_google_news_url(url)
-        sess = await _get_session()
-        async with sess.get(url, timeout=10) as resp:
-            html = await resp.text()
+        html = await http.get_text(url, timeout=HTTP_TIMEOUT)
         m = re.search(
             r'<meta[^>]+property=["\']og:image["\'][^>]+content=["\'](.*?)["\']',
             html, re.IGNORECASE
@@ -2438,9 +2435,7 @@ async def _fetch_article_body(url: str) -> str | None:
     """元記事から本文テキストを抽出"""
     try:
         url = _resolve_google_news_url(url)
-        sess = await _get_session()
-        async with sess.get(url, timeout=10) as resp:
-            html = await resp.text()
+        html = await http.get_text(url, timeout=HTTP_TIMEOUT)
         soup = BeautifulSoup(html, "html.parser")
         node = soup.find("article") or soup
         texts = [p.get_text(strip=True) for p in node.find_all("p")]
@@ -2545,19 +2540,15 @@ EEW_LIST_URL = "https://www.jma.go.jp/bosai/quake/data/list.json"
 EEW_BASE_URL = "https://www.jma.go.jp/bosai/quake/data/"
 
 async def send_latest_eew(channel: discord.TextChannel):
-    async with aiohttp.ClientSession() as sess:
-        async with sess.get(EEW_LIST_URL, timeout=10) as resp:
-            data = await resp.json()
-        if not data:
-            return
-        latest = data[0]
-        await _send_eew(channel, latest)
+    data = await http.get_json(EEW_LIST_URL, timeout=HTTP_TIMEOUT)
+    if not data:
+        return
+    latest = data[0]
+    await _send_eew(channel, latest)
 
 async def _send_eew(channel: discord.TextChannel, item: dict):
     url = EEW_BASE_URL + item.get("json", "")
-    async with aiohttp.ClientSession() as sess:
-        async with sess.get(url, timeout=10) as resp:
-            detail = await resp.json(content_type=None)
+    detail = await http.get_json(url, any_content_type=True, timeout=HTTP_TIMEOUT)
     head = detail.get("Head", {})
     body = detail.get("Body", {})
     area = (
@@ -2634,19 +2625,20 @@ async def watch_eew() -> None:
     global LAST_EEW_ID
     while True:
         try:
-            async with aiohttp.ClientSession() as sess:
-                try:
-                    async with sess.get(EEW_LIST_URL, timeout=10) as resp:
-                        if resp.status == 429:
-                            logger.warning("EEW API rate limited; backing off")
-                            await asyncio.sleep(60)
-                            continue
-                        resp.raise_for_status()
-                        data = await resp.json()
-                except aiohttp.ClientError as e:
-                    logger.error("EEW fetch network error: %s", e)
+            try:
+                data = await http.get_json(EEW_LIST_URL, timeout=HTTP_TIMEOUT)
+            except aiohttp.ClientResponseError as e:
+                if e.status == 429:
+                    logger.warning("EEW API rate limited; backing off")
+                    await asyncio.sleep(60)
+                else:
+                    logger.error("EEW fetch failed: %s", e)
                     await asyncio.sleep(30)
-                    continue
+                continue
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logger.error("EEW fetch network error: %s", e)
+                await asyncio.sleep(30)
+                continue
             if data:
                 latest = data[0]
                 eid = latest.get("json", "")
@@ -2682,9 +2674,7 @@ CITIES = {
 JST = datetime.timezone(datetime.timedelta(hours=9))
 
 async def _fetch_json(url: str) -> dict:
-    async with aiohttp.ClientSession() as sess:
-        async with sess.get(url, timeout=10) as resp:
-            return await resp.json()
+    return await http.get_json(url, timeout=HTTP_TIMEOUT)
 
 async def _fetch_overview() -> str | None:
     url = "https://www.jma.go.jp/bosai/forecast/data/overview_forecast/130000.json"
@@ -3613,7 +3603,10 @@ async def start_bot():
         raise RuntimeError("DISCORD_BOT_TOKEN is not set. Check your environment variables or .env file")
     if not OLLAMA_MODEL:
         raise RuntimeError("OLLAMA_MODEL is not set. Check your environment variables or .env file")
-    await client.start(TOKEN)
+    try:
+        await client.start(TOKEN)
+    finally:
+        await http.close()
 
 
 if __name__ == "__main__":
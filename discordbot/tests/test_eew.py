@@ -44,29 +44,13 @@ class DummyDiscord:
     class TextChannel:
         pass
 
-def _make_aiohttp(detail):
-    class DummyResponse:
-        def __init__(self, data):
-            self._data = data
-        async def __aenter__(self):
-            return self
-        async def __aexit__(self, exc_type, exc, tb):
-            pass
-        async def json(self, content_type=None):
-            return self._data
-    class DummySession:
-        async def __aenter__(self):
-            return self
-        async def __aexit__(self, exc_type, exc, tb):
-            pass
-        def get(self, url, timeout=10):
-            return DummyResponse(detail)
-    class DummyAiohttp:
-        def ClientSession(self):
-            return DummySession()
-    return DummyAiohttp()
+def _make_http(detail):
+    class DummyHttpClient:
+        async def get_json(self, url, any_content_type=False, timeout=None):
+            return detail
+    return DummyHttpClient()
 
-def _load_send_eew(aiohttp_mod, discord_mod):
+def _load_send_eew(http_client, discord_mod):
     # Adjust path for repository layout
     with open('discordbot/bot.py', 'r', encoding='utf-8') as f:
         source = f.read()
@@ -79,7 +63,8 @@ def _load_send_eew(aiohttp_mod, discord_mod):
     if func_node is None:
         raise RuntimeError('_send_eew not found')
     namespace = {
-        'aiohttp': aiohttp_mod,
+        'http': http_client,
+        'HTTP_TIMEOUT': None,
         'discord': discord_mod,
         'datetime': datetime,
         'EEW_BASE_URL': 'https://example.com/'
@@ -97,8 +82,8 @@ def _make_detail():
     }
 
 def test_send_eew_with_ctt():
-    aiohttp_mod = _make_aiohttp(_make_detail())
-    send_eew = _load_send_eew(aiohttp_mod, DummyDiscord)
+    http_client = _make_http(_make_detail())
+    send_eew = _load_send_eew(http_client, DummyDiscord)
     channel = DummyChannel()
     item = {'json': 'x.json', 'ctt': '20240102123456'}
     import asyncio
@@ -106,8 +91,8 @@ def test_send_eew_with_ctt():
     assert channel.sent.fields[0]['value'] == '2024年01月02日(Tue)12:34:56'
 
 def test_send_eew_without_ctt():
-    aiohttp_mod = _make_aiohttp(_make_detail())
-    send_eew = _load_send_eew(aiohttp_mod, DummyDiscord)
+    http_client = _make_http(_make_detail())
+    send_eew = _load_send_eew(http_client, DummyDiscord)
     channel = DummyChannel()
     item = {'json': 'x.json'}
     import asyncio
@@ -1,13 +1,135 @@
-from textblob import TextBlob
+"""Rough sentiment of user text: positive, negative or neutral."""
 
+import hashlib
+import re
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
 
-def detect_emotion(text: str) -> str:
-    """Return rough sentiment category for the given text."""
-    if not text:
-        return "neutral"
-    polarity = TextBlob(text).sentiment.polarity
-    if polarity > 0.1:
+from config import settings
+from result_cache import LRUCache
+
+POSITIVE_THRESHOLD = 0.1
+NEGATIVE_THRESHOLD = -0.1
+# Lexicon scores this close to a threshold are settled by full TextBlob analysis.
+AMBIGUITY_MARGIN = 0.05
+
+_TOKEN = re.compile(r"[a-z]+(?:'[a-z]+)?|n't")
+_NEGATIONS = frozenset({"no", "not", "n't", "never"})
+
+_lexicon: Optional[Dict[str, Tuple[float, float, bool]]] = None
+_lexicon_lock = threading.Lock()
+_memo = LRUCache(settings.emotion_memo_size)
+_memo_lock = threading.Lock()
+
+
+def _load_lexicon() -> Dict[str, Tuple[float, float, bool]]:
+    """Flatten TextBlob's sentiment lexicon into ``word -> (polarity, intensity, modifier)``."""
+    global _lexicon
+    with _lexicon_lock:
+        if _lexicon is None:
+            from textblob.en import sentiment
+
+            table = {}
+            for word, senses in sentiment.items():
+                polarity, _, intensity = senses.get(None) or next(iter(senses.values()))
+                modifier = any(pos in sentiment.modifiers for pos in senses if pos)
+                table[word.lower()] = (polarity, intensity, modifier)
+            _lexicon = table
+    return _lexicon
+
+
+def lexicon_polarity(text: str) -> float:
+    """Return the mean polarity of lexicon words in ``text``.
+
+    Follows TextBlob's pattern analyzer closely: an adverb in the lexicon
+    scales the following word by its intensity and a preceding negation
+    flips the word's polarity at half strength.
+    """
+    lexicon = _load_lexicon()
+    tokens = _TOKEN.findall(text.lower())
+    scores: List[float] = []
+    scale = 1.0
+    negated = False
+    for i, token in enumerate(tokens):
+        if token in _NEGATIONS:
+            negated = True
+            continue
+        entry = lexicon.get(token)
+        if entry is None:
+            scale, negated = 1.0, False
+            continue
+        polarity, intensity, modifier = entry
+        if modifier and i + 1 < len(tokens) and tokens[i + 1] in lexicon:
+            scale *= intensity
+            continue
+        score = max(-1.0, min(1.0, polarity * scale))
+        if negated:
+            score *= -0.5
+        scores.append(score)
+        scale, negated = 1.0, False
+    return sum(scores) / len(scores) if scores else 0.0
+
+
+def _classify(polarity: float) -> str:
+    if polarity > POSITIVE_THRESHOLD:
         return "positive"
-    if polarity < -0.1:
+    if polarity < NEGATIVE_THRESHOLD:
         return "negative"
     return "neutral"
+
+
+def _analyze(text: str) -> str:
+    polarity = lexicon_polarity(text)
+    near = min(abs(polarity - POSITIVE_THRESHOLD), abs(polarity - NEGATIVE_THRESHOLD))
+    if near < AMBIGUITY_MARGIN:
+        from textblob import TextBlob
+
+        polarity = TextBlob(text).sentiment.polarity
+    return _classify(polarity)
+
+
+def _memo_key(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8", "surrogatepass")).hexdigest()
+
+
+def cached_emotion(text: str) -> Optional[str]:
+    """Return the memoised sentiment of ``text`` without analysing it."""
+    if not text:
+        return "neutral"
+    with _memo_lock:
+        return _memo.get(_memo_key(text), 0)
+
+
+def detect_emotion(text: str) -> str:
+    """Return rough sentiment category for the given text.
+
+    Results are memoised by a hash of the text. Analysis is CPU-bound, so
+    async callers should run this off the event loop after checking
+    :func:`cached_emotion`.
+    """
+    return detect_emotions([text])[0]
+
+
+def detect_emotions(texts: Iterable[str]) -> List[str]:
+    """Return the sentiment of each text, analysing duplicates only once."""
+    texts = list(texts)
+    results: List[Optional[str]] = [None] * len(texts)
+    pending: Dict[str, List[int]] = {}
+    for i, text in enumerate(texts):
+        if not text:
+            results[i] = "neutral"
+            continue
+        key = _memo_key(text)
+        with _memo_lock:
+            hit = _memo.get(key, 0)
+        if hit is not None:
+            results[i] = hit
+        else:
+            pending.setdefault(key, []).append(i)
+    for key, indices in pending.items():
+        emotion = _analyze(texts[indices[0]])
+        with _memo_lock:
+            _memo.set(key, emotion, None)
+        for i in indices:
+            results[i] = emotion
+    return results  # type: ignore[return-value]
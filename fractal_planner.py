@@ -17,12 +17,17 @@ class FractalPlanner:
         self.breadth = breadth if breadth is not None else settings.fractal_breadth
         self.base_planner = base_planner or BasicPlanner()
 
-    def _search(self, context: str, depth: int) -> List[Dict[str, Any]]:
+    def _search(self, context: str, depth: int, prefix: str = "") -> List[Dict[str, Any]]:
         steps = self.base_planner.create_plan(context)[: self.breadth]
+        if prefix:
+            for step in steps:
+                step["step"] = f"{prefix}.{step['step']}"
         if depth <= 1:
             return steps
         for step in steps:
-            step["substeps"] = self._search(step["action"], depth - 1)
+            step["substeps"] = self._search(step["action"], depth - 1, str(step["step"]))
+            # A step is complete once all of its substeps are.
+            step["depends_on"] = [sub["step"] for sub in step["substeps"]]
         return steps
 
     def create_plan(self, context: str) -> List[Dict[str, Any]]:
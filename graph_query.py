@@ -0,0 +1,128 @@
+"""Traversal and pattern queries over the SQLite-backed knowledge graph.
+
+Traversals expand one hop at a time through indexed lookups in
+:class:`StateManager`, so their cost depends on the part of the graph they
+visit, not on the size of the whole graph. Pattern matches run as a single
+self-join.
+"""
+
+import re
+from typing import Dict, List, Optional, Tuple
+
+from state_manager import StateManager
+
+Triple = Tuple[str, str, str]
+
+# SQLite joins at most 64 tables, one per pattern.
+MAX_PATTERNS = 64
+DIRECTIONS = ("out", "in", "both")
+
+_PATTERN = re.compile(r"\(\s*([^,()]+?)\s*,\s*([^,()]+?)\s*,\s*([^,()]+?)\s*\)")
+
+
+def parse_patterns(text: str) -> List[Triple]:
+    """Parse ``(?x, works_at, ACME), (?x, knows, ?y)`` into triples."""
+    patterns = [tuple(m.groups()) for m in _PATTERN.finditer(text)]
+    if not patterns:
+        raise ValueError(f"no (subject, relation, object) pattern in {text!r}")
+    return patterns  # type: ignore[return-value]
+
+
+class GraphQuery:
+    """Relation lookups, k-hop traversal, shortest paths and pattern matching."""
+
+    def __init__(self, state_manager: StateManager) -> None:
+        self.state_manager = state_manager
+
+    async def incoming(self, entity: str, relation: Optional[str] = None) -> List[Tuple[str, str]]:
+        """Return ``(relation, source)`` pairs for edges pointing at ``entity``."""
+        edges = await self.state_manager.find_graph_edges(relation=relation, target=entity)
+        return [(rel, src) for src, rel, _ in edges]
+
+    async def _expand(
+        self, frontier: List[str], direction: str, relations: Optional[List[str]]
+    ) -> List[Tuple[str, str, str]]:
+        """Return ``(from, relation, to)`` steps leaving ``frontier``."""
+        if direction not in DIRECTIONS:
+            raise ValueError(f"direction must be one of {', '.join(DIRECTIONS)}")
+        steps = []
+        if direction in ("out", "both"):
+            for src, rel, tgt in await self.state_manager.expand_graph_frontier(frontier, "out", relations):
+                steps.append((src, rel, tgt))
+        if direction in ("in", "both"):
+            for src, rel, tgt in await self.state_manager.expand_graph_frontier(frontier, "in", relations):
+                steps.append((tgt, rel, src))
+        return steps
+
+    async def neighbors(
+        self,
+        entity: str,
+        hops: int = 1,
+        relations: Optional[List[str]] = None,
+        direction: str = "out",
+        max_nodes: int = 1000,
+    ) -> Dict[str, int]:
+        """Breadth-first search returning reachable entities and their hop distance."""
+        if direction not in DIRECTIONS:
+            raise ValueError(f"direction must be one of {', '.join(DIRECTIONS)}")
+        distances: Dict[str, int] = {entity: 0}
+        frontier = [entity]
+        for hop in range(1, hops + 1):
+            if not frontier:
+                break
+            next_frontier = []
+            for _, _, node in await self._expand(frontier, direction, relations):
+                if node not in distances:
+                    distances[node] = hop
+                    next_frontier.append(node)
+                    if len(distances) > max_nodes:
+                        break
+            if len(distances) > max_nodes:
+                break
+            frontier = next_frontier
+        distances.pop(entity)
+        return distances
+
+    async def shortest_path(
+        self,
+        source: str,
+        target: str,
+        max_hops: int = 6,
+        relations: Optional[List[str]] = None,
+        direction: str = "out",
+    ) -> Optional[List[Triple]]:
+        """Return the edges of a shortest path, ``[]`` if equal, ``None`` if unreachable."""
+        if source == target:
+            return []
+        parents: Dict[str, Tuple[str, str]] = {}
+        seen = {source}
+        frontier = [source]
+        for _ in range(max_hops):
+            if not frontier:
+                break
+            next_frontier = []
+            for prev, rel, node in await self._expand(frontier, direction, relations):
+                if node in seen:
+                    continue
+                seen.add(node)
+                parents[node] = (prev, rel)
+                if node == target:
+                    path: List[Triple] = []
+                    while node != source:
+                        prev, rel = parents[node]
+                        path.append((prev, rel, node))
+                        node = prev
+                    return list(reversed(path))
+                next_frontier.append(node)
+            frontier = next_frontier
+        return None
+
+    async def match(self, patterns: List[Triple], limit: int = 100) -> List[Dict[str, str]]:
+        """Return variable bindings satisfying every ``(subject, relation, object)`` pattern.
+
+        Terms starting with ``?`` are variables; patterns are joined on shared
+        variables in a single query that stops after ``limit`` matches.
+        """
+        if len(patterns) > MAX_PATTERNS:
+            raise ValueError(f"at most {MAX_PATTERNS} patterns can be matched at once")
+        return await self.state_manager.match_graph_patterns(patterns, limit)
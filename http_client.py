@@ -0,0 +1,159 @@
+"""Shared aiohttp client with pooled keep-alive connections and retries."""
+
+import asyncio
+import logging
+import random
+from typing import Any, Dict, Optional
+
+import aiohttp
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+
+class HttpClient:
+    """One lazily created ``aiohttp.ClientSession`` reused for every request.
+
+    Connections are kept alive and pooled with a global and a per-host
+    limit, every request gets a default total timeout, and idempotent
+    requests failing with a connection error, a timeout or a retryable
+    status are retried with jittered exponential backoff. A session is
+    bound to the event loop it was created on, so a new one is opened if
+    the client is used from another loop.
+    """
+
+    def __init__(
+        self,
+        *,
+        limit: Optional[int] = None,
+        limit_per_host: Optional[int] = None,
+        timeout: Optional[float] = None,
+        retries: Optional[int] = None,
+        backoff: Optional[float] = None,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> None:
+        self.limit = settings.http_pool_size if limit is None else limit
+        self.limit_per_host = settings.http_pool_per_host if limit_per_host is None else limit_per_host
+        self.timeout = settings.http_timeout if timeout is None else timeout
+        self.retries = settings.http_retries if retries is None else retries
+        self.backoff = settings.http_backoff if backoff is None else backoff
+        self.headers = headers
+        self.requests = 0
+        self.retried = 0
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _create_session(self) -> aiohttp.ClientSession:
+        connector = aiohttp.TCPConnector(
+            limit=self.limit,
+            limit_per_host=self.limit_per_host,
+            ttl_dns_cache=300,
+        )
+        return aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+            headers=self.headers,
+        )
+
+    def session(self) -> aiohttp.ClientSession:
+        """Return the shared session, opening it on first use in this loop."""
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._loop is not loop:
+            self._release()
+            self._session = self._create_session()
+            self._loop = loop
+        return self._session
+
+    def _release(self) -> None:
+        """Let go of a session opened on another loop without leaking it."""
+        session, old_loop = self._session, self._loop
+        self._session = self._loop = None
+        if session is None or session.closed:
+            return
+        if old_loop is not None and old_loop.is_running():
+            # Still serving another thread; close it there.
+            asyncio.run_coroutine_threadsafe(session.close(), old_loop)
+        else:
+            # The loop is stopped, so its connections can't be closed
+            # gracefully; detach them so the session is marked closed.
+            session.detach()
+
+    async def close(self) -> None:
+        """Close the session and its pooled connections."""
+        session, self._session, self._loop = self._session, None, None
+        if session is not None:
+            await session.close()
+
+    async def fetch(
+        self,
+        method: str,
+        url: str,
+        *,
+        read: str = "text",
+        retries: Optional[int] = None,
+        with_status: bool = False,
+        **kwargs: Any,
+    ) -> Any:
+        """Send a request and return its body read as ``text``, ``json``, ``json_any`` or ``bytes``.
+
+        ``json_any`` parses JSON regardless of the response Content-Type.
+        Error statuses left after retrying raise ``aiohttp.ClientResponseError``,
+        unless ``with_status`` is set: then ``(status, body)`` is returned for
+        every response. Non-idempotent methods are not retried unless
+        ``retries`` is given.
+        """
+        method = method.upper()
+        if retries is None:
+            retries = self.retries if method in IDEMPOTENT_METHODS else 0
+        for attempt in range(retries + 1):
+            self.requests += 1
+            last = attempt == retries
+            try:
+                async with getattr(self.session(), method.lower())(url, **kwargs) as resp:
+                    if resp.status in RETRY_STATUSES and not last:
+                        error: BaseException = aiohttp.ClientResponseError(
+                            resp.request_info, resp.history, status=resp.status
+                        )
+                    else:
+                        if resp.status >= 400 and not with_status:
+                            resp.raise_for_status()
+                        body = await self._read(resp, read)
+                        return (resp.status, body) if with_status else body
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as exc:
+                if last:
+                    raise
+                error = exc
+            self.retried += 1
+            delay = self.backoff * (2 ** attempt) + random.uniform(0, self.backoff)
+            logger.warning("retrying %s %s in %.2fs after %r", method, url, delay, error)
+            await asyncio.sleep(delay)
+
+    @staticmethod
+    async def _read(resp: aiohttp.ClientResponse, read: str) -> Any:
+        if read == "json":
+            return await resp.json()
+        if read == "json_any":
+            return await resp.json(content_type=None)
+        if read == "bytes":
+            return await resp.read()
+        return await resp.text()
+
+    async def get_text(self, url: str, **kwargs: Any) -> str:
+        return await self.fetch("GET", url, read="text", **kwargs)
+
+    async def get_json(self, url: str, *, any_content_type: bool = False, **kwargs: Any) -> Any:
+        return await self.fetch("GET", url, read="json_any" if any_content_type else "json", **kwargs)
+
+    async def get_bytes(self, url: str, **kwargs: Any) -> bytes:
+        return await self.fetch("GET", url, read="bytes", **kwargs)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return request/retry counts and whether a session is open."""
+        return {"requests": self.requests, "retried": self.retried, "open": self._session is not None}
+
+
+default_http_client = HttpClient()
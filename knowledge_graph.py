@@ -1,5 +1,5 @@
 import json
-from typing import Any, List, Tuple
+from typing import Any, Dict, List, Set, Tuple
 
 import networkx as nx
 from networkx.readwrite import json_graph
@@ -10,6 +10,7 @@ class KnowledgeGraph:
 
     def __init__(self) -> None:
         self.graph = nx.MultiDiGraph()
+        self._by_relation: Dict[str, Set[Tuple[str, str]]] = {}
 
     def add_entity(self, name: str, **attrs: Any) -> None:
         """Add a node representing an entity."""
@@ -18,21 +19,44 @@ class KnowledgeGraph:
     def add_relation(self, source: str, target: str, relation: str, **attrs: Any) -> None:
         """Create a typed relation between two entities."""
         self.graph.add_edge(source, target, key=relation, **attrs)
+        self._by_relation.setdefault(relation, set()).add((source, target))
 
     def remove_entity(self, name: str) -> None:
         """Remove an entity and its relations."""
         if self.graph.has_node(name):
+            edges = list(self.graph.out_edges(name, keys=True)) + list(
+                self.graph.in_edges(name, keys=True)
+            )
+            for src, tgt, key in edges:
+                self._by_relation.get(key, set()).discard((src, tgt))
             self.graph.remove_node(name)
 
     def remove_relation(self, source: str, target: str, relation: str) -> None:
         """Remove a specific relation between two entities."""
         if self.graph.has_edge(source, target, key=relation):
             self.graph.remove_edge(source, target, key=relation)
+            self._by_relation.get(relation, set()).discard((source, target))
+
+    def entity_attrs(self, name: str) -> Dict[str, Any]:
+        """Return the attributes stored on an entity."""
+        return dict(self.graph.nodes[name])
+
+    def relation_attrs(self, source: str, target: str, relation: str) -> Dict[str, Any]:
+        """Return the attributes stored on a relation."""
+        return dict(self.graph.edges[source, target, relation])
 
     def query(self, entity: str) -> List[Tuple[str, str]]:
         """Return outgoing relations from the given entity."""
         return [(key, tgt) for _, tgt, key in self.graph.out_edges(entity, keys=True)]
 
+    def incoming(self, entity: str) -> List[Tuple[str, str]]:
+        """Return ``(relation, source)`` pairs for edges pointing at the entity."""
+        return [(key, src) for src, _, key in self.graph.in_edges(entity, keys=True)]
+
+    def edges_by_relation(self, relation: str) -> List[Tuple[str, str]]:
+        """Return ``(source, target)`` pairs connected by ``relation``."""
+        return sorted(self._by_relation.get(relation, ()))
+
     def to_json(self) -> str:
         """Serialize the graph to a JSON string."""
         # Explicitly set edges="links" to preserve current behavior and
@@ -49,4 +73,6 @@ class KnowledgeGraph:
         instance.graph = json_graph.node_link_graph(
             json.loads(data), multigraph=True, edges="links"
         )
+        for src, tgt, key in instance.graph.edges(keys=True):
+            instance._by_relation.setdefault(key, set()).add((src, tgt))
         return instance
@@ -0,0 +1,40 @@
+"""Content-addressed cache keys for LLM requests."""
+
+import hashlib
+import json
+import re
+from typing import Any, Dict, List, Optional
+
+_WHITESPACE = re.compile(r"\s+")
+_ISO_TIMESTAMP = re.compile(
+    r"\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?(?:Z|[+-]\d{2}:?\d{2})?"
+)
+
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace and mask ISO-8601 timestamps."""
+    text = _ISO_TIMESTAMP.sub("<ts>", text)
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def llm_cache_key(
+    messages: List[Dict[str, Any]],
+    *,
+    model: Optional[str] = None,
+    temperature: float = 0,
+    sentiment: Optional[str] = None,
+) -> str:
+    """Return ``llm:<sha256>`` for the normalized request parameters."""
+    payload = {
+        "model": model or "",
+        "messages": [
+            {"role": m.get("role", "user"), "content": normalize_text(m.get("content") or "")}
+            for m in messages
+        ],
+        "temperature": temperature,
+        "sentiment": sentiment,
+    }
+    digest = hashlib.sha256(
+        json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    ).hexdigest()
+    return f"llm:{digest}"
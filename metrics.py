@@ -0,0 +1,338 @@
+"""In-process latency histograms and counters, rendered in Prometheus text format."""
+
+import asyncio
+import bisect
+import logging
+import math
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (
+    0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+
+
+class Histogram:
+    """Fixed-bucket histogram of observations in seconds.
+
+    ``counts[i]`` holds observations ``<= buckets[i]`` that did not fit a
+    smaller bucket; the final slot counts everything above the last bound.
+    Recording is a bisect and two additions, cheap enough for every call.
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate the ``q`` quantile by interpolating inside its bucket."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                lower = self.buckets[i - 1] if i else 0.0
+                if i == len(self.buckets):
+                    return lower
+                return lower + (self.buckets[i] - lower) * (rank - seen) / n
+            seen += n
+        return self.buckets[-1]
+
+    def cumulative(self) -> List[int]:
+        """Return Prometheus-style cumulative counts, ending with ``+Inf``."""
+        total = 0
+        out = []
+        for n in self.counts:
+            total += n
+            out.append(total)
+        return out
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+        }
+
+
+class ToolStats:
+    """Call, error and in-flight counts plus a latency histogram for one tool."""
+
+    __slots__ = ("calls", "errors", "in_flight", "latency")
+
+    def __init__(self) -> None:
+        self.in_flight = 0
+        self.clear()
+
+    def clear(self) -> None:
+        """Zero the counters; tools still running stay counted as in flight."""
+        self.calls = 0
+        self.errors = 0
+        self.latency = Histogram()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "in_flight": self.in_flight,
+            "latency": self.latency.snapshot(),
+        }
+
+
+class ToolMetrics:
+    """Registry of :class:`ToolStats` keyed by tool name."""
+
+    def __init__(self) -> None:
+        self.tools: Dict[str, ToolStats] = {}
+
+    def tool(self, name: str) -> ToolStats:
+        stats = self.tools.get(name)
+        if stats is None:
+            stats = self.tools[name] = ToolStats()
+        return stats
+
+    def snapshot(self, active_only: bool = True) -> Dict[str, Dict[str, Any]]:
+        """Return stats per tool, skipping tools never called unless asked."""
+        return {
+            name: stats.snapshot()
+            for name, stats in sorted(self.tools.items())
+            if stats.calls or not active_only
+        }
+
+    def reset(self) -> None:
+        # Clear in place: decorated tools hold on to their stats objects.
+        for stats in self.tools.values():
+            stats.clear()
+
+
+def render_value(value: Any, limit: int) -> str:
+    """Return ``repr(value)`` cut to ``limit`` characters with the full length noted."""
+    if isinstance(value, (str, bytes)) and len(value) > limit:
+        return f"{value[:limit]!r}...<{len(value)} chars>"
+    text = repr(value)
+    if len(text) > limit:
+        return f"{text[:limit]}...<{len(text)} chars>"
+    return text
+
+
+def _format(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Family:
+    """A named metric with one child value per label combination."""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.children: Dict[Tuple[str, ...], Any] = {}
+
+    def _key(self, labels: Sequence[Any]) -> Tuple[str, ...]:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+        return tuple(str(v) for v in labels)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for key, value in sorted(self.children.items()):
+            lines.extend(self._samples(key, value))
+        return lines
+
+    def _samples(self, key: Tuple[str, ...], value: Any) -> List[str]:
+        return [f"{self.name}{_labels(self.labelnames, key)} {_format(value)}"]
+
+
+class Counter(_Family):
+    kind = "counter"
+
+    def inc(self, *labels: Any, amount: float = 1.0) -> None:
+        key = self._key(labels)
+        self.children[key] = self.children.get(key, 0) + amount
+
+
+class Gauge(_Family):
+    kind = "gauge"
+
+    def set(self, value: float, *labels: Any) -> None:
+        self.children[self._key(labels)] = value
+
+
+class HistogramFamily(_Family):
+    kind = "histogram"
+
+    def __init__(
+        self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> None:
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+
+    def labels(self, *labels: Any) -> Histogram:
+        """Return the child histogram, so hot paths can skip the label lookup."""
+        key = self._key(labels)
+        child = self.children.get(key)
+        if child is None:
+            child = self.children[key] = Histogram(self.buckets)
+        return child
+
+    def observe(self, value: float, *labels: Any) -> None:
+        self.labels(*labels).observe(value)
+
+    def _samples(self, key: Tuple[str, ...], hist: Histogram) -> List[str]:
+        lines = []
+        bounds = list(hist.buckets) + [math.inf]
+        for bound, total in zip(bounds, hist.cumulative()):
+            le = _labels(self.labelnames, key, f'le="{_format(bound)}"')
+            lines.append(f"{self.name}_bucket{le} {total}")
+        labels = _labels(self.labelnames, key)
+        lines.append(f"{self.name}_sum{labels} {_format(hist.sum)}")
+        lines.append(f"{self.name}_count{labels} {hist.count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Metric families plus collectors that build families at scrape time.
+
+    Hot paths update registered families directly; values that already
+    live elsewhere (cache counters, queue sizes, tool stats) are read by a
+    collector only when :meth:`render` runs.
+    """
+
+    def __init__(self) -> None:
+        self.families: Dict[str, _Family] = {}
+        self.collectors: List[Callable[[], Iterable[_Family]]] = []
+
+    def _register(self, cls: type, name: str, *args: Any, **kwargs: Any) -> Any:
+        family = self.families.get(name)
+        if family is None:
+            family = self.families[name] = cls(name, *args, **kwargs)
+        elif not isinstance(family, cls):
+            raise ValueError(f"{name} is already registered as a {family.kind}")
+        return family
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter, name, help, labelnames)
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge, name, help, labelnames)
+
+    def histogram(
+        self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> HistogramFamily:
+        return self._register(HistogramFamily, name, help, labelnames, buckets)
+
+    def add_collector(self, collector: Callable[[], Iterable[_Family]]) -> None:
+        if collector not in self.collectors:
+            self.collectors.append(collector)
+
+    def remove_collector(self, collector: Callable[[], Iterable[_Family]]) -> None:
+        if collector in self.collectors:
+            self.collectors.remove(collector)
+
+    def render(self) -> str:
+        """Return every metric in the Prometheus text exposition format."""
+        lines: List[str] = []
+        for family in self.families.values():
+            lines.extend(family.render())
+        for collector in list(self.collectors):
+            try:
+                families = list(collector())
+            except Exception:
+                logger.exception("metrics collector %r failed", collector)
+                continue
+            for family in families:
+                lines.extend(family.render())
+        return "\n".join(lines) + "\n"
+
+
+class LoopLagMonitor:
+    """Measure how late the event loop wakes a task sleeping ``interval`` seconds."""
+
+    def __init__(self, family: HistogramFamily, gauge: Gauge, interval: float = 0.5) -> None:
+        self.histogram = family.labels()
+        self.gauge = gauge
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.perf_counter() - start - self.interval)
+            self.histogram.observe(lag)
+            self.gauge.set(lag)
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+
+def _tool_families(metrics: "ToolMetrics") -> Iterable[_Family]:
+    calls = Counter("cappuccino_tool_calls_total", "Tool invocations.", ["tool"])
+    errors = Counter("cappuccino_tool_errors_total", "Tool invocations that failed.", ["tool"])
+    in_flight = Gauge("cappuccino_tool_in_flight", "Tool invocations currently running.", ["tool"])
+    latency = HistogramFamily("cappuccino_tool_duration_seconds", "Tool latency.", ["tool"])
+    for name, stats in metrics.tools.items():
+        calls.children[(name,)] = stats.calls
+        errors.children[(name,)] = stats.errors
+        in_flight.children[(name,)] = stats.in_flight
+        latency.children[(name,)] = stats.latency
+    return [calls, errors, in_flight, latency]
+
+
+tool_metrics = ToolMetrics()
+registry = MetricsRegistry()
+registry.add_collector(lambda: _tool_families(tool_metrics))
+
+TOKEN_RATE_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+LLM_REQUESTS = registry.histogram(
+    "cappuccino_llm_request_seconds", "LLM request latency until the last token.", ["model", "mode"]
+)
+LLM_FIRST_TOKEN = registry.histogram(
+    "cappuccino_llm_time_to_first_token_seconds", "Delay before a streamed LLM response starts.", ["model"]
+)
+LLM_TOKENS = registry.counter("cappuccino_llm_tokens_total", "Tokens generated by the LLM.", ["model"])
+LLM_TOKEN_RATE = registry.histogram(
+    "cappuccino_llm_tokens_per_second", "LLM generation speed per request.", ["model"], TOKEN_RATE_BUCKETS
+)
+LLM_ERRORS = registry.counter("cappuccino_llm_errors_total", "LLM requests that raised.", ["model"])
+DB_SECONDS = registry.histogram(
+    "cappuccino_db_seconds", "SQLite write and commit latency.", ["op"]
+)
+DB_WRITES = registry.counter("cappuccino_db_writes_total", "SQLite write statements.", ["op"])
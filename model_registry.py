@@ -0,0 +1,200 @@
+"""Process-wide registry keeping heavy ML models resident between tool calls."""
+
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+@dataclass
+class ModelEntry:
+    """Loader, resident instance and timing counters for one model."""
+
+    loader: Callable[[], Any]
+    size_mb: float = 0.0
+    model: Any = None
+    last_used: float = 0.0
+    loads: int = 0
+    load_seconds: float = 0.0
+    inferences: int = 0
+    inference_seconds: float = 0.0
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+
+class ModelRegistry:
+    """Load models lazily once and keep them until idle or over budget.
+
+    Loaders run in a worker thread. A model unused for ``idle_timeout``
+    seconds is dropped on the next registry access. When loading a model
+    would push the declared ``size_mb`` total over ``memory_budget_mb``,
+    least recently used models are unloaded first.
+    """
+
+    def __init__(
+        self,
+        *,
+        idle_timeout: Optional[float] = 900,
+        memory_budget_mb: Optional[float] = None,
+    ) -> None:
+        self.idle_timeout = idle_timeout
+        self.memory_budget_mb = memory_budget_mb
+        self._entries: Dict[str, ModelEntry] = {}
+
+    def register(self, name: str, loader: Callable[[], Any], *, size_mb: float = 0.0) -> None:
+        """Register ``loader`` under ``name``; nothing is loaded yet."""
+        self._entries[name] = ModelEntry(loader=loader, size_mb=size_mb)
+
+    def is_loaded(self, name: str) -> bool:
+        entry = self._entries.get(name)
+        return entry is not None and entry.model is not None
+
+    def unload(self, name: str) -> None:
+        entry = self._entries.get(name)
+        if entry is not None and entry.model is not None:
+            entry.model = None
+            logger.info("unloaded model %s", name)
+
+    def evict_idle(self, now: Optional[float] = None) -> None:
+        """Unload models that have not been used within ``idle_timeout``."""
+        if self.idle_timeout is None:
+            return
+        now = time.monotonic() if now is None else now
+        for name, entry in self._entries.items():
+            if entry.model is not None and now - entry.last_used > self.idle_timeout:
+                self.unload(name)
+
+    def _make_room(self, name: str) -> None:
+        if self.memory_budget_mb is None:
+            return
+        needed = self._entries[name].size_mb
+        resident = sorted(
+            (e.last_used, n) for n, e in self._entries.items() if e.model is not None and n != name
+        )
+        used = sum(self._entries[n].size_mb for _, n in resident)
+        for _, other in resident:
+            if used + needed <= self.memory_budget_mb:
+                break
+            used -= self._entries[other].size_mb
+            self.unload(other)
+
+    def copies_within_budget(self, name: str) -> Optional[int]:
+        """Return how many copies of ``name`` fit the memory budget, ``None`` if unlimited.
+
+        Used to size process pools whose workers each load a private copy
+        of the model, outside the registry.
+        """
+        entry = self._entries.get(name)
+        if self.memory_budget_mb is None or entry is None or not entry.size_mb:
+            return None
+        return max(1, int(self.memory_budget_mb // entry.size_mb))
+
+    async def get(self, name: str) -> Any:
+        """Return the resident model, loading it on first use."""
+        if name not in self._entries:
+            raise KeyError(f"model {name} not registered")
+        self.evict_idle()
+        entry = self._entries[name]
+        if entry.model is None:
+            async with entry.lock:
+                if entry.model is None:
+                    self._make_room(name)
+                    start = time.perf_counter()
+                    entry.model = await asyncio.to_thread(entry.loader)
+                    entry.loads += 1
+                    entry.load_seconds += time.perf_counter() - start
+                    logger.info("loaded model %s in %.2fs", name, time.perf_counter() - start)
+        entry.last_used = time.monotonic()
+        return entry.model
+
+    async def run(self, name: str, fn: Callable[..., T], *args: Any) -> T:
+        """Run ``fn(model, *args)`` in a worker thread and record its latency."""
+        model = await self.get(name)
+        entry = self._entries[name]
+        start = time.perf_counter()
+        try:
+            return await asyncio.to_thread(fn, model, *args)
+        finally:
+            entry.inferences += 1
+            entry.inference_seconds += time.perf_counter() - start
+            entry.last_used = time.monotonic()
+
+    async def warm_up(self, names: Iterable[str]) -> Dict[str, Any]:
+        """Load the given models ahead of time, reporting failures per model."""
+        results: Dict[str, Any] = {}
+        for name in names:
+            try:
+                await self.get(name)
+                results[name] = "loaded"
+            except Exception as exc:
+                logger.warning("warm-up of %s failed: %s", name, exc)
+                results[name] = f"error: {exc}"
+        return results
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Return residency and load/inference timings per model."""
+        return {
+            name: {
+                "loaded": entry.model is not None,
+                "loads": entry.loads,
+                "load_seconds": entry.load_seconds,
+                "inferences": entry.inferences,
+                "inference_seconds": entry.inference_seconds,
+            }
+            for name, entry in self._entries.items()
+        }
+
+
+# ----------------------------------------------------------------------
+# Built-in model loaders
+# ----------------------------------------------------------------------
+def _load_mobilenet() -> Dict[str, Any]:
+    from torchvision import models
+    from torchvision.models import MobileNet_V2_Weights
+
+    weights = MobileNet_V2_Weights.DEFAULT
+    model = models.mobilenet_v2(weights=weights)
+    model.eval()
+    return {
+        "model": model,
+        "preprocess": weights.transforms(),
+        "categories": weights.meta["categories"],
+    }
+
+
+def _load_whisper() -> Any:
+    from faster_whisper import WhisperModel
+
+    return WhisperModel("tiny", device="cpu", compute_type="int8")
+
+
+def _load_stable_diffusion() -> Any:
+    model_id = os.getenv("STABLE_DIFFUSION_MODEL")
+    if not model_id:
+        raise RuntimeError("model not configured")
+    from diffusers import StableDiffusionPipeline  # type: ignore
+    import torch  # type: ignore
+
+    return StableDiffusionPipeline.from_pretrained(model_id, torch_dtype=torch.float32)
+
+
+def create_default_registry() -> ModelRegistry:
+    """Return a registry with the models used by ToolManager's media tools."""
+    from config import settings
+
+    registry = ModelRegistry(
+        idle_timeout=settings.model_idle_timeout or None,
+        memory_budget_mb=settings.model_memory_budget_mb or None,
+    )
+    registry.register("mobilenet_v2", _load_mobilenet, size_mb=15)
+    registry.register("whisper_tiny", _load_whisper, size_mb=80)
+    registry.register("stable_diffusion", _load_stable_diffusion, size_mb=4000)
+    return registry
+
+
+default_registry = create_default_registry()
@@ -1,9 +1,36 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List, Optional
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional
 
 from ollama import AsyncClient
 
+from metrics import LLM_ERRORS, LLM_FIRST_TOKEN, LLM_REQUESTS, LLM_TOKEN_RATE, LLM_TOKENS
+from tracing import span
+
+
+def _record(
+    model: str,
+    mode: str,
+    elapsed: float,
+    final: Any = None,
+    chunks: int = 0,
+    generation: Optional[float] = None,
+) -> None:
+    """Record latency and generation speed of one finished request.
+
+    Ollama reports ``eval_count`` and ``eval_duration`` (nanoseconds) on the
+    final response; without them streamed chunks stand in for tokens.
+    """
+    LLM_REQUESTS.observe(elapsed, model, mode)
+    tokens = getattr(final, "eval_count", None) or chunks
+    duration_ns = getattr(final, "eval_duration", None)
+    seconds = duration_ns / 1e9 if duration_ns else generation
+    if tokens:
+        LLM_TOKENS.inc(model, amount=tokens)
+        if seconds:
+            LLM_TOKEN_RATE.observe(tokens / seconds, model)
+
 
 class OllamaLLM:
     """Wrapper mimicking the OpenAI client interface using Ollama."""
@@ -28,7 +55,14 @@ class OllamaLLM:
                 messages: List[Dict[str, str]],
                 temperature: float = 0,
             ) -> Any:
-                resp = await self.outer.client.chat(model=model, messages=messages)
+                start = time.perf_counter()
+                try:
+                    with span("ollama.chat", model=model):
+                        resp = await self.outer.client.chat(model=model, messages=messages)
+                except Exception:
+                    LLM_ERRORS.inc(model)
+                    raise
+                _record(model, "chat", time.perf_counter() - start, resp)
 
                 class Msg:
                     def __init__(self, content: str) -> None:
@@ -47,9 +81,51 @@ class OllamaLLM:
                 )()
 
     async def __call__(self, prompt: str) -> str:
-        resp = await self.client.chat(
-            model=self.model,
-            messages=[{"role": "user", "content": prompt}],
-        )
+        start = time.perf_counter()
+        try:
+            with span("ollama.chat", model=self.model):
+                resp = await self.client.chat(
+                    model=self.model,
+                    messages=[{"role": "user", "content": prompt}],
+                )
+        except Exception:
+            LLM_ERRORS.inc(self.model)
+            raise
+        _record(self.model, "chat", time.perf_counter() - start, resp)
         return resp.message["content"]
 
+    async def stream_chat(
+        self, messages: List[Dict[str, str]], model: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """Yield content fragments as Ollama generates them.
+
+        Time to first token and generation speed are recorded once the
+        stream finishes.
+        """
+        model = model or self.model
+        start = time.perf_counter()
+        first: Optional[float] = None
+        count = 0
+        chunk = None
+        try:
+            chunks = await self.client.chat(model=model, messages=messages, stream=True)
+            async for chunk in chunks:
+                content = chunk.message["content"]
+                if content:
+                    if first is None:
+                        first = time.perf_counter()
+                        LLM_FIRST_TOKEN.observe(first - start, model)
+                    count += 1
+                    yield content
+        except Exception:
+            LLM_ERRORS.inc(model)
+            raise
+        end = time.perf_counter()
+        generation = end - first if first is not None else None
+        _record(model, "stream", end - start, chunk, count, generation)
+
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        """Stream the response to a single user prompt."""
+        async for token in self.stream_chat([{"role": "user", "content": prompt}]):
+            yield token
+
@@ -0,0 +1,144 @@
+"""Main-content text, heading outline and links extracted from page HTML."""
+
+import re
+from typing import Any, Dict, List
+from urllib.parse import urljoin
+
+from bs4 import BeautifulSoup
+
+_DROP_TAGS = [
+    "script", "style", "noscript", "template", "svg", "canvas", "iframe",
+    "form", "button", "nav", "footer", "aside",
+]
+_DROP_ROLES = {"navigation", "banner", "contentinfo", "complementary", "search"}
+_BOILERPLATE = re.compile(
+    r"(^|[-_ ])(nav|navbar|menu|breadcrumbs?|footer|sidebar|cookie|consent|banner|"
+    r"advert|ads?|promo|share|social|related|newsletter|comments?)([-_ ]|$)",
+    re.IGNORECASE,
+)
+_BLOCKS = [
+    "h1", "h2", "h3", "h4", "h5", "h6", "p", "li", "pre", "blockquote",
+    "td", "th", "dt", "dd", "figcaption",
+]
+_HEADINGS = {"h1", "h2", "h3", "h4", "h5", "h6"}
+_SPACES = re.compile(r"[ \t\r\f\v]+")
+
+
+def _is_boilerplate(tag: Any) -> bool:
+    if tag.get("role") in _DROP_ROLES or tag.get("aria-hidden") == "true":
+        return True
+    names = " ".join([tag.get("id") or ""] + list(tag.get("class") or []))
+    return bool(names.strip()) and bool(_BOILERPLATE.search(names))
+
+
+def _main_container(soup: BeautifulSoup) -> Any:
+    """Pick ``<main>``/``<article>`` or the element holding the most paragraph text."""
+    for name in ("main", "article"):
+        found = soup.find(name)
+        if found is not None and len(found.get_text(strip=True)) > 200:
+            return found
+    body = soup.body or soup
+    scores: Dict[int, float] = {}
+    nodes: Dict[int, Any] = {}
+    for p in body.find_all("p"):
+        length = len(p.get_text(strip=True))
+        if length < 25:
+            continue
+        for parent, weight in ((p.parent, 1.0), (p.parent.parent if p.parent else None, 0.5)):
+            if parent is None:
+                continue
+            scores[id(parent)] = scores.get(id(parent), 0.0) + length * weight
+            nodes[id(parent)] = parent
+    if not scores:
+        return body
+    return nodes[max(scores, key=scores.get)]
+
+
+def _clean(text: str) -> str:
+    return _SPACES.sub(" ", text).strip()
+
+
+def extract_readable(html: str, base_url: str = "") -> Dict[str, Any]:
+    """Return ``title``, main-content ``text``, heading ``outline`` and ``links``.
+
+    Scripts, navigation, page headers, footers and elements whose id or class
+    looks like boilerplate are removed before the main container is chosen.
+    Headings are kept in the text as Markdown-style ``#`` lines.
+    """
+    soup = BeautifulSoup(html, "html.parser")
+    title = _clean(soup.title.get_text()) if soup.title else ""
+    for tag in soup(_DROP_TAGS):
+        tag.decompose()
+    # Page headers are chrome, but an article's own header holds its title.
+    for tag in soup("header"):
+        if tag.find_parent(["article", "main"]) is None:
+            tag.decompose()
+    for tag in soup.find_all(["div", "section", "ul", "ol", "table", "span", "p"]):
+        if not tag.decomposed and _is_boilerplate(tag):
+            tag.decompose()
+
+    root = _main_container(soup)
+    blocks: List[str] = []
+    for el in root.find_all(_BLOCKS):
+        if el.find_parent(_BLOCKS) is not None:
+            continue
+        text = _clean(el.get_text(" "))
+        if not text:
+            continue
+        if el.name in _HEADINGS:
+            text = "#" * int(el.name[1]) + " " + text
+        elif el.name == "li":
+            text = "- " + text
+        blocks.append(text)
+    if not blocks:
+        text = _clean(root.get_text(" "))
+        blocks = [text] if text else []
+
+    outline = [
+        {"level": int(h.name[1]), "text": _clean(h.get_text(" "))}
+        for h in soup.find_all(list(_HEADINGS))
+        if _clean(h.get_text(" "))
+    ]
+    links = []
+    seen = set()
+    for a in root.find_all("a", href=True):
+        href = a["href"].strip()
+        if not href or href.startswith(("#", "javascript:", "mailto:")):
+            continue
+        href = urljoin(base_url, href)
+        if href in seen:
+            continue
+        seen.add(href)
+        links.append({"text": _clean(a.get_text(" ")), "href": href})
+    return {"title": title, "text": "\n\n".join(blocks), "outline": outline, "links": links}
+
+
+def paginate(text: str, page_size: int) -> List[str]:
+    """Split ``text`` into pages of at most ``page_size`` characters.
+
+    Pages break between paragraphs where possible; a single paragraph
+    longer than a page is cut at the last space before the limit.
+    Raises ``ValueError`` if ``page_size`` is not positive.
+    """
+    if page_size < 1:
+        raise ValueError("page_size must be at least 1")
+    pages: List[str] = []
+    current = ""
+    for para in text.split("\n\n"):
+        while len(para) > page_size:
+            cut = para.rfind(" ", 0, page_size)
+            cut = cut if cut > 0 else page_size
+            if current:
+                pages.append(current)
+                current = ""
+            pages.append(para[:cut])
+            para = para[cut:].lstrip()
+        candidate = f"{current}\n\n{para}" if current else para
+        if len(candidate) > page_size:
+            pages.append(current)
+            current = para
+        else:
+            current = candidate
+    if current or not pages:
+        pages.append(current)
+    return pages
@@ -0,0 +1,196 @@
+"""Two-level result cache: in-process LRU in front of the SQLite ``cache`` table."""
+
+import hashlib
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+import aiosqlite
+
+from db_writer import WriteBehindCommitter
+
+
+@dataclass
+class CachePolicy:
+    """Expiry rules for one key namespace (the text before the first ``:``)."""
+
+    ttl: Optional[float] = None
+    memory: bool = True
+
+
+DEFAULT_POLICIES: Dict[str, CachePolicy] = {
+    "llm": CachePolicy(ttl=24 * 3600),
+    "llm_prompt": CachePolicy(ttl=24 * 3600, memory=False),
+    "info_search_web": CachePolicy(ttl=3600),
+    "browser_view": CachePolicy(ttl=3600),
+}
+
+
+class LRUCache:
+    """Bounded mapping with least-recently-used eviction and per-entry expiry."""
+
+    def __init__(self, max_entries: int = 1024) -> None:
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, Tuple[str, Optional[float]]]" = OrderedDict()
+
+    def get(self, key: str, now: float) -> Optional[str]:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        value, expires_at = item
+        if expires_at is not None and expires_at <= now:
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: str, expires_at: Optional[float]) -> None:
+        self._data[key] = (value, expires_at)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def pop(self, key: str) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class TieredCache:
+    """Look up keys in memory first, then in SQLite, honouring namespace TTLs.
+
+    The SQLite table is pruned every ``prune_every`` writes: expired rows are
+    deleted and, if more than ``max_rows`` remain, the oldest rows go too.
+    Keys longer than ``max_key_length`` are stored under a SHA-256 digest
+    so oversized keys never bloat the primary-key index.
+    """
+
+    def __init__(
+        self,
+        *,
+        memory_entries: int = 1024,
+        max_rows: int = 10000,
+        prune_every: int = 100,
+        max_key_length: int = 256,
+        policies: Optional[Dict[str, CachePolicy]] = None,
+        default_policy: Optional[CachePolicy] = None,
+    ) -> None:
+        self.memory = LRUCache(memory_entries)
+        self.max_rows = max_rows
+        self.prune_every = prune_every
+        self.max_key_length = max_key_length
+        self.policies = dict(DEFAULT_POLICIES if policies is None else policies)
+        self.default_policy = default_policy or CachePolicy()
+        self.stats: Dict[str, Dict[str, int]] = {}
+        self._conn: Optional[aiosqlite.Connection] = None
+        self._writer: Optional[WriteBehindCommitter] = None
+        self._writes = 0
+
+    async def attach(self, conn: aiosqlite.Connection, writer: WriteBehindCommitter) -> None:
+        """Bind to an open connection, creating or upgrading the table."""
+        self._conn = conn
+        self._writer = writer
+        await conn.execute(
+            """CREATE TABLE IF NOT EXISTS cache (
+                    key TEXT PRIMARY KEY,
+                    value TEXT,
+                    expires_at REAL,
+                    created_at REAL
+            )"""
+        )
+        async with conn.execute("PRAGMA table_info(cache)") as cur:
+            columns = {row[1] for row in await cur.fetchall()}
+        for column in ("expires_at", "created_at"):
+            if column not in columns:
+                await conn.execute(f"ALTER TABLE cache ADD COLUMN {column} REAL")
+        await conn.execute(
+            "CREATE INDEX IF NOT EXISTS cache_created_at ON cache(created_at)"
+        )
+        await conn.commit()
+
+    def bound_key(self, key: str) -> str:
+        """Return ``key`` or, when too long, its namespace plus a digest."""
+        if len(key) <= self.max_key_length:
+            return key
+        namespace = key.split(":", 1)[0] + ":" if ":" in key else ""
+        return f"{namespace}sha256:{hashlib.sha256(key.encode('utf-8')).hexdigest()}"
+
+    def policy_for(self, key: str) -> CachePolicy:
+        namespace = key.split(":", 1)[0] if ":" in key else ""
+        return self.policies.get(namespace, self.default_policy)
+
+    def _count(self, key: str, field: str) -> None:
+        namespace = key.split(":", 1)[0] if ":" in key else ""
+        bucket = self.stats.setdefault(
+            namespace, {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+        )
+        bucket[field] += 1
+
+    async def get(self, key: str) -> Optional[str]:
+        key = self.bound_key(key)
+        now = time.time()
+        policy = self.policy_for(key)
+        if policy.memory:
+            value = self.memory.get(key, now)
+            if value is not None:
+                self._count(key, "memory_hits")
+                return value
+        async with self._conn.execute(
+            "SELECT value, expires_at FROM cache WHERE key=?", (key,)
+        ) as cur:
+            row = await cur.fetchone()
+        if row is None or (row[1] is not None and row[1] <= now):
+            self._count(key, "misses")
+            return None
+        if policy.memory:
+            self.memory.set(key, row[0], row[1])
+        self._count(key, "disk_hits")
+        return row[0]
+
+    async def set(self, key: str, value: str, ttl: Optional[float] = None) -> None:
+        key = self.bound_key(key)
+        now = time.time()
+        policy = self.policy_for(key)
+        ttl = policy.ttl if ttl is None else ttl
+        expires_at = now + ttl if ttl is not None else None
+        if policy.memory:
+            self.memory.set(key, value, expires_at)
+        await self._writer.execute(
+            "REPLACE INTO cache (key, value, expires_at, created_at) VALUES (?, ?, ?, ?)",
+            (key, value, expires_at, now),
+        )
+        self._writes += 1
+        if self._writes % self.prune_every == 0:
+            await self.prune()
+
+    async def delete(self, key: str) -> None:
+        key = self.bound_key(key)
+        self.memory.pop(key)
+        await self._writer.execute("DELETE FROM cache WHERE key=?", (key,))
+
+    async def prune(self) -> None:
+        """Drop expired rows and trim the table to ``max_rows``."""
+        await self._writer.execute(
+            "DELETE FROM cache WHERE expires_at IS NOT NULL AND expires_at <= ?",
+            (time.time(),),
+        )
+        async with self._conn.execute("SELECT COUNT(*) FROM cache") as cur:
+            count = (await cur.fetchone())[0]
+        if count > self.max_rows:
+            await self._writer.execute(
+                "DELETE FROM cache WHERE key IN "
+                "(SELECT key FROM cache ORDER BY created_at, rowid LIMIT ?)",
+                (count - self.max_rows,),
+            )
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return hit/miss counters per namespace and the memory tier size."""
+        return {
+            "memory_entries": len(self.memory),
+            "namespaces": {ns: dict(counts) for ns, counts in self.stats.items()},
+        }
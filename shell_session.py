@@ -0,0 +1,373 @@
+"""Background shell processes with bounded output buffers, and persistent shells."""
+
+import asyncio
+import os
+import re
+import shlex
+import shutil
+import signal
+import tempfile
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+
+class OutputBuffer:
+    """Ring buffer of interleaved stdout/stderr chunks addressed by byte offset.
+
+    Offsets count every byte ever written to either stream, so a reader can
+    resume from the offset it last saw. Once more than ``max_bytes`` are
+    retained the oldest output is dropped and reads starting before it are
+    flagged as ``truncated``.
+    """
+
+    def __init__(self, max_bytes: int = 1 << 20) -> None:
+        self.max_bytes = max_bytes
+        self.start = 0
+        self.end = 0
+        self._size = 0
+        self._chunks: Deque[Tuple[int, str, bytes]] = deque()
+
+    def append(self, stream: str, data: bytes) -> None:
+        if len(data) > self.max_bytes:
+            skipped = len(data) - self.max_bytes
+            self.end += skipped
+            data = data[skipped:]
+        self._chunks.append((self.end, stream, data))
+        self.end += len(data)
+        self._size += len(data)
+        while self._size > self.max_bytes:
+            offset, _, old = self._chunks.popleft()
+            self._size -= len(old)
+            self.start = offset + len(old)
+        if not self._chunks:
+            self.start = self.end
+
+    def read(self, since: int = 0) -> Dict[str, Any]:
+        """Return output written at or after ``since`` and the offset to resume from."""
+        truncated = since < self.start
+        since = max(since, self.start)
+        out = {"stdout": bytearray(), "stderr": bytearray()}
+        for offset, stream, data in self._chunks:
+            if offset + len(data) <= since:
+                continue
+            out[stream] += data[max(0, since - offset):]
+        return {
+            "stdout": out["stdout"].decode(errors="replace"),
+            "stderr": out["stderr"].decode(errors="replace"),
+            "offset": self.end,
+            "truncated": truncated,
+        }
+
+
+class ShellSession:
+    """A subprocess plus reader tasks copying its output into an ``OutputBuffer``.
+
+    Viewing never blocks on the process: it returns whatever the readers
+    have collected so far. ``finished_at`` is set once the process has
+    exited and its pipes are drained.
+    """
+
+    drain_timeout = 1.0
+
+    def __init__(self, process: asyncio.subprocess.Process, max_bytes: int = 1 << 20) -> None:
+        self.process = process
+        self.output = OutputBuffer(max_bytes)
+        self.cursor = 0
+        self.finished_at: Optional[float] = None
+        self._readers = [
+            asyncio.create_task(self._drain(process.stdout, "stdout")),
+            asyncio.create_task(self._drain(process.stderr, "stderr")),
+        ]
+        self._watcher = asyncio.create_task(self._watch())
+
+    async def _drain(self, stream: Optional[asyncio.StreamReader], name: str) -> None:
+        if stream is None:
+            return
+        while True:
+            data = await stream.read(65536)
+            if not data:
+                break
+            self.output.append(name, data)
+
+    async def _watch(self) -> None:
+        await self.process.wait()
+        # Background children may keep the pipes open after the shell exits.
+        _, pending = await asyncio.wait(self._readers, timeout=self.drain_timeout)
+        for task in pending:
+            task.cancel()
+        self.finished_at = time.monotonic()
+
+    @property
+    def running(self) -> bool:
+        return self.finished_at is None
+
+    def view(self, since: Optional[int] = None) -> Dict[str, Any]:
+        """Return output after ``since``, or after the previous view when omitted."""
+        result = self.output.read(self.cursor if since is None else since)
+        self.cursor = result["offset"]
+        result["running"] = self.running
+        result["returncode"] = self.process.returncode
+        return result
+
+    async def wait(self) -> Dict[str, Any]:
+        """Wait for exit and return the retained output from the beginning."""
+        await asyncio.shield(self._watcher)
+        result = self.output.read(0)
+        result["returncode"] = self.process.returncode
+        return result
+
+    async def kill(self) -> None:
+        """Kill the process and, when it leads its own session, its children."""
+        if self.process.returncode is None:
+            try:
+                os.killpg(self.process.pid, signal.SIGKILL)
+            except (OSError, AttributeError):
+                self.process.kill()
+        await asyncio.shield(self._watcher)
+
+
+class PersistentShell:
+    """Interactive bash on a pseudo-terminal that keeps state between commands.
+
+    Each command is written to a script file and sourced, followed by a
+    ``printf`` of a random sentinel carrying ``$?``, so its output and exit
+    code are framed without restarting the shell. Only that short control
+    line passes through the terminal, so long commands are never cut by
+    the line discipline, and it is written without blocking the event
+    loop. A command running past its timeout gets SIGINT in the terminal's
+    foreground process group; if the sentinel still does not arrive, the
+    shell is killed.
+    """
+
+    interrupt_grace = 2.0
+
+    def __init__(self, process: asyncio.subprocess.Process, master_fd: int, max_bytes: int = 1 << 20) -> None:
+        self.process = process
+        self.max_bytes = max_bytes
+        self.last_used = time.monotonic()
+        self.lock = asyncio.Lock()
+        self._fd = master_fd
+        self._buf = bytearray()
+        self._data = asyncio.Event()
+        self._eof = False
+        self._dir = tempfile.mkdtemp(prefix="cappuccino-shell-")
+        self._script = os.path.join(self._dir, "command.sh")
+        os.set_blocking(master_fd, False)
+        asyncio.get_running_loop().add_reader(master_fd, self._on_readable)
+
+    @classmethod
+    async def start(cls, cwd: Optional[str] = None, max_bytes: int = 1 << 20) -> "PersistentShell":
+        import pty
+        import termios
+
+        master, slave = pty.openpty()
+        attrs = termios.tcgetattr(slave)
+        attrs[3] &= ~termios.ECHO
+        termios.tcsetattr(slave, termios.TCSANOW, attrs)
+        env = dict(os.environ, PS1="", PS2="", TERM="dumb")
+        try:
+            process = await asyncio.create_subprocess_exec(
+                "bash", "--noprofile", "--norc", "--noediting", "-i",
+                stdin=slave, stdout=slave, stderr=slave,
+                cwd=cwd, env=env, start_new_session=True,
+            )
+        except Exception:
+            os.close(master)
+            raise
+        finally:
+            os.close(slave)
+        shell = cls(process, master, max_bytes)
+        # Swallow anything bash prints while starting up.
+        await shell.run("true", timeout=10)
+        return shell
+
+    def _on_readable(self) -> None:
+        try:
+            data = os.read(self._fd, 65536)
+        except BlockingIOError:
+            return
+        except OSError:
+            data = b""
+        if not data:
+            self._eof = True
+            asyncio.get_running_loop().remove_reader(self._fd)
+        else:
+            self._buf += data
+        self._data.set()
+
+    @property
+    def alive(self) -> bool:
+        return not self._eof and self.process.returncode is None
+
+    async def _send(self, data: bytes) -> None:
+        """Write ``data`` to the terminal, waiting for room instead of blocking."""
+        loop = asyncio.get_running_loop()
+        view = memoryview(data)
+        while view:
+            try:
+                view = view[os.write(self._fd, view):]
+                continue
+            except BlockingIOError:
+                pass
+            writable = loop.create_future()
+            loop.add_writer(self._fd, writable.set_result, None)
+            try:
+                await writable
+            finally:
+                loop.remove_writer(self._fd)
+
+    async def run(self, command: str, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Run ``command`` and return its combined ``output`` and ``returncode``."""
+        if not self.alive:
+            raise RuntimeError("shell has exited")
+        token = os.urandom(8).hex()
+        sentinel = re.compile(rb"(?:\r?\n)?__CAPPUCCINO_" + token.encode() + rb"_(\d+)__\r?\n")
+        self._buf.clear()
+        self.last_used = time.monotonic()
+        with open(self._script, "w", encoding="utf-8") as fh:
+            fh.write(command + "\n")
+        await self._send(
+            f". {shlex.quote(self._script)}\n"
+            f"printf '\\n__CAPPUCCINO_{token}_%s__\\n' \"$?\"\n".encode()
+        )
+
+        truncated = False
+        interrupted = False
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            match = sentinel.search(self._buf)
+            if match:
+                output = bytes(self._buf[:match.start()])
+                returncode = int(match.group(1))
+                del self._buf[:match.end()]
+                break
+            if len(self._buf) > self.max_bytes + 128:
+                del self._buf[:len(self._buf) - self.max_bytes]
+                truncated = True
+            if self._eof:
+                raise RuntimeError("shell exited while running command")
+            self._data.clear()
+            remaining = None if deadline is None else deadline - time.monotonic()
+            try:
+                await asyncio.wait_for(self._data.wait(), remaining)
+            except asyncio.TimeoutError:
+                if interrupted:
+                    await self.close()
+                    return {
+                        "output": self._decode(bytes(self._buf)),
+                        "returncode": None,
+                        "error": "timeout",
+                    }
+                interrupted = True
+                self._interrupt()
+                deadline = time.monotonic() + self.interrupt_grace
+        self.last_used = time.monotonic()
+        result: Dict[str, Any] = {"output": self._decode(output), "returncode": returncode}
+        if truncated:
+            result["truncated"] = True
+        if interrupted:
+            result["error"] = "timeout"
+        return result
+
+    @staticmethod
+    def _decode(data: bytes) -> str:
+        return data.decode(errors="replace").replace("\r\n", "\n")
+
+    def _interrupt(self) -> None:
+        try:
+            os.killpg(os.tcgetpgrp(self._fd), signal.SIGINT)
+        except OSError:
+            pass
+
+    async def close(self) -> None:
+        if self.process.returncode is None:
+            try:
+                os.killpg(self.process.pid, signal.SIGKILL)
+            except OSError:
+                self.process.kill()
+            await self.process.wait()
+        if self._fd >= 0:
+            if not self._eof:
+                asyncio.get_running_loop().remove_reader(self._fd)
+            os.close(self._fd)
+            self._fd = -1
+            self._eof = True
+        shutil.rmtree(self._dir, ignore_errors=True)
+
+
+class ShellPool:
+    """Persistent shells keyed by session id with idle eviction and a size cap.
+
+    Shells idle for ``idle_timeout`` seconds are closed on the next pool
+    access; when ``max_sessions`` are open, the least recently used idle
+    shell makes room for a new one. Concurrent requests for a session that
+    is still starting wait for the same shell.
+    """
+
+    def __init__(self, max_sessions: int = 8, idle_timeout: Optional[float] = 600, max_bytes: int = 1 << 20) -> None:
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.max_bytes = max_bytes
+        self.shells: Dict[str, PersistentShell] = {}
+        self._starting: Dict[str, "asyncio.Future[PersistentShell]"] = {}
+
+    async def evict_idle(self, now: Optional[float] = None) -> None:
+        now = time.monotonic() if now is None else now
+        for sid, shell in list(self.shells.items()):
+            expired = self.idle_timeout is not None and now - shell.last_used > self.idle_timeout
+            if not shell.alive or (expired and not shell.lock.locked()):
+                await self.close(sid)
+
+    async def get(self, session_id: str, cwd: Optional[str] = None) -> PersistentShell:
+        """Return the session's shell, starting one in ``cwd`` if needed."""
+        await self.evict_idle()
+        while True:
+            # Re-check after every await: another caller may have started the shell.
+            shell = self.shells.get(session_id)
+            if shell is not None:
+                return shell
+            pending = self._starting.get(session_id)
+            if pending is not None:
+                return await asyncio.shield(pending)
+            if len(self.shells) + len(self._starting) < self.max_sessions:
+                break
+            idle = sorted(
+                (s.last_used, sid) for sid, s in self.shells.items() if not s.lock.locked()
+            )
+            if not idle:
+                raise RuntimeError("too many busy shell sessions")
+            await self.close(idle[0][1])
+        pending = asyncio.ensure_future(self._start(session_id, cwd))
+        self._starting[session_id] = pending
+        return await asyncio.shield(pending)
+
+    async def _start(self, session_id: str, cwd: Optional[str]) -> PersistentShell:
+        try:
+            shell = await PersistentShell.start(cwd, self.max_bytes)
+            self.shells[session_id] = shell
+            return shell
+        finally:
+            self._starting.pop(session_id, None)
+
+    async def run(
+        self, session_id: str, command: str, cwd: Optional[str] = None, timeout: Optional[float] = None
+    ) -> Dict[str, Any]:
+        shell = await self.get(session_id, cwd)
+        async with shell.lock:
+            result = await shell.run(command, timeout)
+        if not shell.alive:
+            self.shells.pop(session_id, None)
+        return result
+
+    async def close(self, session_id: str) -> bool:
+        shell = self.shells.pop(session_id, None)
+        if shell is None:
+            return False
+        await shell.close()
+        return True
+
+    async def close_all(self) -> None:
+        await asyncio.gather(*self._starting.values(), return_exceptions=True)
+        for sid in list(self.shells):
+            await self.close(sid)
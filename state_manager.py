@@ -1,83 +1,253 @@
-
+import asyncio
 import aiosqlite
 import json
-from typing import Any, Dict, List, Optional
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
 
+from db_writer import WriteBehindCommitter
 from knowledge_graph import KnowledgeGraph
+from metrics import DB_SECONDS, DB_WRITES
+from tracing import span
 
 class StateManager:
-    """Persist and restore Cappuccino agent state using SQLite."""
-    def __init__(self, db_path: str = "agent_state.db") -> None:
+    """Persist and restore Cappuccino agent state using SQLite.
+
+    Conversation history is stored one row per message in ``agent_history``
+    so appending a message costs a single INSERT regardless of how long the
+    conversation already is.
+
+    ``shared`` returns a connection and its :class:`WriteBehindCommitter`
+    owned by someone else, usually a :class:`ToolManager` on the same file.
+    Writes then join that connection's group commits instead of waiting
+    for the write lock a deferred commit holds; the connection is left open
+    by :meth:`close`.
+    """
+    def __init__(
+        self,
+        db_path: str = "agent_state.db",
+        *,
+        shared: Optional[Callable[[], Awaitable[Tuple[aiosqlite.Connection, WriteBehindCommitter]]]] = None,
+    ) -> None:
         self.db_path = db_path
+        self._shared = shared
         self._conn: Optional[aiosqlite.Connection] = None
+        self._writer: Optional[WriteBehindCommitter] = None
+        self._history_len = 0
+        self._graph_ready = False
+        self._conn_lock = asyncio.Lock()
 
     async def _get_conn(self) -> aiosqlite.Connection:
-        if self._conn is None:
-            self._conn = await aiosqlite.connect(self.db_path)
-            await self._conn.execute(
-                """CREATE TABLE IF NOT EXISTS agent_state (
-                        key TEXT PRIMARY KEY,
-                        value TEXT
-                )"""
-            )
-            await self._conn.execute(
-                """CREATE TABLE IF NOT EXISTS long_term_plan (
-                        id INTEGER PRIMARY KEY,
-                        plan TEXT,
-                        current_step INTEGER
-                )"""
-            )
-            await self._conn.commit()
+        if self._shared is not None:
+            conn, writer = await self._shared()
+            if conn is self._conn:
+                return conn
+            async with self._conn_lock:
+                if conn is not self._conn:
+                    self._writer = writer
+                    self._graph_ready = False
+                    await self._open(conn)
+            return conn
+        if self._conn is not None:
+            return self._conn
+        async with self._conn_lock:
+            if self._conn is None:
+                await self._open(await aiosqlite.connect(self.db_path))
         return self._conn
 
+    async def _commit(self, conn: aiosqlite.Connection) -> None:
+        if self._writer is not None:
+            await self._writer.mark()
+        else:
+            await conn.commit()
+
+    async def _open(self, conn: aiosqlite.Connection) -> None:
+        """Create tables and migrate legacy history blobs on ``conn``."""
+        await conn.execute(
+            """CREATE TABLE IF NOT EXISTS agent_state (
+                    key TEXT PRIMARY KEY,
+                    value TEXT
+            )"""
+        )
+        await conn.execute(
+            """CREATE TABLE IF NOT EXISTS agent_history (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    role TEXT,
+                    content TEXT,
+                    extra TEXT
+            )"""
+        )
+        await conn.execute(
+            """CREATE TABLE IF NOT EXISTS long_term_plan (
+                    id INTEGER PRIMARY KEY,
+                    plan TEXT,
+                    current_step INTEGER
+            )"""
+        )
+        await self._migrate_history_blob(conn)
+        await self._commit(conn)
+        async with conn.execute("SELECT COUNT(*) FROM agent_history") as cur:
+            row = await cur.fetchone()
+        self._history_len = row[0] if row else 0
+        self._conn = conn
+
+    async def _migrate_history_blob(self, conn: aiosqlite.Connection) -> None:
+        """Move a legacy JSON ``history`` blob from ``agent_state`` into rows."""
+        async with conn.execute(
+            "SELECT value FROM agent_state WHERE key='history'"
+        ) as cur:
+            row = await cur.fetchone()
+        if not row:
+            return
+        await conn.executemany(
+            "INSERT INTO agent_history (role, content, extra) VALUES (?, ?, ?)",
+            [self._message_to_row(msg) for msg in json.loads(row[0] or "[]")],
+        )
+        await conn.execute("DELETE FROM agent_state WHERE key='history'")
+
+    @staticmethod
+    def _message_to_row(message: Dict[str, Any]) -> tuple:
+        extra = {k: v for k, v in message.items() if k not in ("role", "content")}
+        return (
+            message.get("role"),
+            message.get("content"),
+            json.dumps(extra) if extra else None,
+        )
+
+    @staticmethod
+    def _row_to_message(row: tuple) -> Dict[str, Any]:
+        message: Dict[str, Any] = {"role": row[0], "content": row[1]}
+        if row[2]:
+            message.update(json.loads(row[2]))
+        return message
+
     async def load(self) -> Dict[str, Any]:
         conn = await self._get_conn()
         async with conn.execute("SELECT key, value FROM agent_state") as cur:
             rows = await cur.fetchall()
         data = {k: v for k, v in rows}
         task_plan = json.loads(data.get("task_plan", "[]"))
-        history = json.loads(data.get("history", "[]"))
+        history = await self.load_history()
         phase = int(data.get("phase", "0"))
         return {"task_plan": task_plan, "history": history, "phase": phase}
 
     async def save(self, task_plan: List[Dict[str, Any]], history: List[Dict[str, Any]], phase: int) -> None:
+        conn = await self._get_conn()
+        start = time.perf_counter()
+        with span("state.save", messages=len(history)):
+            await conn.execute(
+                "REPLACE INTO agent_state (key, value) VALUES (?, ?)",
+                ("task_plan", json.dumps(task_plan)),
+            )
+            await conn.execute(
+                "REPLACE INTO agent_state (key, value) VALUES (?, ?)",
+                ("phase", str(phase)),
+            )
+            await self._sync_history(conn, history)
+            await self._commit(conn)
+        DB_SECONDS.observe(time.perf_counter() - start, "state_save")
+        DB_WRITES.inc("state_save")
+
+    async def close(self) -> None:
+        conn, self._conn, self._writer = self._conn, None, None
+        if conn is not None and self._shared is None:
+            await conn.close()
+
+    # ------------------------------------------------------------------
+    # Conversation history
+    # ------------------------------------------------------------------
+    async def append_message(self, message: Dict[str, Any]) -> None:
+        """Append a single message to the stored history."""
+        conn = await self._get_conn()
+        self._history_len += 1
+        start = time.perf_counter()
+        with span("state.history_insert"):
+            await conn.execute(
+                "INSERT INTO agent_history (role, content, extra) VALUES (?, ?, ?)",
+                self._message_to_row(message),
+            )
+            await self._commit(conn)
+        DB_SECONDS.observe(time.perf_counter() - start, "history_insert")
+        DB_WRITES.inc("history_insert")
+
+    async def save_history(self, history: List[Dict[str, Any]]) -> None:
+        """Persist ``history``, writing only messages not stored yet.
+
+        ``history`` is assumed to extend the stored history. If it is shorter
+        than what is stored the table is rewritten from scratch.
+        """
+        conn = await self._get_conn()
+        await self._sync_history(conn, history)
+        await self._commit(conn)
+
+    async def _sync_history(self, conn: aiosqlite.Connection, history: List[Dict[str, Any]]) -> None:
+        # Claim the pending range before awaiting so concurrent callers
+        # never insert the same messages twice.
+        start = self._history_len
+        self._history_len = len(history)
+        if len(history) < start:
+            await conn.execute("DELETE FROM agent_history")
+            start = 0
+        if len(history) > start:
+            await conn.executemany(
+                "INSERT INTO agent_history (role, content, extra) VALUES (?, ?, ?)",
+                [self._message_to_row(msg) for msg in history[start:]],
+            )
+
+    async def load_history(self, offset: int = 0, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Return stored messages in insertion order, optionally paged."""
+        conn = await self._get_conn()
+        async with conn.execute(
+            "SELECT role, content, extra FROM agent_history ORDER BY id LIMIT ? OFFSET ?",
+            (-1 if limit is None else limit, offset),
+        ) as cur:
+            rows = await cur.fetchall()
+        return [self._row_to_message(row) for row in rows]
+
+    async def history_length(self) -> int:
+        """Return the number of stored messages."""
+        await self._get_conn()
+        return self._history_len
+
+    async def save_task_plan(self, task_plan: List[Dict[str, Any]]) -> None:
+        """Persist the task plan without touching history or phase."""
         conn = await self._get_conn()
         await conn.execute(
             "REPLACE INTO agent_state (key, value) VALUES (?, ?)",
             ("task_plan", json.dumps(task_plan)),
         )
-        await conn.execute(
-            "REPLACE INTO agent_state (key, value) VALUES (?, ?)",
-            ("history", json.dumps(history)),
-        )
+        await self._commit(conn)
+
+    async def save_phase(self, phase: int) -> None:
+        """Persist the current phase without touching plan or history."""
+        conn = await self._get_conn()
         await conn.execute(
             "REPLACE INTO agent_state (key, value) VALUES (?, ?)",
             ("phase", str(phase)),
         )
-        await conn.commit()
-
-    async def close(self) -> None:
-        if self._conn is not None:
-            await self._conn.close()
-            self._conn = None
+        await self._commit(conn)
 
 
     # Planner convenience methods
     async def save_plan(self, task_plan: List[Dict[str, Any]], current_step: int = 0) -> None:
         """Persist a task plan and current step."""
-        data = await self.load()
-        history = data.get("history", [])
-        await self.save(task_plan, history, current_step)
+        await self.save_task_plan(task_plan)
+        await self.save_phase(current_step)
 
     async def load_plan(self) -> Dict[str, Any]:
         """Load just the task plan and current step."""
-        data = await self.load()
-        return {"task_plan": data.get("task_plan", []), "current_step": data.get("phase", 0)}
+        conn = await self._get_conn()
+        async with conn.execute(
+            "SELECT key, value FROM agent_state WHERE key IN ('task_plan', 'phase')"
+        ) as cur:
+            data = {k: v for k, v in await cur.fetchall()}
+        return {
+            "task_plan": json.loads(data.get("task_plan", "[]")),
+            "current_step": int(data.get("phase", "0")),
+        }
 
     async def update_step(self, step: int) -> None:
         """Update the current step while preserving plan and history."""
-        data = await self.load()
-        await self.save(data.get("task_plan", []), data.get("history", []), step)
+        await self.save_phase(step)
 
     # ------------------------------------------------------------------
     # ------------------------------------------------------------------
@@ -96,7 +266,7 @@ class StateManager:
             """,
             (json.dumps(plan), current_step),
         )
-        await conn.commit()
+        await self._commit(conn)
 
     async def load_long_term_plan(self) -> Dict[str, Any]:
         """Return the stored long-term plan and current progress."""
@@ -116,34 +286,216 @@ class StateManager:
             "UPDATE long_term_plan SET current_step=? WHERE id=1",
             (step,),
         )
-        await conn.commit()
+        await self._commit(conn)
 
     # ------------------------------------------------------------------
     # Knowledge graph persistence
     # ------------------------------------------------------------------
-
-    async def load_graph(self) -> KnowledgeGraph:
-        """Load the persisted knowledge graph or return an empty one."""
+    async def _graph_conn(self) -> aiosqlite.Connection:
         conn = await self._get_conn()
-        await conn.execute(
-            "CREATE TABLE IF NOT EXISTS knowledge_graph (id INTEGER PRIMARY KEY, data TEXT)"
-        )
+        if not self._graph_ready:
+            await conn.execute(
+                """CREATE TABLE IF NOT EXISTS graph_nodes (
+                        name TEXT PRIMARY KEY,
+                        attrs TEXT
+                )"""
+            )
+            await conn.execute(
+                """CREATE TABLE IF NOT EXISTS graph_edges (
+                        source TEXT,
+                        target TEXT,
+                        relation TEXT,
+                        attrs TEXT,
+                        PRIMARY KEY (source, target, relation)
+                )"""
+            )
+            await conn.execute(
+                "CREATE INDEX IF NOT EXISTS graph_edges_target ON graph_edges(target, relation)"
+            )
+            await conn.execute(
+                "CREATE INDEX IF NOT EXISTS graph_edges_relation ON graph_edges(relation, target)"
+            )
+            await self._migrate_graph_blob(conn)
+            await self._commit(conn)
+            self._graph_ready = True
+        return conn
+
+    async def _migrate_graph_blob(self, conn: aiosqlite.Connection) -> None:
+        """Move a legacy JSON graph from ``knowledge_graph`` into row tables."""
         async with conn.execute(
-            "SELECT data FROM knowledge_graph WHERE id=1"
+            "SELECT name FROM sqlite_master WHERE type='table' AND name='knowledge_graph'"
         ) as cur:
+            if await cur.fetchone() is None:
+                return
+        async with conn.execute("SELECT data FROM knowledge_graph WHERE id=1") as cur:
             row = await cur.fetchone()
         if row and row[0]:
-            return KnowledgeGraph.from_json(row[0])
-        return KnowledgeGraph()
+            await self._write_graph(conn, KnowledgeGraph.from_json(row[0]))
+        await conn.execute("DROP TABLE knowledge_graph")
+
+    async def _write_graph(self, conn: aiosqlite.Connection, graph: KnowledgeGraph) -> None:
+        await conn.execute("DELETE FROM graph_nodes")
+        await conn.execute("DELETE FROM graph_edges")
+        await conn.executemany(
+            "INSERT INTO graph_nodes (name, attrs) VALUES (?, ?)",
+            [(name, json.dumps(attrs)) for name, attrs in graph.graph.nodes(data=True)],
+        )
+        await conn.executemany(
+            "INSERT INTO graph_edges (source, target, relation, attrs) VALUES (?, ?, ?, ?)",
+            [
+                (src, tgt, key, json.dumps(attrs))
+                for src, tgt, key, attrs in graph.graph.edges(keys=True, data=True)
+            ],
+        )
+
+    async def load_graph(self) -> KnowledgeGraph:
+        """Load the persisted knowledge graph or return an empty one."""
+        conn = await self._graph_conn()
+        graph = KnowledgeGraph()
+        async with conn.execute("SELECT name, attrs FROM graph_nodes") as cur:
+            async for name, attrs in cur:
+                graph.add_entity(name, **json.loads(attrs or "{}"))
+        async with conn.execute(
+            "SELECT source, target, relation, attrs FROM graph_edges"
+        ) as cur:
+            async for src, tgt, rel, attrs in cur:
+                graph.add_relation(src, tgt, rel, **json.loads(attrs or "{}"))
+        return graph
 
     async def save_graph(self, graph: KnowledgeGraph) -> None:
-        """Persist the knowledge graph."""
-        conn = await self._get_conn()
+        """Persist the whole knowledge graph, replacing what is stored."""
+        conn = await self._graph_conn()
+        await self._write_graph(conn, graph)
+        await self._commit(conn)
+
+    async def upsert_graph_node(self, name: str, attrs: Dict[str, Any]) -> None:
+        """Insert or update a single entity row."""
+        conn = await self._graph_conn()
+        await conn.execute(
+            "INSERT INTO graph_nodes (name, attrs) VALUES (?, ?)"
+            " ON CONFLICT(name) DO UPDATE SET attrs=excluded.attrs",
+            (name, json.dumps(attrs)),
+        )
+        await self._commit(conn)
+
+    async def upsert_graph_edge(
+        self, source: str, target: str, relation: str, attrs: Dict[str, Any]
+    ) -> None:
+        """Insert or update a single relation row, creating missing entities."""
+        conn = await self._graph_conn()
+        await conn.executemany(
+            "INSERT OR IGNORE INTO graph_nodes (name, attrs) VALUES (?, '{}')",
+            [(source,), (target,)],
+        )
         await conn.execute(
-            "CREATE TABLE IF NOT EXISTS knowledge_graph (id INTEGER PRIMARY KEY, data TEXT)"
+            "INSERT INTO graph_edges (source, target, relation, attrs) VALUES (?, ?, ?, ?)"
+            " ON CONFLICT(source, target, relation) DO UPDATE SET attrs=excluded.attrs",
+            (source, target, relation, json.dumps(attrs)),
         )
+        await self._commit(conn)
+
+    async def delete_graph_edge(self, source: str, target: str, relation: str) -> None:
+        """Delete a single relation row."""
+        conn = await self._graph_conn()
+        await conn.execute(
+            "DELETE FROM graph_edges WHERE source=? AND target=? AND relation=?",
+            (source, target, relation),
+        )
+        await self._commit(conn)
+
+    async def delete_graph_node(self, name: str) -> None:
+        """Delete an entity row together with its relations."""
+        conn = await self._graph_conn()
         await conn.execute(
-            "INSERT INTO knowledge_graph(id, data) VALUES(1, ?) ON CONFLICT(id) DO UPDATE SET data=excluded.data",
-            (graph.to_json(),),
+            "DELETE FROM graph_edges WHERE source=? OR target=?", (name, name)
         )
-        await conn.commit()
+        await conn.execute("DELETE FROM graph_nodes WHERE name=?", (name,))
+        await self._commit(conn)
+
+    # ------------------------------------------------------------------
+    # Knowledge graph queries
+    # ------------------------------------------------------------------
+    async def find_graph_edges(
+        self,
+        source: Optional[str] = None,
+        relation: Optional[str] = None,
+        target: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> List[Tuple[str, str, str]]:
+        """Return ``(source, relation, target)`` rows matching the given fields."""
+        conn = await self._graph_conn()
+        clauses = []
+        params: List[Any] = []
+        for column, value in (("source", source), ("relation", relation), ("target", target)):
+            if value is not None:
+                clauses.append(f"{column}=?")
+                params.append(value)
+        sql = "SELECT source, relation, target FROM graph_edges"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " LIMIT ?"
+        params.append(-1 if limit is None else limit)
+        async with conn.execute(sql, params) as cur:
+            return [tuple(row) for row in await cur.fetchall()]
+
+    async def match_graph_patterns(
+        self, patterns: Sequence[Tuple[str, str, str]], limit: Optional[int] = None
+    ) -> List[Dict[str, str]]:
+        """Return variable bindings for ``(source, relation, target)`` patterns.
+
+        Terms starting with ``?`` are variables. The patterns are compiled
+        into one self-join of ``graph_edges`` joined on shared variables, so
+        SQLite plans the lookups and stops after ``limit`` rows.
+        """
+        conn = await self._graph_conn()
+        columns: Dict[str, str] = {}
+        clauses: List[str] = []
+        params: List[Any] = []
+        for i, pattern in enumerate(patterns):
+            for column, term in zip(("source", "relation", "target"), pattern):
+                ref = f"e{i}.{column}"
+                if not term.startswith("?"):
+                    clauses.append(f"{ref}=?")
+                    params.append(term)
+                elif term in columns:
+                    clauses.append(f"{ref}={columns[term]}")
+                else:
+                    columns[term] = ref
+        names = list(columns)
+        sql = "SELECT " + (", ".join(columns[n] for n in names) or "1")
+        sql += " FROM " + ", ".join(f"graph_edges AS e{i}" for i in range(len(patterns)))
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " LIMIT ?"
+        params.append(-1 if limit is None else limit)
+        async with conn.execute(sql, params) as cur:
+            rows = await cur.fetchall()
+        return [{n[1:]: v for n, v in zip(names, row)} for row in rows]
+
+    async def expand_graph_frontier(
+        self,
+        nodes: Iterable[str],
+        direction: str = "out",
+        relations: Optional[List[str]] = None,
+    ) -> List[Tuple[str, str, str]]:
+        """Return edges leaving (``out``) or entering (``in``) any of ``nodes``."""
+        if direction not in ("out", "in"):
+            raise ValueError("direction must be 'out' or 'in'")
+        conn = await self._graph_conn()
+        column = "source" if direction == "out" else "target"
+        nodes = list(nodes)
+        edges: List[Tuple[str, str, str]] = []
+        # Stay well below SQLite's bound-parameter limit.
+        for start in range(0, len(nodes), 500):
+            chunk = nodes[start:start + 500]
+            sql = (
+                "SELECT source, relation, target FROM graph_edges "
+                f"WHERE {column} IN ({','.join('?' * len(chunk))})"
+            )
+            params: List[Any] = list(chunk)
+            if relations:
+                sql += f" AND relation IN ({','.join('?' * len(relations))})"
+                params.extend(relations)
+            async with conn.execute(sql, params) as cur:
+                edges.extend(tuple(row) for row in await cur.fetchall())
+        return edges
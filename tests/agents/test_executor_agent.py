@@ -25,3 +25,140 @@ async def test_execute_with_llm():
     end = await result_q.get()
     assert item == {"step": 1, "result": "HELLO"}
     assert end is None
+
+
+@pytest.mark.asyncio
+async def test_execute_runs_steps_concurrently_in_order():
+    async def slow_llm(text):
+        await asyncio.sleep(0.1 if text == "first" else 0.01)
+        return text
+
+    plan_q = asyncio.Queue()
+    result_q = asyncio.Queue()
+    for idx, action in enumerate(["first", "second", "third"], start=1):
+        await plan_q.put({"step": idx, "action": action})
+    await plan_q.put(None)
+
+    agent = ExecutorAgent(tool_manager=None, llm=slow_llm, max_workers=3)
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    await agent.execute(plan_q, result_q)
+    assert loop.time() - start < 0.2
+
+    results = [await result_q.get() for _ in range(4)]
+    assert [r and r["result"] for r in results] == ["first", "second", "third", None]
+
+
+@pytest.mark.asyncio
+async def test_execute_respects_dependencies_and_timeouts():
+    order = []
+
+    async def fake_llm(text):
+        if text == "hang":
+            await asyncio.sleep(1)
+        order.append(text)
+        return text
+
+    plan_q = asyncio.Queue()
+    result_q = asyncio.Queue()
+    await plan_q.put({"step": 1, "action": "after", "depends_on": [2]})
+    await plan_q.put({"step": 2, "action": "before"})
+    await plan_q.put({"step": 3, "action": "hang"})
+    await plan_q.put({"step": 4, "action": "blocked", "depends_on": [3]})
+    await plan_q.put(None)
+
+    agent = ExecutorAgent(tool_manager=None, llm=fake_llm, step_timeout=0.05)
+    await agent.execute(plan_q, result_q)
+
+    results = [await result_q.get() for _ in range(4)]
+    assert order == ["before", "after"]
+    assert results[0] == {"step": 1, "result": "after"}
+    assert results[2] == {"step": 3, "error": "timeout"}
+    assert results[3] == {"step": 4, "error": "dependency 3 failed"}
+
+
+@pytest.mark.asyncio
+async def test_execute_fractal_plan_as_dag():
+    from fractal_planner import FractalPlanner
+
+    done = []
+
+    async def fake_llm(text):
+        done.append(text)
+        return text
+
+    plan = FractalPlanner(depth=2, breadth=2).create_plan("collect data. analyze results")
+    assert plan[0]["depends_on"] == ["1.1"]
+    plan_q = asyncio.Queue()
+    result_q = asyncio.Queue()
+    for step in plan:
+        await plan_q.put(step)
+    await plan_q.put(None)
+
+    await ExecutorAgent(tool_manager=None, llm=fake_llm).execute(plan_q, result_q)
+    steps = []
+    while (item := await result_q.get()) is not None:
+        steps.append(item["step"])
+    assert steps == ["1.1", 1, "2.1", 2]
+
+
+@pytest.mark.asyncio
+async def test_execute_rejects_cycles_and_reports_llm_errors():
+    async def fake_llm(text):
+        if text == "boom":
+            raise ValueError("model unavailable")
+        return text
+
+    plan_q = asyncio.Queue()
+    result_q = asyncio.Queue()
+    await plan_q.put({"step": 1, "action": "a", "depends_on": [2]})
+    await plan_q.put({"step": 2, "action": "b", "depends_on": [1]})
+    await plan_q.put({"step": 3, "action": "self", "depends_on": [3]})
+    await plan_q.put({"step": 4, "action": "boom"})
+    await plan_q.put({"step": 5, "action": "after cycle", "depends_on": [1]})
+    await plan_q.put({"step": 6, "action": "fine"})
+    await plan_q.put(None)
+
+    agent = ExecutorAgent(tool_manager=None, llm=fake_llm)
+    await asyncio.wait_for(agent.execute(plan_q, result_q), 1)
+
+    results = [await result_q.get() for _ in range(7)]
+    assert results == [
+        {"step": 1, "error": "dependency cycle"},
+        {"step": 2, "error": "dependency cycle"},
+        {"step": 3, "error": "dependency cycle"},
+        {"step": 4, "error": "model unavailable"},
+        {"step": 5, "error": "dependency 1 failed"},
+        {"step": 6, "result": "fine"},
+        None,
+    ]
+
+
+@pytest.mark.asyncio
+async def test_execute_reads_plan_only_as_fast_as_workers_free_up():
+    running = peak = 0
+
+    async def slow_llm(text):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return text
+
+    plan_q = asyncio.Queue()
+    result_q = asyncio.Queue(maxsize=1)
+    for idx in range(20):
+        plan_q.put_nowait({"step": idx, "action": str(idx)})
+    plan_q.put_nowait(None)
+
+    agent = ExecutorAgent(tool_manager=None, llm=slow_llm, max_workers=2)
+    task = asyncio.create_task(agent.execute(plan_q, result_q))
+    await asyncio.sleep(0.05)
+    # The result consumer is stalled, so only a bounded window was read.
+    assert plan_q.qsize() > 0
+    results = []
+    while (item := await result_q.get()) is not None:
+        results.append(item["step"])
+    await task
+    assert results == list(range(20)) and peak == 2
@@ -36,3 +36,77 @@ def test_websocket_events(monkeypatch):
         data3 = ws.receive_text()
     assert data1 == "thought 0"
     assert data3 == "tool_output:done"
+
+
+def test_websocket_stream_tokens(monkeypatch):
+    async def fake_stream(self, query):
+        for token in ["he", "llo"]:
+            yield token
+
+    monkeypatch.setattr(api.CappuccinoAgent, "stream_responses", fake_stream)
+    client = TestClient(api.app)
+    with client.websocket_connect("/agent/stream") as ws:
+        ws.send_text("hi")
+        assert ws.receive_text() == "he"
+        assert ws.receive_text() == "llo"
+
+
+
+@pytest.mark.asyncio
+async def test_disconnect_cancels_stream_producer():
+    import asyncio
+
+    state = {"cancelled": False, "sent": []}
+
+    class FakeWebSocket:
+        async def send_text(self, text):
+            state["sent"].append(text)
+
+        async def receive(self):
+            await asyncio.sleep(0.05)
+            return {"type": "websocket.disconnect"}
+
+    async def endless_stream():
+        try:
+            yield "first"
+            while True:
+                await asyncio.sleep(0.01)
+        except asyncio.CancelledError:
+            state["cancelled"] = True
+            raise
+
+    await api._forward_until_disconnect(FakeWebSocket(), endless_stream())
+    assert state["sent"] == ["first"]
+    assert state["cancelled"]
+
+
+def test_metrics_endpoint_reports_requests(monkeypatch):
+    async def fake_call(prompt):
+        return {"text": "ok", "images": []}
+
+    monkeypatch.setattr(api, "call_openai", fake_call)
+    client = TestClient(api.app)
+    client.post("/agent/run", json={"query": "hello"})
+    resp = client.get("/metrics")
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/plain")
+    body = resp.text
+    assert 'cappuccino_http_requests_total{method="POST",route="/agent/run",status="200"}' in body
+    assert 'cappuccino_http_request_seconds_bucket{method="POST",route="/agent/run",le="+Inf"}' in body
+    assert "# TYPE cappuccino_pipeline_queue_depth gauge" in body
+    assert 'cappuccino_pipeline_queue_depth{queue="plan"} 0' in body
+
+
+def test_forced_trace_is_exported_as_chrome_json(monkeypatch):
+    async def fake_call(prompt):
+        return {"text": "ok", "images": []}
+
+    monkeypatch.setattr(api, "call_openai", fake_call)
+    client = TestClient(api.app)
+    resp = client.post("/agent/run", json={"query": "hello", "trace": True})
+    trace_id = resp.headers["X-Trace-Id"]
+    assert any(t["trace_id"] == trace_id for t in client.get("/traces").json()["traces"])
+    events = client.get(f"/traces/{trace_id}").json()["traceEvents"]
+    assert [e["name"] for e in events if e["ph"] == "X"] == ["api.agent_run"]
+    assert client.get("/traces/missing").status_code == 404
+    assert "X-Trace-Id" not in client.post("/agent/run", json={"query": "hi"}).headers
@@ -0,0 +1,50 @@
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+import pytest
+
+from benchmarks import FakeLLM, compare
+from benchmarks.__main__ import main
+
+
+@pytest.mark.asyncio
+async def test_fake_llm_is_deterministic_and_paced():
+    llm = FakeLLM(latency=0.02, tokens_per_second=100, tokens=5)
+    start = time.perf_counter()
+    first = await llm("same prompt")
+    elapsed = time.perf_counter() - start
+    assert first == await llm("same prompt") != await llm("other prompt")
+    assert len(first.split()) == 5
+    assert elapsed >= 0.02 + 4 / 100 - 0.005
+    assert [t async for t in llm.stream("same prompt")] == llm.reply_tokens("same prompt")
+
+
+def test_compare_flags_slowdowns_beyond_tolerance():
+    baseline = {"a": {"throughput": 100.0, "p50": 0.010, "p99": 0.020, "peak_kib": 10.0}}
+    current = [{"name": "a", "throughput": 70.0, "p50": 0.011, "p99": 0.030, "peak_kib": 10.0}]
+    flagged = {(r["name"], r["metric"]) for r in compare(current, baseline, tolerance=0.25)}
+    assert flagged == {("a", "throughput"), ("a", "p99")}
+    assert compare([{"name": "new", "throughput": 1.0}], baseline) == []
+
+
+def test_cli_saves_baseline_and_reports_regressions(tmp_path, capsys):
+    baseline = tmp_path / "baseline.json"
+    args = ["--only", "graph", "--iterations", "5", "--warmup", "1", "--baseline", str(baseline)]
+    assert main(args + ["--save-baseline"]) == 0
+    data = json.loads(baseline.read_text())
+    names = [r["name"] for r in data["results"]]
+    assert names == ["graph_update_query", "graph_persist_find"]
+    assert {"throughput", "p50", "p99", "peak_kib"} <= set(data["results"][0])
+
+    for result in data["results"]:
+        result["p50"] = result["p99"] = 1e-9
+    baseline.write_text(json.dumps(data))
+    assert main(args) == 1
+    assert "REGRESSION graph_update_query p50" in capsys.readouterr().err
+
+    assert main(args + ["--iterations", "6"]) == 2
+    assert "iterations 5 -> 6" in capsys.readouterr().err
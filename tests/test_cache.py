@@ -7,6 +7,7 @@ import pytest
 
 from tool_manager import ToolManager
 from cappuccino_agent import CappuccinoAgent
+from llm_cache import llm_cache_key
 
 @pytest.mark.asyncio
 async def test_cache_methods(tmp_path):
@@ -25,5 +26,110 @@ async def test_agent_cache(tmp_path):
     agent = CappuccinoAgent(tool_manager=tm, llm=fake_llm)
     response = await agent.call_llm("hello")
     assert response == "ok"
-    cached = await agent.get_cached_result("llm:hello")
+    key = llm_cache_key([{"role": "user", "content": "hello"}], sentiment="neutral")
+    cached = await agent.get_cached_result(key)
     assert cached == "ok"
+    digest = key.split(":", 1)[1]
+    assert await agent.get_cached_result(f"llm_prompt:{digest}") == "hello"
+
+
+@pytest.mark.asyncio
+async def test_llm_cache_key_normalization(tmp_path):
+    calls = []
+
+    async def fake_llm(text: str) -> str:
+        calls.append(text)
+        return "ok"
+
+    tm = ToolManager(db_path=os.path.join(tmp_path, "db.sqlite"))
+    agent = CappuccinoAgent(tool_manager=tm, llm=fake_llm)
+    await agent.call_llm("at 2024-01-01T10:00:00Z  say   hi")
+    await agent.call_llm("at 2024-05-06T11:30:00Z say hi\n")
+    assert len(calls) == 1
+
+    a = llm_cache_key([{"role": "user", "content": "x"}], model="m1")
+    b = llm_cache_key([{"role": "user", "content": "x"}], model="m2")
+    assert a != b and len(a) == len("llm:") + 64
+
+
+@pytest.mark.asyncio
+async def test_cache_bounds_long_keys(tmp_path):
+    tm = ToolManager(db_path=os.path.join(tmp_path, "db.sqlite"))
+    key = "info_search_web:" + "q" * 1000
+    await tm.set_cached_result(key, "v")
+    assert await tm.get_cached_result(key) == "v"
+    conn = await tm._get_db_connection()
+    async with conn.execute("SELECT MAX(LENGTH(key)) FROM cache") as cur:
+        assert (await cur.fetchone())[0] < 256
+    await tm.close()
+
+
+@pytest.mark.asyncio
+async def test_cache_ttl_and_stats(tmp_path, monkeypatch):
+    import result_cache
+
+    clock = [1000.0]
+    monkeypatch.setattr(result_cache.time, "time", lambda: clock[0])
+    tm = ToolManager(db_path=os.path.join(tmp_path, "db.sqlite"))
+    await tm.set_cached_result("info_search_web:cats", "[]")
+    await tm.set_cached_result("misc", "kept", ttl=None)
+    assert await tm.get_cached_result("info_search_web:cats") == "[]"
+
+    tm.cache.memory.clear()
+    assert await tm.get_cached_result("info_search_web:cats") == "[]"
+    clock[0] += 3601
+    assert await tm.get_cached_result("info_search_web:cats") is None
+    assert await tm.get_cached_result("misc") == "kept"
+
+    stats = tm.cache_stats()["namespaces"]["info_search_web"]
+    assert stats == {"memory_hits": 1, "disk_hits": 1, "misses": 1}
+    await tm.close()
+
+
+@pytest.mark.asyncio
+async def test_cache_size_eviction(tmp_path):
+    from result_cache import TieredCache
+
+    tm = ToolManager(db_path=os.path.join(tmp_path, "db.sqlite"))
+    tm.cache = TieredCache(memory_entries=2, max_rows=3, prune_every=5)
+    for i in range(5):
+        await tm.set_cached_result(f"k{i}", str(i))
+    assert len(tm.cache.memory) == 2
+    assert await tm.get_cached_result("k0") is None
+    assert await tm.get_cached_result("k4") == "4"
+    await tm.close()
+
+
+@pytest.mark.asyncio
+async def test_cached_tool_keys_on_file_content(tmp_path, monkeypatch):
+    import shutil
+    import sys
+    import types
+    from PIL import Image
+
+    calls = []
+    fake = types.ModuleType("pytesseract")
+    fake.image_to_string = lambda img: calls.append(img.size) or f"{img.size[0]}px"
+    monkeypatch.setitem(sys.modules, "pytesseract", fake)
+
+    path = tmp_path / "a.png"
+    Image.new("RGB", (10, 5)).save(path)
+    copy = tmp_path / "copy.png"
+    shutil.copy(path, copy)
+
+    tm = ToolManager(db_path=str(tmp_path / "db.sqlite"))
+    assert await tm.media_analyze_image(str(path)) == {"text": "10px"}
+    assert await tm.media_analyze_image(str(path)) == {"text": "10px"}
+    assert await tm.media_analyze_image(str(copy)) == {"text": "10px"}
+    assert len(calls) == 1
+
+    Image.new("RGB", (20, 5)).save(path)
+    assert await tm.media_analyze_image(str(path)) == {"text": "20px"}
+    assert len(calls) == 2
+
+    missing = await tm.media_analyze_image(str(tmp_path / "missing.png"))
+    assert "error" in missing
+    stats = tm.tool_cache_stats()["media_analyze_image"]
+    assert stats == {"hits": 2, "misses": 2, "hit_rate": 0.5}
+    assert "image_classify" in tm.tool_cache_stats()
+    await tm.close()
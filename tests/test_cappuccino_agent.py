@@ -27,3 +27,55 @@ async def test_agent_with_llm():
         {"step": 1, "result": "done:step one"},
         {"step": 2, "result": "done:step two"},
     ]
+
+
+@pytest.mark.asyncio
+async def test_run_deadline_cancels_inflight_llm_calls():
+    import asyncio
+
+    cancelled = []
+
+    async def slow_llm(text):
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append(text)
+            raise
+        return text
+
+    agent = CappuccinoAgent(llm=slow_llm, tool_manager=None)
+    with pytest.raises(asyncio.TimeoutError):
+        await agent.run("one. two", deadline=0.05)
+    assert sorted(cancelled) == ["one", "two"]
+
+
+@pytest.mark.asyncio
+async def test_run_uses_bounded_queues(monkeypatch):
+    import asyncio
+    from config import settings
+
+    monkeypatch.setattr(settings, "pipeline_queue_size", 1)
+    monkeypatch.setattr(settings, "executor_workers", 2)
+    running = peak = 0
+    planner_blocked = []
+
+    async def slow_llm(text):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        plan_queue, _ = agent._pipelines[0]
+        planner_blocked.append(plan_queue.full())
+        await asyncio.sleep(0.005)
+        running -= 1
+        return text
+
+    agent = CappuccinoAgent(llm=slow_llm, tool_manager=None)
+    steps = [f"s{i}" for i in range(30)]
+    try:
+        result = await agent.run(". ".join(steps))
+    finally:
+        await agent.close()
+    assert [r["result"] for r in result] == steps
+    assert peak == 2
+    # While steps ran, the planner sat on a full queue instead of racing ahead.
+    assert sum(planner_blocked) >= len(steps) // 2
@@ -18,3 +18,20 @@ async def test_chat_once(monkeypatch):
     agent = CappuccinoAgent(tool_manager=None, llm=None)
     response = await chat_once(agent, "ping")
     assert response == "pong"
+
+
+def test_trace_flag_writes_chrome_trace(monkeypatch, tmp_path):
+    import json
+    import chat_cli
+    from tracing import tracer
+
+    async def fake_loop(model=None):
+        with tracer.trace("agent.run"):
+            pass
+
+    monkeypatch.setattr(chat_cli, "chat_loop", fake_loop)
+    monkeypatch.setattr(tracer, "sample_rate", 0.0)
+    out = tmp_path / "trace.json"
+    chat_cli.main(["--trace", str(out)])
+    events = json.loads(out.read_text())["traceEvents"]
+    assert any(e["name"] == "agent.run" for e in events)
@@ -0,0 +1,41 @@
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+import aiosqlite
+import pytest
+
+from tool_manager import ToolManager
+
+
+@pytest.mark.asyncio
+async def test_writes_are_group_committed(tmp_path):
+    db_path = str(tmp_path / "db.sqlite")
+    tm = ToolManager(db_path=db_path, commit_latency=60, commit_batch=3)
+    await tm.message_notify_user("u", "one")
+    await tm.message_notify_user("u", "two")
+    assert tm.db_writer.pending == 2
+    assert tm.db_writer.commits == 0
+    await tm.message_notify_user("u", "three")
+    assert tm.db_writer.pending == 0
+    assert tm.db_writer.commits == 1
+
+    await tm.message_notify_user("u", "four")
+    await tm.flush()
+    async with aiosqlite.connect(db_path) as conn:
+        async with conn.execute("SELECT COUNT(*) FROM messages") as cur:
+            assert (await cur.fetchone())[0] == 4
+    await tm.close()
+
+
+@pytest.mark.asyncio
+async def test_deferred_commit_fires_after_latency(tmp_path):
+    import asyncio
+
+    tm = ToolManager(db_path=str(tmp_path / "db.sqlite"), commit_latency=0.01)
+    await tm.agent_update_plan("1", "plan")
+    assert tm.db_writer.pending == 1
+    await asyncio.sleep(0.05)
+    assert tm.db_writer.pending == 0
+    await tm.close()
@@ -34,3 +34,27 @@ async def test_negative_prompt_includes_emotion():
     result = await agent.call_llm('I hate everything.')
     assert result == 'concerned'
     assert 'negative' in captured['prompt']
+
+
+def test_detect_emotions_batch_memoises(monkeypatch):
+    import emotion_recognizer
+
+    calls = []
+    original = emotion_recognizer._analyze
+    monkeypatch.setattr(emotion_recognizer, '_analyze', lambda t: calls.append(t) or original(t))
+    texts = ['What a wonderful day', 'This is terrible', 'The meeting is at noon', 'What a wonderful day', '']
+    assert emotion_recognizer.detect_emotions(texts) == [
+        'positive', 'negative', 'neutral', 'positive', 'neutral'
+    ]
+    assert len(calls) == 3
+    assert emotion_recognizer.cached_emotion('This is terrible') == 'negative'
+    assert emotion_recognizer.detect_emotion('This is terrible') == 'negative'
+    assert len(calls) == 3
+
+
+def test_lexicon_scorer_handles_modifiers_and_negation():
+    from emotion_recognizer import lexicon_polarity
+
+    assert lexicon_polarity('very bad') < lexicon_polarity('bad') < 0
+    assert lexicon_polarity('not good') < 0 < lexicon_polarity('good')
+    assert lexicon_polarity('the meeting is at noon') == 0
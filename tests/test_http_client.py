@@ -0,0 +1,109 @@
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+import aiohttp
+import pytest
+import pytest_asyncio
+from aiohttp import web
+
+from http_client import HttpClient
+
+
+@pytest_asyncio.fixture()
+async def server():
+    hits = {"flaky": 0, "post": 0, "peers": set()}
+
+    async def flaky(request):
+        hits["flaky"] += 1
+        hits["peers"].add(request.transport.get_extra_info("peername"))
+        if hits["flaky"] < 3:
+            return web.Response(status=503)
+        return web.json_response({"ok": True})
+
+    async def post(request):
+        hits["post"] += 1
+        return web.Response(status=502)
+
+    async def missing(request):
+        return web.Response(status=404, text="no such item")
+
+    app = web.Application()
+    app.router.add_get("/missing", missing)
+    app.router.add_get("/flaky", flaky)
+    app.router.add_post("/post", post)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    yield f"http://127.0.0.1:{port}", hits
+    await runner.cleanup()
+
+
+@pytest.mark.asyncio
+async def test_retries_reuse_pooled_connection(server):
+    base, hits = server
+    client = HttpClient(retries=2, backoff=0)
+    assert await client.get_json(f"{base}/flaky") == {"ok": True}
+    assert hits["flaky"] == 3
+    assert client.stats() == {"requests": 3, "retried": 2, "open": True}
+    # Keep-alive: all attempts went over the same pooled connection.
+    assert len(hits["peers"]) == 1
+    await client.close()
+    assert client.stats()["open"] is False
+
+
+@pytest.mark.asyncio
+async def test_post_is_not_retried_and_raises(server):
+    base, hits = server
+    client = HttpClient(retries=2, backoff=0)
+    with pytest.raises(aiohttp.ClientResponseError) as exc:
+        await client.fetch("POST", f"{base}/post")
+    assert exc.value.status == 502
+    assert hits["post"] == 1
+    await client.close()
+
+
+def test_session_from_a_finished_loop_is_released():
+    import asyncio
+
+    client = HttpClient()
+
+    async def open_session():
+        return client.session()
+
+    first = asyncio.run(open_session())
+    second = asyncio.run(open_session())
+    assert first is not second and first.closed
+    asyncio.run(client.close())
+
+
+@pytest.mark.asyncio
+async def test_tool_manager_closes_only_its_own_client():
+    from tool_manager import ToolManager
+
+    shared = HttpClient()
+    shared.session()
+    borrowing = ToolManager(db_path=":memory:", http=shared)
+    owning = ToolManager(db_path=":memory:")
+    owning.http.session()
+    await borrowing.close()
+    await owning.close()
+    assert shared.stats()["open"] is True
+    assert owning.http.stats()["open"] is False
+    await shared.close()
+
+
+@pytest.mark.asyncio
+async def test_with_status_returns_error_bodies(server):
+    from tool_manager import ToolManager
+
+    base, _ = server
+    client = HttpClient(retries=0)
+    assert await client.fetch("GET", f"{base}/missing", with_status=True) == (404, "no such item")
+    tm = ToolManager(db_path=":memory:", http=client)
+    assert await tm.info_search_api(f"{base}/missing") == {"status": 404, "response": "no such item"}
+    await tm.close()
+    await client.close()
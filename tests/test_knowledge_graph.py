@@ -32,3 +32,87 @@ async def test_graph_remove_relation(tmp_path):
         await tm.graph_remove_relation("A", "B", "likes")
         result = await tm.graph_query("A")
         assert ("likes", "B") not in result["relations"]
+
+
+@pytest.mark.asyncio
+async def test_graph_loaded_once_and_persisted_per_row(tmp_path, monkeypatch):
+    db = tmp_path / "graph.db"
+    async with ToolManager(db_path=str(db)) as tm:
+        loads = []
+        original = tm.state_manager.load_graph
+
+        async def counting_load():
+            loads.append(1)
+            return await original()
+
+        monkeypatch.setattr(tm.state_manager, "load_graph", counting_load)
+        await tm.graph_add_entity("A", {"kind": "person"})
+        await tm.graph_add_relation("A", "B", "knows", {"since": 2020})
+        await tm.graph_add_relation("A", "C", "likes")
+        await tm.graph_remove_entity("C")
+        await tm.graph_query("A")
+        assert len(loads) == 1
+
+    async with ToolManager(db_path=str(db)) as tm2:
+        graph = await tm2._get_graph()
+        assert graph.entity_attrs("A") == {"kind": "person"}
+        assert graph.relation_attrs("A", "B", "knows") == {"since": 2020}
+        assert graph.query("A") == [("knows", "B")]
+
+
+@pytest.mark.asyncio
+async def test_graph_blob_migration(tmp_path):
+    import aiosqlite
+    from knowledge_graph import KnowledgeGraph
+
+    db = tmp_path / "legacy.db"
+    legacy = KnowledgeGraph()
+    legacy.add_relation("X", "Y", "owns")
+    async with aiosqlite.connect(db) as conn:
+        await conn.execute("CREATE TABLE knowledge_graph (id INTEGER PRIMARY KEY, data TEXT)")
+        await conn.execute("INSERT INTO knowledge_graph VALUES (1, ?)", (legacy.to_json(),))
+        await conn.commit()
+
+    async with ToolManager(db_path=str(db)) as tm:
+        result = await tm.graph_query("X")
+        assert ("owns", "Y") in result["relations"]
+
+
+@pytest.mark.asyncio
+async def test_graph_traversal_tools(tmp_path):
+    async with ToolManager(db_path=str(tmp_path / "graph.db")) as tm:
+        await tm.graph_add_relation("Alice", "ACME", "works_at")
+        await tm.graph_add_relation("Bob", "ACME", "works_at")
+        await tm.graph_add_relation("Alice", "Bob", "knows")
+        await tm.graph_add_relation("Bob", "Carol", "knows")
+        await tm.graph_add_relation("Carol", "Dave", "knows")
+
+        incoming = await tm.graph_incoming("ACME", "works_at")
+        assert sorted(incoming["relations"]) == [("works_at", "Alice"), ("works_at", "Bob")]
+
+        near = await tm.graph_neighbors("Alice", hops=2, relations=["knows"])
+        assert near["neighbors"] == {"Bob": 1, "Carol": 2}
+
+        path = await tm.graph_shortest_path("Alice", "Dave")
+        assert path["path"] == [
+            ("Alice", "knows", "Bob"),
+            ("Bob", "knows", "Carol"),
+            ("Carol", "knows", "Dave"),
+        ]
+        assert "error" in await tm.graph_shortest_path("Dave", "Alice")
+
+        matches = await tm.graph_match("(?x, works_at, ACME), (?x, knows, ?y)")
+        assert sorted(matches["matches"], key=lambda m: m["x"]) == [
+            {"x": "Alice", "y": "Bob"},
+            {"x": "Bob", "y": "Carol"},
+        ]
+        chain = await tm.graph_match("(?a, knows, ?b), (?b, knows, ?c), (?c, knows, Dave)")
+        assert chain["matches"] == [{"a": "Alice", "b": "Bob", "c": "Carol"}]
+        assert len((await tm.graph_match("(?x, knows, ?y)", limit=2))["matches"]) == 2
+        assert (await tm.graph_match("(Alice, knows, Bob)"))["matches"] == [{}]
+        assert (await tm.graph_match("(?x, knows, ?x)"))["matches"] == []
+        assert "error" in await tm.graph_neighbors("Alice", direction="sideways")
+
+        graph = await tm._get_graph()
+        assert graph.edges_by_relation("works_at") == [("Alice", "ACME"), ("Bob", "ACME")]
+        assert ("knows", "Alice") in graph.incoming("Bob")
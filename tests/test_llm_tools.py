@@ -63,3 +63,28 @@ async def test_call_llm_with_tools(monkeypatch):
     out = await agent.call_llm_with_tools("hi", schema)
     assert out == "done"
     assert tm.called
+
+
+@pytest.mark.asyncio
+async def test_log_tool_records_metrics_and_caps_params(caplog):
+    import logging
+    from metrics import tool_metrics
+
+    class MetricsToolManager(ToolManager):
+        @log_tool
+        async def metered_tool(self, text: str, fail: bool = False) -> dict:
+            if fail:
+                raise ValueError("boom")
+            return {"length": len(text)}
+
+    tm = MetricsToolManager(db_path=":memory:")
+    tool_metrics.tool("metered_tool").clear()
+    with caplog.at_level(logging.INFO, logger="tool_manager"):
+        assert await tm.metered_tool("x" * 10_000) == {"length": 10_000}
+        assert await tm.metered_tool("y", fail=True) == {"error": "boom"}
+    stats = tm.tool_stats()["metered_tool"]
+    assert stats["calls"] == 2 and stats["errors"] == 1 and stats["in_flight"] == 0
+    assert stats["latency"]["count"] == 2 and stats["latency"]["p50"] is not None
+    line = next(r.getMessage() for r in caplog.records if "status=ok" in r.getMessage())
+    assert "text='" in line and "<10000 chars>" in line and len(line) < 400
+    await tm.close()
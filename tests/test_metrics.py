@@ -0,0 +1,47 @@
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+import pytest
+
+from metrics import Histogram, LoopLagMonitor, MetricsRegistry
+
+
+def test_histogram_quantiles():
+    h = Histogram([0.1, 0.2, 0.5])
+    for v in [0.05] * 50 + [0.15] * 40 + [0.4] * 9 + [2.0]:
+        h.observe(v)
+    assert h.cumulative() == [50, 90, 99, 100]
+    assert h.quantile(0.5) == pytest.approx(0.1)
+    assert 0.2 < h.quantile(0.95) <= 0.5
+    assert h.quantile(1.0) == 0.5
+
+
+def test_registry_renders_prometheus_text():
+    reg = MetricsRegistry()
+    reg.counter("demo_total", "Demo counter.", ["kind"]).inc('a"b', amount=2)
+    reg.histogram("demo_seconds", "Demo latency.", buckets=[0.1, 1]).observe(0.5)
+    reg.add_collector(lambda: [])
+    text = reg.render()
+    assert '# TYPE demo_total counter\ndemo_total{kind="a\\"b"} 2\n' in text
+    assert 'demo_seconds_bucket{le="0.1"} 0' in text
+    assert 'demo_seconds_bucket{le="1"} 1' in text
+    assert 'demo_seconds_bucket{le="+Inf"} 1' in text
+    assert "demo_seconds_sum 0.5\ndemo_seconds_count 1" in text
+
+
+@pytest.mark.asyncio
+async def test_loop_lag_monitor_sees_blocking_call():
+    import time
+
+    reg = MetricsRegistry()
+    monitor = LoopLagMonitor(reg.histogram("lag", "Lag."), reg.gauge("lag_last", "Lag."), interval=0.01)
+    monitor.start()
+    await asyncio.sleep(0.02)
+    time.sleep(0.1)
+    await asyncio.sleep(0.03)
+    await monitor.stop()
+    assert monitor.histogram.count >= 2
+    assert monitor.histogram.sum >= 0.05
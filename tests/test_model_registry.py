@@ -0,0 +1,48 @@
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+import asyncio
+import pytest
+
+from model_registry import ModelRegistry
+from tool_manager import ToolManager
+
+
+@pytest.mark.asyncio
+async def test_models_load_once_and_record_timings():
+    loads = []
+    registry = ModelRegistry()
+    registry.register("double", lambda: loads.append(1) or (lambda x: x * 2))
+
+    results = await asyncio.gather(*[registry.run("double", lambda m, x=i: m(x)) for i in range(3)])
+    assert results == [0, 2, 4]
+    assert len(loads) == 1
+    stats = registry.stats()["double"]
+    assert stats["loaded"] and stats["loads"] == 1 and stats["inferences"] == 3
+
+
+@pytest.mark.asyncio
+async def test_idle_eviction_and_memory_budget():
+    registry = ModelRegistry(idle_timeout=60, memory_budget_mb=100)
+    registry.register("a", lambda: "A", size_mb=60)
+    registry.register("b", lambda: "B", size_mb=60)
+
+    await registry.get("a")
+    await registry.get("b")
+    assert not registry.is_loaded("a") and registry.is_loaded("b")
+
+    registry.evict_idle(now=registry._entries["b"].last_used + 61)
+    assert not registry.is_loaded("b")
+
+
+@pytest.mark.asyncio
+async def test_tool_manager_uses_registry():
+    registry = ModelRegistry()
+    registry.register("whisper_tiny", lambda: object())
+    tm = ToolManager(db_path=":memory:", models=registry)
+    result = await tm.warm_up_models(["whisper_tiny", "missing"])
+    assert result["whisper_tiny"] == "loaded"
+    assert result["missing"].startswith("error")
+    assert tm.model_stats()["whisper_tiny"]["loads"] == 1
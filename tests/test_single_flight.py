@@ -0,0 +1,47 @@
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+import asyncio
+import pytest
+
+from cappuccino_agent import CappuccinoAgent
+from single_flight import SingleFlight
+from tool_manager import ToolManager
+
+
+@pytest.mark.asyncio
+async def test_concurrent_llm_calls_are_coalesced():
+    calls = []
+
+    async def slow_llm(text: str) -> str:
+        calls.append(text)
+        await asyncio.sleep(0.05)
+        return "translated"
+
+    agent = CappuccinoAgent(llm=slow_llm, tool_manager=ToolManager(db_path=":memory:"))
+    results = await asyncio.gather(*[agent.call_llm("translate this") for _ in range(5)])
+    assert results == ["translated"] * 5
+    assert len(calls) == 1
+    assert agent.single_flight.stats() == {"calls": 1, "coalesced": 4, "inflight": 0}
+
+
+@pytest.mark.asyncio
+async def test_single_flight_shares_errors_and_survives_cancel():
+    flight = SingleFlight()
+    started = asyncio.Event()
+
+    async def boom():
+        started.set()
+        await asyncio.sleep(0.01)
+        raise ValueError("bad")
+
+    first = asyncio.create_task(flight.do("k", boom))
+    await started.wait()
+    second = asyncio.create_task(flight.do("k", boom))
+    await asyncio.sleep(0)
+    first.cancel()
+    with pytest.raises(ValueError):
+        await second
+    assert flight.stats()["inflight"] == 0
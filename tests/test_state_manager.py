@@ -21,3 +21,43 @@ async def test_state_persistence(tmp_path):
     assert agent2.history[-1]["content"] == "hello"
     assert agent2.phase == 1
     await agent2.close()
+
+
+@pytest.mark.asyncio
+async def test_history_append_and_paging(tmp_path):
+    from state_manager import StateManager
+
+    state = StateManager(os.path.join(tmp_path, "state.db"))
+    history = [{"role": "user", "content": f"m{i}"} for i in range(5)]
+    await state.save_history(history[:3])
+    await state.save_history(history)
+    await state.append_message({"role": "tool", "content": "r", "tool_call_id": "x"})
+    assert await state.history_length() == 6
+    page = await state.load_history(offset=2, limit=2)
+    assert [m["content"] for m in page] == ["m2", "m3"]
+    last = await state.load_history(offset=5)
+    assert last == [{"role": "tool", "content": "r", "tool_call_id": "x"}]
+    await state.close()
+
+
+@pytest.mark.asyncio
+async def test_history_blob_migration(tmp_path):
+    import json
+    import aiosqlite
+    from state_manager import StateManager
+
+    db_path = os.path.join(tmp_path, "legacy.db")
+    async with aiosqlite.connect(db_path) as conn:
+        await conn.execute("CREATE TABLE agent_state (key TEXT PRIMARY KEY, value TEXT)")
+        await conn.execute(
+            "INSERT INTO agent_state VALUES ('history', ?)",
+            (json.dumps([{"role": "user", "content": "old"}]),),
+        )
+        await conn.commit()
+
+    state = StateManager(db_path)
+    data = await state.load()
+    assert data["history"] == [{"role": "user", "content": "old"}]
+    await state.append_message({"role": "assistant", "content": "new"})
+    assert [m["content"] for m in await state.load_history()] == ["old", "new"]
+    await state.close()
@@ -0,0 +1,65 @@
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+import pytest
+
+from cappuccino_agent import CappuccinoAgent
+from ollama_client import OllamaLLM
+from tool_manager import ToolManager
+
+
+class FakeChunk:
+    def __init__(self, content):
+        self.message = {"content": content}
+
+
+class FakeAsyncClient:
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.kwargs = None
+
+    async def chat(self, **kwargs):
+        self.kwargs = kwargs
+
+        async def gen():
+            for t in self.tokens:
+                yield FakeChunk(t)
+
+        return gen()
+
+
+@pytest.mark.asyncio
+async def test_ollama_stream_yields_tokens():
+    llm = OllamaLLM("demo")
+    llm.client = FakeAsyncClient(["a", "", "b"])
+    tokens = [t async for t in llm.stream("hi")]
+    assert tokens == ["a", "b"]
+    assert llm.client.kwargs["stream"] is True
+
+
+@pytest.mark.asyncio
+async def test_agent_stream_responses_records_history():
+    llm = OllamaLLM("demo")
+    llm.client = FakeAsyncClient(["Hel", "lo"])
+    agent = CappuccinoAgent(llm=llm, tool_manager=ToolManager(db_path=":memory:"), db_path=":memory:")
+    tokens = [t async for t in agent.stream_responses("greet me")]
+    assert tokens == ["Hel", "lo"]
+    assert agent.history[-1] == {"role": "assistant", "content": "Hello"}
+
+    replay = [t async for t in agent.stream_responses("greet me")]
+    assert replay == ["Hello"]
+
+
+@pytest.mark.asyncio
+async def test_ollama_stream_records_first_token_and_rate():
+    from metrics import LLM_FIRST_TOKEN, LLM_TOKENS, LLM_TOKEN_RATE
+
+    llm = OllamaLLM("metered")
+    llm.client = FakeAsyncClient(["a", "b", "c"])
+    before = LLM_TOKENS.children.get(("metered",), 0)
+    assert [t async for t in llm.stream("hi")] == ["a", "b", "c"]
+    assert LLM_FIRST_TOKEN.labels("metered").count == 1
+    assert LLM_TOKENS.children[("metered",)] == before + 3
+    assert LLM_TOKEN_RATE.labels("metered").count == 1
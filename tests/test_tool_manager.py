@@ -58,6 +58,8 @@ async def test_info_search_image(monkeypatch):
     tm = ToolManager(db_path=":memory:")
 
     class MockResp:
+        status = 200
+
         async def json(self):
             return {
                 "results": [
@@ -85,7 +87,10 @@ async def test_info_search_image(monkeypatch):
         def get(self, url):
             return MockResp()
 
-    monkeypatch.setattr("aiohttp.ClientSession", lambda: MockSession())
+        async def close(self):
+            pass
+
+    monkeypatch.setattr("aiohttp.ClientSession", lambda **kwargs: MockSession())
     result = await tm.info_search_image("cat")
     assert result["results"][0]["url"] == "http://example.com/cat.jpg"
 
@@ -195,23 +200,29 @@ async def test_media_recognize_speech(monkeypatch):
 async def test_media_describe_video(monkeypatch):
     tm = ToolManager(db_path=":memory:")
 
-    class DummyFrame:
-        def mean(self, axis=None):
-            return [1.0, 2.0, 3.0]
+    import numpy as np
 
     class DummyCap:
         def __init__(self, path):
             self.path = path
         def isOpened(self):
             return True
+        def get(self, prop):
+            return 0
+        def set(self, prop, value):
+            pass
         def read(self):
-            return True, DummyFrame()
+            return True, np.full((4, 4, 3), [1, 2, 3], dtype=np.uint8)
         def release(self):
             pass
 
     import types
     import sys
-    cv2_mod = types.SimpleNamespace(VideoCapture=lambda path: DummyCap(path))
+    cv2_mod = types.SimpleNamespace(
+        VideoCapture=lambda path: DummyCap(path),
+        CAP_PROP_FRAME_COUNT=0, CAP_PROP_FPS=1, CAP_PROP_FRAME_WIDTH=2,
+        CAP_PROP_FRAME_HEIGHT=3, CAP_PROP_POS_FRAMES=4,
+    )
     monkeypatch.setitem(sys.modules, "cv2", cv2_mod)
 
     result = await tm.media_describe_video("video.mp4")
@@ -326,3 +337,312 @@ async def test_audio_transcribe_fallback(monkeypatch):
     result = await tm.audio_transcribe("a.wav")
     assert result["text"] == "hi"
 
+
+
+@pytest.mark.asyncio
+async def test_media_analyze_image_batch(tmp_path, monkeypatch):
+    import sys
+    import types
+    from concurrent.futures import ThreadPoolExecutor
+    from PIL import Image
+
+    fake = types.ModuleType("pytesseract")
+    fake.image_to_string = lambda img: f"{img.size[0]}px"
+    monkeypatch.setitem(sys.modules, "pytesseract", fake)
+
+    paths = []
+    for width in (10, 20):
+        path = tmp_path / f"{width}.png"
+        Image.new("RGB", (width, 5)).save(path)
+        paths.append(str(path))
+    paths.append(str(tmp_path / "missing.png"))
+
+    tm = ToolManager(db_path=":memory:")
+    tm._process_pool = ThreadPoolExecutor(max_workers=2)
+    result = await tm.media_analyze_image_batch(paths)
+    by_path = {r["path"]: r for r in result["results"]}
+    assert by_path[paths[0]]["text"] == "10px"
+    assert by_path[paths[1]]["text"] == "20px"
+    assert "error" in by_path[paths[2]]
+    await tm.close()
+
+
+@pytest.mark.asyncio
+async def test_image_classify_batch_with_registry_model(tmp_path, monkeypatch):
+    import contextlib
+    import sys
+    import types
+    from PIL import Image
+    from model_registry import ModelRegistry
+
+    class Probs(list):
+        def max(self, dim):
+            best = [max(range(len(row)), key=row.__getitem__) for row in self]
+            return [row[i] for row, i in zip(self, best)], best
+
+    torch_mod = types.SimpleNamespace(
+        no_grad=contextlib.nullcontext,
+        stack=list,
+        nn=types.SimpleNamespace(functional=types.SimpleNamespace(softmax=lambda x, dim: Probs(x))),
+    )
+    monkeypatch.setitem(sys.modules, "torch", torch_mod)
+
+    batches = []
+
+    def model(batch):
+        batches.append(len(batch))
+        # Wide images look like dogs.
+        return [[0.9, 0.1] if width < 15 else [0.2, 0.8] for width in batch]
+
+    bundle = {"model": model, "preprocess": lambda img: img.size[0], "categories": ["cat", "dog"]}
+    registry = ModelRegistry()
+    registry.register("mobilenet_v2", lambda: bundle)
+
+    paths = []
+    for width in (10, 20, 30):
+        path = tmp_path / f"{width}.png"
+        Image.new("RGB", (width, 5)).save(path)
+        paths.append(str(path))
+    paths.insert(1, str(tmp_path / "missing.png"))
+
+    tm = ToolManager(db_path=":memory:", models=registry)
+    result = await tm.image_classify_batch(paths, batch_size=2)
+    assert [r.get("label") for r in result["results"]] == ["cat", None, "dog", "dog"]
+    assert "error" in result["results"][1] and batches == [1, 2]
+
+    broken = ModelRegistry()
+    broken.register("mobilenet_v2", lambda: 1 / 0)
+    tm.models = broken
+    assert "error" in await tm.image_classify_batch(paths)
+    assert [r async for r in tm.iter_image_classify(paths)] == [{"error": "division by zero"}]
+    await tm.close()
+
+
+@pytest.mark.asyncio
+async def test_iter_audio_transcribe_chunks_long_wav(tmp_path, monkeypatch):
+    import sys
+    import types
+    import wave
+    from concurrent.futures import ThreadPoolExecutor
+
+    import numpy as np
+
+    import audio_chunking
+
+    rate = 8000
+    tone = (np.sin(np.arange(int(rate * 1.5)) / 3) * 10000).astype(np.int16)
+    silence = np.zeros(int(rate * 0.3), dtype=np.int16)
+    samples = np.concatenate([tone, silence, tone, silence, tone])
+    path = tmp_path / "long.wav"
+    with wave.open(str(path), "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(samples.tobytes())
+
+    chunks = audio_chunking.wav_chunks(str(path), min_chunk=1.0, max_chunk=2.0)
+    assert len(chunks) == 3
+    assert sum(count for _, count in chunks) == len(samples)
+    for start, _ in chunks[1:]:
+        assert samples[start - 1] == 0
+
+    class DummyModel:
+        def transcribe(self, audio):
+            with wave.open(audio, "rb") as wav:
+                seconds = wav.getnframes() / wav.getframerate()
+            return ([types.SimpleNamespace(start=0.0, end=seconds, text=" part")], None)
+
+    fw_mod = types.SimpleNamespace(WhisperModel=lambda *a, **kw: DummyModel())
+    monkeypatch.setitem(sys.modules, "faster_whisper", fw_mod)
+    monkeypatch.setattr(audio_chunking, "_WORKER_MODEL", None)
+
+    tm = ToolManager(db_path=":memory:")
+    tm._whisper_pool = ThreadPoolExecutor(max_workers=3)
+    segments = [s async for s in tm.iter_audio_transcribe(str(path), chunk_seconds=2.0)]
+    assert [s["text"] for s in segments] == ["part"] * 3
+    starts = [s["start"] for s in segments]
+    assert starts == sorted(starts) and starts[0] == 0.0
+    assert segments[-1]["end"] == pytest.approx(len(samples) / rate)
+    await tm.close()
+
+
+def test_join_segments_keeps_segment_text_and_separates_chunks(monkeypatch):
+    from config import settings
+    from model_registry import ModelRegistry
+
+    segments = [
+        {"text": "你好", "chunk": 0},
+        {"text": "世界", "chunk": 0},
+        {"text": " Hello", "chunk": 1},
+        {"text": " there.", "chunk": 1},
+        {"error": "recognition failed", "chunk": 2},
+    ]
+    assert ToolManager._join_segments(segments) == {"text": "你好世界 Hello there."}
+    assert ToolManager._join_segments(segments[-1:]) == {"error": "recognition failed"}
+
+    # Each chunk worker loads its own 80 MB Whisper copy.
+    monkeypatch.setattr(settings, "media_process_workers", 8)
+    registry = ModelRegistry(memory_budget_mb=200)
+    registry.register("whisper_tiny", object, size_mb=80)
+    assert ToolManager(db_path=":memory:", models=registry)._whisper_workers() == 2
+    assert ToolManager(db_path=":memory:", models=ModelRegistry())._whisper_workers() == 8
+
+
+@pytest.mark.asyncio
+async def test_media_analyze_video_samples_frames(monkeypatch):
+    import numpy as np
+
+    reads = []
+
+    class SceneCap:
+        """300 frames at 30 fps: a dark red scene, then a bright blue one."""
+
+        def __init__(self, path):
+            self.pos = 0
+
+        def isOpened(self):
+            return True
+
+        def get(self, prop):
+            return {cv2.CAP_PROP_FRAME_COUNT: 300, cv2.CAP_PROP_FPS: 30.0}.get(prop, 64)
+
+        def set(self, prop, value):
+            self.pos = int(value)
+
+        def grab(self):
+            self.pos += 1
+            return True
+
+        def read(self):
+            reads.append(self.pos)
+            color = [0, 0, 80] if self.pos < 150 else [220, 0, 0]
+            self.pos += 1
+            return True, np.full((64, 64, 3), color, dtype=np.uint8)
+
+        def release(self):
+            pass
+
+    monkeypatch.setattr(cv2, "CAP_PROP_POS_FRAMES", 4, raising=False)
+    monkeypatch.setattr("cv2.VideoCapture", SceneCap)
+    tm = ToolManager(db_path=":memory:")
+    result = await tm.media_analyze_video("long.mp4", max_frames=10)
+    summary = result["summary"]
+    assert result["duration"] == 10.0
+    assert sorted(reads) == list(range(0, 300, 30))
+    assert summary["frames_sampled"] == 10
+    assert summary["scene_cuts"] == [5.0]
+    assert [s["start"] for s in summary["scenes"]] == [0.0, 5.0]
+    assert summary["scenes"][1]["avg_color"] == [220.0, 0.0, 0.0]
+    assert summary["motion"]["max"] > 0
+
+
+@pytest.mark.asyncio
+async def test_shell_view_is_incremental_and_non_blocking(monkeypatch):
+    import time
+    from config import settings
+
+    tm = ToolManager(db_path=":memory:")
+    await tm.shell_exec("echo first; sleep 0.3; echo second >&2; sleep 5", "s")
+    await asyncio.sleep(0.1)
+    start = time.monotonic()
+    first = await tm.shell_view("s")
+    assert time.monotonic() - start < 0.5
+    assert first["stdout"] == "first\n" and first["running"]
+    await asyncio.sleep(0.5)
+    second = await tm.shell_view("s")
+    assert second["stdout"] == "" and second["stderr"] == "second\n"
+    replay = await tm.shell_view("s", since=0)
+    assert replay["stdout"] == "first\n" and replay["stderr"] == "second\n"
+
+    await tm.shell_kill("s")
+    assert (await tm.shell_view("s"))["running"] is False
+    monkeypatch.setattr(settings, "shell_reap_after", 0)
+    assert "error" in await tm.shell_view("s")
+    assert tm.shell_sessions == {}
+    await tm.close()
+
+
+def test_output_buffer_drops_oldest_bytes():
+    from shell_session import OutputBuffer
+
+    buf = OutputBuffer(max_bytes=8)
+    buf.append("stdout", b"12345")
+    buf.append("stderr", b"678")
+    buf.append("stdout", b"90")
+    result = buf.read(0)
+    assert result["truncated"] is True
+    assert result["stdout"] == "90" and result["stderr"] == "678"
+    assert result["offset"] == 10
+    assert buf.read(9) == {"stdout": "0", "stderr": "", "offset": 10, "truncated": False}
+
+
+@pytest.mark.asyncio
+async def test_shell_run_keeps_state_between_commands(tmp_path):
+    tm = ToolManager(db_path=":memory:")
+    first = await tm.shell_run(f"cd {tmp_path} && export GREETING=hi", "p")
+    assert first["returncode"] == 0
+    second = await tm.shell_run('pwd; echo "$GREETING"; false', "p")
+    assert second["output"].splitlines() == [str(tmp_path), "hi"]
+    assert second["returncode"] == 1
+
+    slow = await tm.shell_run("sleep 30", "p", timeout=0.3)
+    assert slow["error"] == "timeout" and slow["returncode"] == 130
+    after = await tm.shell_run("echo $GREETING", "p")
+    assert after["output"] == "hi\n"
+
+    assert await tm.shell_close("p") == {"status": "closed"}
+    assert "error" in await tm.shell_close("p")
+    await tm.close()
+
+
+@pytest.mark.asyncio
+async def test_shell_pool_evicts_idle_and_lru_sessions():
+    from shell_session import ShellPool
+
+    pool = ShellPool(max_sessions=2, idle_timeout=60)
+    await pool.run("a", "true")
+    await pool.run("b", "true")
+    pool.shells["a"].last_used -= 10
+    await pool.run("c", "true")
+    assert set(pool.shells) == {"b", "c"}
+    pool.shells["b"].last_used -= 120
+    await pool.evict_idle()
+    assert set(pool.shells) == {"c"}
+    await pool.close_all()
+
+
+@pytest.mark.asyncio
+async def test_persistent_shell_long_commands_and_non_blocking_send():
+    from shell_session import PersistentShell
+
+    shell = await PersistentShell.start()
+    try:
+        long_line = await shell.run(f"echo {'x' * 6000} | wc -c", timeout=10)
+        assert long_line == {"output": "6001\n", "returncode": 0}
+
+        ticks = 0
+
+        async def heartbeat():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.05)
+                ticks += 1
+
+        beat = asyncio.create_task(heartbeat())
+        script = "sleep 0.5\n" + "\n".join(f": {'y' * 100} {i}" for i in range(150)) + "\necho done"
+        result = await shell.run(script, timeout=10)
+        beat.cancel()
+        assert result == {"output": "done\n", "returncode": 0}
+        assert ticks >= 5
+    finally:
+        await shell.close()
+
+
+@pytest.mark.asyncio
+async def test_shell_pool_shares_a_starting_session():
+    from shell_session import ShellPool
+
+    pool = ShellPool(max_sessions=2)
+    a, b = await asyncio.gather(pool.get("s"), pool.get("s"))
+    assert a is b and list(pool.shells) == ["s"]
+    await pool.close_all()
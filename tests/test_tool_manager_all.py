@@ -106,7 +106,10 @@ async def test_media_functions(tm, tmp_path, monkeypatch):
     monkeypatch.setitem(sys.modules, "speech_recognition", speech_mod)
     recog = await tm.media_recognize_speech("snd.wav")
     assert recog["text"] == "hi"
-    cv2_mod = types.SimpleNamespace(VideoCapture=lambda p: types.SimpleNamespace(isOpened=lambda: True, read=lambda: (True, types.SimpleNamespace(mean=lambda axis=None: [1,2,3])), release=lambda: None))
+    import numpy as np
+    frame = np.full((2, 2, 3), [1, 2, 3], dtype=np.uint8)
+    cap = types.SimpleNamespace(isOpened=lambda: True, get=lambda prop: 0, set=lambda prop, value: None, read=lambda: (True, frame), release=lambda: None)
+    cv2_mod = types.SimpleNamespace(VideoCapture=lambda p: cap, CAP_PROP_FRAME_COUNT=7, CAP_PROP_FPS=5, CAP_PROP_FRAME_WIDTH=3, CAP_PROP_FRAME_HEIGHT=4, CAP_PROP_POS_FRAMES=1)
     monkeypatch.setitem(sys.modules, "cv2", cv2_mod)
     desc = await tm.media_describe_video("v.mp4")
     assert desc["avg_color"] == [1,2,3]
@@ -114,6 +117,7 @@ async def test_media_functions(tm, tmp_path, monkeypatch):
 @pytest.mark.asyncio
 async def test_info_search(tm, monkeypatch):
     class Resp:
+        status = 200
         async def __aenter__(self):
             return self
         async def __aexit__(self, exc_type, exc, tb):
@@ -128,8 +132,10 @@ async def test_info_search(tm, monkeypatch):
             pass
         def get(self, url, params=None):
             return Resp()
+        async def close(self):
+            pass
 
-    monkeypatch.setattr("aiohttp.ClientSession", lambda: Session())
+    monkeypatch.setattr("aiohttp.ClientSession", lambda **kwargs: Session())
     web = await tm.info_search_web("test")
     assert web["results"][0]["title"] == "title"
 
@@ -14,7 +14,7 @@ class DummyBrowser(BrowserHelper):
     async def start(self):
         pass
 
-    async def navigate(self, url: str) -> str:
+    async def navigate(self, url: str, wait_until=None) -> str:
         return self.content
 
     async def click(self, selector: str) -> None:
@@ -35,3 +35,146 @@ async def test_browser_navigation_and_click(monkeypatch):
 
 
 
+
+
+class PageDummyBrowser(BrowserHelper):
+    """Helper driving a fake page that counts content() reads."""
+
+    def __init__(self):
+        super().__init__()
+        outer = self
+        self.reads = 0
+        self.clicks = 0
+
+        class Page:
+            async def goto(self, url, wait_until=None):
+                outer.waited = wait_until
+                outer.body = f"<p>{url}</p>"
+
+            async def content(self):
+                outer.reads += 1
+                return outer.body
+
+            async def click(self, selector):
+                outer.clicks += 1
+                outer.body = f"<p>clicked {outer.clicks}</p>"
+
+        self.page = Page()
+
+    async def start(self):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_browser_sessions_and_lazy_capture(monkeypatch):
+    tm = ToolManager(db_path=':memory:', browser_helper=PageDummyBrowser)
+    await tm.browser_navigate('http://a', session_id='one')
+    await tm.browser_navigate('http://b', wait_until='networkidle', session_id='two')
+    one, two = tm.browsers['one'], tm.browsers['two']
+    assert one is not two
+    assert one.waited == 'domcontentloaded' and two.waited == 'networkidle'
+
+    for _ in range(3):
+        await tm.browser_click('#x', session_id='one')
+    assert one.reads == 1
+    view = await tm.browser_view(session_id='one')
+    assert view['text'] == 'clicked 3' and one.reads == 2
+    await tm.browser_view(session_id='one')
+    assert one.reads == 2
+    assert (await tm.browser_view(session_id='two'))['text'] == 'http://b'
+
+    assert 'error' in await tm.browser_navigate('http://a', wait_until='never')
+    assert await tm.browser_close('two') == {'status': 'closed'}
+    assert 'two' not in tm.browsers
+
+
+@pytest.mark.asyncio
+async def test_browser_pool_blocks_heavy_resources():
+    from browser_pool import BrowserPool, parse_resource_types
+
+    class Route:
+        def __init__(self, kind):
+            self.request = type('R', (), {'resource_type': kind})()
+            self.outcome = None
+
+        async def abort(self):
+            self.outcome = 'aborted'
+
+        async def continue_(self):
+            self.outcome = 'continued'
+
+    pool = BrowserPool(parse_resource_types('image, font,media'))
+    routes = [Route(kind) for kind in ('document', 'image', 'font', 'script')]
+    for route in routes:
+        await pool._route(route)
+    assert [r.outcome for r in routes] == ['continued', 'aborted', 'aborted', 'continued']
+    assert pool.blocked == 2
+
+
+ARTICLE = """
+<html><head><title>Brewing</title></head><body>
+<header><a href="/">Home</a> <a href="/shop">Shop</a></header>
+<nav><ul><li><a href="/a">A</a></li></ul></nav>
+<div class="cookie-banner">We use cookies</div>
+<main>
+  <h1>Espresso basics</h1>
+  <p>Espresso is brewed by forcing hot water through finely ground coffee at high pressure.</p>
+  <h2>Grind</h2>
+  <p>A fine, even grind gives the water enough resistance. See <a href="/grind">grind guide</a>.</p>
+  <ul><li>Use fresh beans</li></ul>
+  <script>track()</script>
+</main>
+<footer>Copyright</footer>
+</body></html>
+"""
+
+
+def test_extract_readable_drops_boilerplate():
+    from page_text import extract_readable
+
+    doc = extract_readable(ARTICLE, 'http://cafe.test/guide/')
+    assert doc['title'] == 'Brewing'
+    assert doc['text'].startswith('# Espresso basics\n\nEspresso is brewed')
+    assert '## Grind' in doc['text'] and '- Use fresh beans' in doc['text']
+    for noise in ('cookies', 'Copyright', 'Shop', 'track()'):
+        assert noise not in doc['text']
+    assert doc['outline'] == [{'level': 1, 'text': 'Espresso basics'}, {'level': 2, 'text': 'Grind'}]
+    assert doc['links'] == [{'text': 'grind guide', 'href': 'http://cafe.test/grind'}]
+
+
+def test_paginate_breaks_between_paragraphs():
+    from page_text import paginate
+
+    text = '\n\n'.join(['a' * 30, 'b' * 30, 'c' * 30, 'word ' * 20])
+    pages = paginate(text, 70)
+    assert pages[0] == 'a' * 30 + '\n\n' + 'b' * 30
+    assert all(len(p) <= 70 for p in pages)
+    assert ''.join(pages).replace('\n', '').replace(' ', '') == text.replace('\n', '').replace(' ', '')
+    assert paginate('', 10) == ['']
+    with pytest.raises(ValueError):
+        paginate('hello world', -1)
+
+
+@pytest.mark.asyncio
+async def test_browser_view_pages_and_caches(monkeypatch):
+    tm = ToolManager(db_path=':memory:', browser_helper=PageDummyBrowser)
+    await tm.browser_navigate('http://a')
+    long_page = ''.join(f'<p>{"paragraph %d " % i * 10}</p>' for i in range(20))
+    tm.browsers['default'].body = long_page
+    tm.browsers['default'].stale = True
+
+    calls = []
+    import tool_manager
+    original = tool_manager.extract_readable
+    monkeypatch.setattr(tool_manager, 'extract_readable', lambda *a: calls.append(a) or original(*a))
+
+    first = await tm.browser_view(page_size=500)
+    assert first['page'] == 1 and first['pages'] > 1
+    assert 'outline' in first and 'links' in first
+    last = await tm.browser_view(page=99, page_size=500)
+    assert last['page'] == first['pages'] and 'outline' not in last
+    assert 'paragraph 19' in last['text']
+    assert len(calls) == 1
+    assert 'error' in await tm.browser_view(page=0)
+    assert 'error' in await tm.browser_view(page_size=-1)
+    await tm.close()
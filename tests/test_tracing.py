@@ -0,0 +1,73 @@
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+import pytest
+
+from tracing import Tracer, span, to_chrome_trace, traced
+
+
+@pytest.mark.asyncio
+async def test_spans_nest_across_tasks_and_skip_unsampled_runs():
+    tracer = Tracer(sample_rate=0, max_traces=5)
+
+    @traced("child")
+    async def child():
+        with span("leaf"):
+            await asyncio.sleep(0)
+
+    with tracer.trace("skipped") as trace:
+        assert trace is None
+        await child()
+    assert not tracer.traces
+
+    with tracer.trace("root", force=True) as trace:
+        await asyncio.gather(asyncio.create_task(child()), asyncio.create_task(child()))
+    spans = {s.span_id: s for s in trace.spans}
+    names = [s.name for s in trace.spans]
+    assert names.count("child") == 2 and names.count("leaf") == 2
+    root = trace.spans[0]
+    for s in trace.spans[1:]:
+        parent = spans[s.parent_id]
+        assert parent.name == ("child" if s.name == "leaf" else "root")
+    assert len({s.lane for s in trace.spans if s.name == "child"}) == 2
+    assert tracer.get(trace.trace_id) is trace and root.end is not None
+
+    events = [e for e in to_chrome_trace([trace])["traceEvents"] if e["ph"] == "X"]
+    assert events[0]["name"] == "root" and events[0]["ts"] == 0
+    assert all(e["dur"] >= 0 and e["pid"] == 1 for e in events)
+
+
+@pytest.mark.asyncio
+async def test_agent_run_records_pipeline_spans(monkeypatch):
+    from cappuccino_agent import CappuccinoAgent
+    from tool_manager import ToolManager
+    import tracing
+
+    monkeypatch.setattr(tracing.tracer, "sample_rate", 1.0)
+    tracing.tracer.clear()
+
+    async def fake_llm(text):
+        return f"done:{text}"
+
+    agent = CappuccinoAgent(llm=fake_llm, tool_manager=ToolManager(db_path=":memory:"), db_path=":memory:")
+    await agent.run("step one. step two")
+    await agent.call_llm("hello")
+    await agent.close()
+
+    run, call = tracing.tracer.traces
+    assert run.name == "agent.run" and call.name == "agent.call_llm"
+    by_id = {s.span_id: s for s in run.spans}
+    names = {s.name for s in run.spans}
+    assert {"planner.plan", "executor.step", "executor.llm_call", "db.history_insert"} <= names
+
+    def ancestors(s):
+        while s.parent_id:
+            s = by_id[s.parent_id]
+            yield s.name
+
+    llm_span = next(s for s in run.spans if s.name == "executor.llm_call")
+    assert list(ancestors(llm_span)) == ["executor.step", "agent.pipeline", "agent.run"]
+    assert "llm.request" in {s.name for s in call.spans}
@@ -0,0 +1,96 @@
+"""Content-addressed result caching for pure, file-based tools."""
+
+import asyncio
+import hashlib
+import inspect
+import json
+import os
+from functools import wraps
+from typing import Any, Dict, Optional
+
+from config import settings
+from result_cache import LRUCache
+
+_BLOCK_SIZE = 1 << 20
+_digests = LRUCache(4096)
+
+
+def file_fingerprint(path: str, hash_max_bytes: Optional[int] = None) -> str:
+    """Return a fingerprint identifying the current content of ``path``.
+
+    Files up to ``hash_max_bytes`` are identified by their SHA-256 digest,
+    memoised per (path, mtime, size) so unchanged files are hashed once.
+    Larger files fall back to mtime and size to avoid reading them whole.
+    """
+    if hash_max_bytes is None:
+        hash_max_bytes = int(settings.tool_cache_hash_max_mb * 1024 * 1024)
+    st = os.stat(path)
+    stamp = f"{st.st_mtime_ns}:{st.st_size}"
+    if st.st_size > hash_max_bytes:
+        return f"stat:{stamp}"
+    memo_key = f"{os.path.abspath(path)}:{stamp}"
+    digest = _digests.get(memo_key, 0)
+    if digest is None:
+        h = hashlib.sha256()
+        with open(path, "rb") as fh:
+            for block in iter(lambda: fh.read(_BLOCK_SIZE), b""):
+                h.update(block)
+        digest = f"sha256:{h.hexdigest()}"
+        _digests.set(memo_key, digest, None)
+    return digest
+
+
+def tool_cache_key(tool: str, arguments: Dict[str, Any], fingerprints: Dict[str, str]) -> str:
+    """Return ``<tool>:<sha256>`` over the non-file arguments and file fingerprints."""
+    payload = {"args": arguments, "files": fingerprints}
+    digest = hashlib.sha256(
+        json.dumps(payload, sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()
+    return f"{tool}:{digest}"
+
+
+def cached_tool(*file_params: str):
+    """Cache a ToolManager coroutine's results keyed by arguments and file content.
+
+    ``file_params`` name the arguments holding input file paths; the key
+    uses their content fingerprint instead of the path, so an edited file
+    is recomputed while an identical copy elsewhere is served from cache.
+    Results containing an ``error`` key are never stored, and calls whose
+    files cannot be read bypass the cache so the tool can report the
+    problem itself.
+    """
+
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @wraps(func)
+        async def wrapper(self, *args, **kwargs):
+            bound = signature.bind(self, *args, **kwargs)
+            bound.apply_defaults()
+            arguments = {
+                k: v for k, v in bound.arguments.items() if k != "self" and k not in file_params
+            }
+            try:
+                fingerprints = {
+                    name: await asyncio.to_thread(file_fingerprint, bound.arguments[name])
+                    for name in file_params
+                }
+            except OSError:
+                return await func(self, *args, **kwargs)
+            key = tool_cache_key(func.__name__, arguments, fingerprints)
+            cached = await self.get_cached_result(key)
+            if cached is not None:
+                return json.loads(cached)
+            result = await func(self, *args, **kwargs)
+            if isinstance(result, dict) and "error" not in result:
+                try:
+                    value = json.dumps(result)
+                except (TypeError, ValueError):
+                    return result
+                await self.set_cached_result(key, value)
+            return result
+
+        wrapper.__cached_tool__ = True
+        return wrapper
+
+    return decorator
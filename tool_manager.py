@@ -2,19 +2,41 @@ import asyncio
 import logging
 import os
 import json
+import hashlib
 import inspect
 import re
 import textwrap
+import time
 import subprocess
 import tempfile
+import wave
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
 from functools import wraps
-from typing import Any, Dict, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 
 from aiohttp import web
 
+from browser_pool import WAIT_UNTIL, BrowserPool, parse_resource_types
+
 import aiosqlite
 from PIL import Image, ImageDraw
+from audio_chunking import recognize_wav_chunk, transcribe_wav_chunk, wav_chunks, wav_duration
+from config import settings
+from db_writer import WriteBehindCommitter, configure_connection
+from graph_query import GraphQuery, parse_patterns
+from http_client import HttpClient
+from knowledge_graph import KnowledgeGraph
+from metrics import render_value, tool_metrics
+from page_text import extract_readable, paginate
+from model_registry import ModelRegistry, default_registry
+from result_cache import CachePolicy, TieredCache
+from shell_session import ShellPool, ShellSession
+from single_flight import SingleFlight
 from state_manager import StateManager
+from tool_cache import cached_tool
+from tracing import span
+from video_analysis import probe_video, read_sampled_frames, sample_indices, summarize
 
 
 
@@ -25,55 +47,131 @@ class ToolExecutionError(Exception):
 logger = logging.getLogger(__name__)
 
 
+class _Params:
+    """Tool arguments rendered only if a log record is actually formatted."""
+
+    __slots__ = ("signature", "args", "kwargs")
+
+    def __init__(self, signature: inspect.Signature, args: tuple, kwargs: dict) -> None:
+        self.signature = signature
+        self.args = args
+        self.kwargs = kwargs
+
+    def __str__(self) -> str:
+        try:
+            bound = self.signature.bind_partial(None, *self.args, **self.kwargs)
+            bound.apply_defaults()
+            items = list(bound.arguments.items())[1:]
+        except TypeError:
+            items = [(str(i), v) for i, v in enumerate(self.args)] + list(self.kwargs.items())
+        limit = settings.tool_log_param_chars
+        return "{" + ", ".join(f"{k}={render_value(v, limit)}" for k, v in items) + "}"
+
+
 def log_tool(func):
-    """Decorator to log tool execution with parameters and errors."""
+    """Decorator recording tool latency, errors and in-flight calls, and logging them.
+
+    The signature, span name and the tool's :class:`ToolStats` are resolved
+    once at decoration time. Parameters are only rendered, each capped at
+    ``TOOL_LOG_PARAM_CHARS``, when the log line is emitted, so a disabled
+    logger costs one level check per call. Exceptions are logged and
+    returned as ``{"error": ...}``; returned error dicts count as errors too.
+    """
+    name = func.__name__
+    signature = inspect.signature(func)
+    span_name = f"tool.{name}"
+    stats = tool_metrics.tool(name)
 
     @wraps(func)
     async def wrapper(self, *args, **kwargs):
-        bound = inspect.signature(func).bind_partial(self, *args, **kwargs)
-        bound.apply_defaults()
-        params = {k: v for k, v in bound.arguments.items() if k != "self"}
-        logger.info("tool=%s params=%s", func.__name__, params)
+        stats.calls += 1
+        stats.in_flight += 1
+        start = time.perf_counter()
+        failed = False
         try:
-            return await func(self, *args, **kwargs)
-        except TypeError as exc:
-            logger.exception("tool=%s params=%s", func.__name__, params)
-            return {"error": str(exc)}
+            with span(span_name):
+                result = await func(self, *args, **kwargs)
+            failed = isinstance(result, dict) and "error" in result
+            return result
         except Exception as exc:
-            logger.exception("tool=%s params=%s", func.__name__, params)
+            failed = True
+            logger.exception("tool=%s params=%s", name, _Params(signature, args, kwargs))
             return {"error": str(exc)}
-    wrapper.__signature__ = inspect.signature(func)
+        finally:
+            elapsed = time.perf_counter() - start
+            stats.in_flight -= 1
+            stats.latency.observe(elapsed)
+            if failed:
+                stats.errors += 1
+            if logger.isEnabledFor(logging.INFO):
+                logger.info(
+                    "tool=%s status=%s duration_ms=%.1f params=%s",
+                    name, "error" if failed else "ok", elapsed * 1000,
+                    _Params(signature, args, kwargs),
+                )
+    wrapper.__signature__ = signature
     return wrapper
 
 
+def _ocr_image(image_path: str) -> Dict[str, Any]:
+    """Run Tesseract on one image; module level so process pools can pickle it."""
+    import pytesseract
+    from PIL import Image
+
+    try:
+        with Image.open(image_path) as img:
+            return {"path": image_path, "text": pytesseract.image_to_string(img)}
+    except Exception as exc:
+        return {"path": image_path, "error": str(exc)}
+
+
 class BrowserHelper:
-    """Asynchronous helper around Playwright for basic page operations."""
+    """Asynchronous helper around one Playwright page for a browsing session.
+
+    Pages of different sessions live in separate contexts of a shared
+    :class:`BrowserPool` browser. The page HTML is captured after
+    navigation; interactions only mark it ``stale`` so it is re-read when
+    someone asks to view the page.
+    """
 
     def __init__(self) -> None:
-        self.playwright = None
-        self.browser = None
+        self.pool: Optional[BrowserPool] = None
+        self.context = None
         self.page = None
         self.console: list[str] = []
+        self.wait_until = "load"
+        self.url = ""
+        self.html = ""
+        self.stale = False
+        self.last_used = 0.0
+        self._owns_pool = False
 
     async def start(self) -> None:
-        from playwright.async_api import async_playwright
-
-        self.playwright = await async_playwright().start()
-        self.browser = await self.playwright.chromium.launch(headless=True)
-        context = await self.browser.new_context()
-        self.page = await context.new_page()
+        if self.pool is None:
+            self.pool = BrowserPool()
+            self._owns_pool = True
+        self.context = await self.pool.new_context()
+        self.page = await self.context.new_page()
         self.page.on("console", lambda msg: self.console.append(msg.text))
 
     async def close(self) -> None:
-        if self.browser:
-            await self.browser.close()
-        if self.playwright:
-            await self.playwright.stop()
-
-    async def navigate(self, url: str) -> str:
-        await self.page.goto(url)
+        if self.context:
+            await self.context.close()
+            self.context = None
+        if self._owns_pool and self.pool:
+            await self.pool.close()
+
+    async def navigate(self, url: str, wait_until: Optional[str] = None) -> str:
+        await self.page.goto(url, wait_until=wait_until or self.wait_until)
         return await self.page.content()
 
+    async def snapshot(self) -> str:
+        """Return the page HTML, re-reading it only if an action changed it."""
+        if self.stale:
+            self.html = await self.page.content()
+            self.stale = False
+        return self.html
+
     async def click(self, selector: str) -> None:
         await self.page.click(selector)
 
@@ -105,17 +203,51 @@ class BrowserHelper:
 class ToolManager:
     """Collection of asynchronous tools for the Cappuccino agent."""
 
-    def __init__(self, db_path: str = "agent_state.db", root_dir: Optional[str] = None, *, browser_helper: Optional[type] = None):
+    def __init__(
+        self,
+        db_path: str = "agent_state.db",
+        root_dir: Optional[str] = None,
+        *,
+        browser_helper: Optional[type] = None,
+        commit_latency: Optional[float] = None,
+        commit_batch: Optional[int] = None,
+        cache_policies: Optional[Dict[str, CachePolicy]] = None,
+        models: Optional[ModelRegistry] = None,
+        http: Optional[HttpClient] = None,
+    ):
         self.db_path = db_path
         self.root_dir = os.path.abspath(root_dir) if root_dir else None
         self.db_connection: Optional[aiosqlite.Connection] = None
-        self.shell_sessions: Dict[str, asyncio.subprocess.Process] = {}
-        self.browser_content: str = ""
-        self.browser_url: str = ""
+        self.commit_latency = settings.db_commit_latency if commit_latency is None else commit_latency
+        self.commit_batch = settings.db_commit_batch if commit_batch is None else commit_batch
+        self.db_writer: Optional[WriteBehindCommitter] = None
+        self.cache = TieredCache(
+            memory_entries=settings.cache_memory_entries,
+            max_rows=settings.cache_max_rows,
+            policies=cache_policies,
+        )
+        self.single_flight = SingleFlight()
+        self.models = models or default_registry
+        # Only a client created here is closed by close(); injected ones are shared.
+        self._owns_http = http is None
+        self.http = http or HttpClient()
+        self._process_pool: Optional[Executor] = None
+        self._whisper_pool: Optional[Executor] = None
+        self.shell_sessions: Dict[str, ShellSession] = {}
+        self.shell_pool = ShellPool(
+            max_sessions=settings.shell_pool_size,
+            idle_timeout=settings.shell_idle_timeout or None,
+            max_bytes=settings.shell_buffer_bytes,
+        )
         self.service_processes: Dict[int, Any] = {}
-        self.state_manager = StateManager(db_path)
+        self.state_manager = StateManager(db_path, shared=self.database)
+        self.graph: Optional[KnowledgeGraph] = None
+        self._graph_lock = asyncio.Lock()
+        self.graph_queries = GraphQuery(self.state_manager)
         self._browser_helper_cls = browser_helper or BrowserHelper
-        self.browser: Optional[BrowserHelper] = None
+        self.browsers: Dict[str, BrowserHelper] = {}
+        self.browser_pool = BrowserPool(parse_resource_types(settings.browser_block_resources))
+        self._browser_lock = asyncio.Lock()
 
     async def __aenter__(self) -> "ToolManager":
         """Open the database connection when entering the context."""
@@ -139,17 +271,53 @@ class ToolManager:
             except Exception:
                 pass
         self.service_processes.clear()
+        for session in list(self.shell_sessions.values()):
+            await session.kill()
+        self.shell_sessions.clear()
+        await self.shell_pool.close_all()
         if self.db_connection is not None:
+            await self.flush()
             await self.db_connection.close()
             self.db_connection = None
         await self.state_manager.close()
-        if self.browser:
-            await self.browser.close()
-            self.browser = None
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=False, cancel_futures=True)
+            self._process_pool = None
+        if self._whisper_pool is not None:
+            self._whisper_pool.shutdown(wait=False, cancel_futures=True)
+            self._whisper_pool = None
+        if self._owns_http:
+            await self.http.close()
+        for helper in list(self.browsers.values()):
+            await helper.close()
+        self.browsers.clear()
+        await self.browser_pool.close()
 
     # ------------------------------------------------------------------
     # Path utilities
     # ------------------------------------------------------------------
+    def _get_process_pool(self) -> Executor:
+        if self._process_pool is None:
+            self._process_pool = ProcessPoolExecutor(
+                max_workers=settings.media_process_workers or None
+            )
+        return self._process_pool
+
+    def _whisper_workers(self) -> int:
+        """Return the worker count for chunked Whisper transcription.
+
+        Every worker loads a private Whisper model outside the registry, so
+        the count is capped by how many copies fit ``MODEL_MEMORY_BUDGET_MB``.
+        """
+        workers = settings.media_process_workers or os.cpu_count() or 1
+        copies = self.models.copies_within_budget("whisper_tiny")
+        return min(workers, copies) if copies else workers
+
+    def _get_whisper_pool(self) -> Executor:
+        if self._whisper_pool is None:
+            self._whisper_pool = ProcessPoolExecutor(max_workers=self._whisper_workers())
+        return self._whisper_pool
+
     def _validate_path(self, path: str) -> str:
         """Return an absolute path optionally restricted to the workspace root."""
         abs_path = os.path.abspath(path if os.path.isabs(path) else os.path.join(self.root_dir or os.getcwd(), path))
@@ -161,11 +329,39 @@ class ToolManager:
     async def _get_db_connection(self) -> aiosqlite.Connection:
         if self.db_connection is None:
             self.db_connection = await aiosqlite.connect(self.db_path)
+            await configure_connection(self.db_connection)
+            self.db_writer = WriteBehindCommitter(
+                self.db_connection,
+                max_latency=self.commit_latency,
+                max_batch=self.commit_batch,
+            )
             await self._initialize_db()
+            await self.cache.attach(self.db_connection, self.db_writer)
         return self.db_connection
 
-    async def _initialize_db(self) -> None:
+    async def _get_db_writer(self) -> WriteBehindCommitter:
+        await self._get_db_connection()
+        assert self.db_writer is not None
+        return self.db_writer
+
+    async def database(self) -> Tuple[aiosqlite.Connection, WriteBehindCommitter]:
+        """Return the connection and its group committer, opening them if needed.
+
+        Other stores on the same file should write through these: a deferred
+        commit holds SQLite's write lock, so a second connection would wait
+        for it on every write.
+        """
         conn = await self._get_db_connection()
+        assert self.db_writer is not None
+        return conn, self.db_writer
+
+    async def flush(self) -> None:
+        """Commit all pending database writes before returning."""
+        if self.db_writer is not None:
+            await self.db_writer.flush()
+
+    async def _initialize_db(self) -> None:
+        conn = self.db_connection
         await conn.execute(
             """CREATE TABLE IF NOT EXISTS tasks (
                     id TEXT PRIMARY KEY,
@@ -202,65 +398,121 @@ class ToolManager:
 
     async def _add_history_entry(self, role: str, content: str) -> None:
         """Store a conversation message in the history table."""
-        conn = await self._get_db_connection()
-        await conn.execute(
-            "INSERT INTO history (role, content) VALUES (?, ?)",
-            (role, content),
-
-        )
-        await conn.commit()
+        writer = await self._get_db_writer()
+        with span("db.history_insert", role=role):
+            await writer.execute(
+                "INSERT INTO history (role, content) VALUES (?, ?)",
+                (role, content),
+            )
 
     async def _register_tool(self, name: str, code: str) -> None:
         """Persist a learned tool to the database."""
-        conn = await self._get_db_connection()
-        await conn.execute(
+        writer = await self._get_db_writer()
+        await writer.execute(
             "INSERT INTO tools(name, code) VALUES(?, ?)"
             " ON CONFLICT(name) DO UPDATE SET code=excluded.code",
             (name, code),
         )
-        await conn.commit()
+        await writer.flush()
+
+    @property
+    def browser(self) -> Optional[BrowserHelper]:
+        """The default session's browser helper, if started."""
+        return self.browsers.get("default")
+
+    @property
+    def browser_content(self) -> str:
+        return self.browser.html if self.browser else ""
+
+    @property
+    def browser_url(self) -> str:
+        return self.browser.url if self.browser else ""
+
+    async def _get_browser(self, session_id: str = "default") -> BrowserHelper:
+        """Return the session's page, opening a new context in the shared browser."""
+        async with self._browser_lock:
+            helper = self.browsers.get(session_id)
+            if helper is None:
+                if len(self.browsers) >= settings.browser_max_sessions:
+                    oldest = min(self.browsers, key=lambda sid: self.browsers[sid].last_used)
+                    await self.browsers.pop(oldest).close()
+                helper = self._browser_helper_cls()
+                helper.pool = self.browser_pool
+                helper.wait_until = settings.browser_wait_until
+                await helper.start()
+                self.browsers[session_id] = helper
+        helper.last_used = time.monotonic()
+        return helper
+
+    async def warm_up_models(self, names: Optional[list] = None) -> Dict[str, Any]:
+        """Load media models ahead of the first tool call.
+
+        Defaults to the comma-separated ``MODEL_WARMUP`` setting.
+        """
+        if names is None:
+            names = [n.strip() for n in settings.model_warmup.split(",") if n.strip()]
+        return await self.models.warm_up(names)
 
-    async def _get_browser(self) -> BrowserHelper:
-        if self.browser is None:
-            self.browser = self._browser_helper_cls()
-            await self.browser.start()
-        return self.browser
+    def model_stats(self) -> Dict[str, Any]:
+        """Return residency and load/inference timings for media models."""
+        return self.models.stats()
 
     # ------------------------------------------------------------------
     # Result caching helpers
     # ------------------------------------------------------------------
     async def get_cached_result(self, key: str) -> Optional[str]:
-        """Return cached value for key if present."""
-        conn = await self._get_db_connection()
-        await conn.execute(
-            "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT)"
-        )
-        async with conn.execute("SELECT value FROM cache WHERE key=?", (key,)) as cur:
-            row = await cur.fetchone()
-        return row[0] if row else None
+        """Return cached value for key if present and not expired."""
+        await self._get_db_connection()
+        return await self.cache.get(key)
 
-    async def set_cached_result(self, key: str, value: str) -> None:
-        """Store key/value pair in cache table."""
-        conn = await self._get_db_connection()
-        await conn.execute(
-            "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT)"
-        )
-        await conn.execute(
-            "REPLACE INTO cache (key, value) VALUES (?, ?)",
-            (key, value),
-        )
-        await conn.commit()
+    async def set_cached_result(self, key: str, value: str, ttl: Optional[float] = None) -> None:
+        """Store key/value pair, expiring after ``ttl`` or the namespace default."""
+        await self._get_db_connection()
+        await self.cache.set(key, value, ttl)
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """Return cache hit/miss counters grouped by key namespace."""
+        return self.cache.snapshot()
+
+    def tool_stats(self) -> Dict[str, Any]:
+        """Return call, error, in-flight and latency stats per tool."""
+        return tool_metrics.snapshot()
+
+    def tool_cache_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Return hits, misses and hit rate for each ``@cached_tool`` tool."""
+        stats = {}
+        for name, member in inspect.getmembers(type(self), inspect.iscoroutinefunction):
+            if not getattr(member, "__cached_tool__", False):
+                continue
+            counts = self.cache.stats.get(name, {})
+            hits = counts.get("memory_hits", 0) + counts.get("disk_hits", 0)
+            misses = counts.get("misses", 0)
+            total = hits + misses
+            stats[name] = {
+                "hits": hits,
+                "misses": misses,
+                "hit_rate": hits / total if total else 0.0,
+            }
+        return stats
 
     # ------------------------------------------------------------------
     # Knowledge graph
     # ------------------------------------------------------------------
+    async def _get_graph(self) -> KnowledgeGraph:
+        """Return the in-memory graph, loading it from the database once."""
+        if self.graph is None:
+            async with self._graph_lock:
+                if self.graph is None:
+                    self.graph = await self.state_manager.load_graph()
+        return self.graph
+
     @log_tool
     async def graph_add_entity(
         self, name: str, attrs: Optional[Dict[str, Any]] | None = None
     ) -> Dict[str, Any]:
-        graph = await self.state_manager.load_graph()
+        graph = await self._get_graph()
         graph.add_entity(name, **(attrs or {}))
-        await self.state_manager.save_graph(graph)
+        await self.state_manager.upsert_graph_node(name, graph.entity_attrs(name))
         return {"entity": name}
 
     @log_tool
@@ -271,70 +523,114 @@ class ToolManager:
         relation: str,
         attrs: Optional[Dict[str, Any]] | None = None,
     ) -> Dict[str, Any]:
-        graph = await self.state_manager.load_graph()
+        graph = await self._get_graph()
         graph.add_relation(source, target, relation, **(attrs or {}))
-        await self.state_manager.save_graph(graph)
+        await self.state_manager.upsert_graph_edge(
+            source, target, relation, graph.relation_attrs(source, target, relation)
+        )
         return {"source": source, "target": target, "relation": relation}
 
     @log_tool
     async def graph_query(self, entity: str) -> Dict[str, Any]:
-        graph = await self.state_manager.load_graph()
+        graph = await self._get_graph()
         return {"entity": entity, "relations": graph.query(entity)}
 
     @log_tool
     async def graph_remove_relation(self, source: str, target: str, relation: str) -> Dict[str, Any]:
-        graph = await self.state_manager.load_graph()
+        graph = await self._get_graph()
         graph.remove_relation(source, target, relation)
-        await self.state_manager.save_graph(graph)
+        await self.state_manager.delete_graph_edge(source, target, relation)
+        return {"status": "removed"}
+
+    @log_tool
+    async def graph_remove_entity(self, name: str) -> Dict[str, Any]:
+        graph = await self._get_graph()
+        graph.remove_entity(name)
+        await self.state_manager.delete_graph_node(name)
         return {"status": "removed"}
 
+    @log_tool
+    async def graph_incoming(self, entity: str, relation: Optional[str] = None) -> Dict[str, Any]:
+        """Return relations pointing at ``entity``, optionally of one type."""
+        return {"entity": entity, "relations": await self.graph_queries.incoming(entity, relation)}
+
+    @log_tool
+    async def graph_neighbors(
+        self,
+        entity: str,
+        hops: int = 1,
+        relations: Optional[list] = None,
+        direction: str = "out",
+        max_nodes: int = 1000,
+    ) -> Dict[str, Any]:
+        """Return entities within ``hops`` of ``entity`` with their distance."""
+        found = await self.graph_queries.neighbors(entity, hops, relations, direction, max_nodes)
+        return {"entity": entity, "neighbors": found}
+
+    @log_tool
+    async def graph_shortest_path(
+        self,
+        source: str,
+        target: str,
+        max_hops: int = 6,
+        relations: Optional[list] = None,
+        direction: str = "out",
+    ) -> Dict[str, Any]:
+        """Return the relations along a shortest path between two entities."""
+        path = await self.graph_queries.shortest_path(source, target, max_hops, relations, direction)
+        if path is None:
+            return {"error": "no path found"}
+        return {"path": path}
+
+    @log_tool
+    async def graph_match(self, pattern: str, limit: int = 100) -> Dict[str, Any]:
+        """Match patterns like ``(?x, works_at, ACME)`` and return variable bindings."""
+        bindings = await self.graph_queries.match(parse_patterns(pattern), limit)
+        return {"matches": bindings}
+
     # ------------------------------------------------------------------
     # Agent management
     # ------------------------------------------------------------------
     @log_tool
     async def agent_update_plan(self, task_id: str, plan: str) -> Dict[str, Any]:
         """Create or update a task plan."""
-        conn = await self._get_db_connection()
-        await conn.execute(
+        writer = await self._get_db_writer()
+        await writer.execute(
             "INSERT INTO tasks(id, plan) VALUES(?, ?) ON CONFLICT(id) DO UPDATE SET plan=excluded.plan",
             (task_id, plan),
         )
-        await conn.commit()
         return {"task_id": task_id, "plan": plan}
 
     @log_tool
     async def agent_advance_phase(self, task_id: str) -> Dict[str, Any]:
         """Advance task to the next phase."""
-        conn = await self._get_db_connection()
-        await conn.execute(
+        writer = await self._get_db_writer()
+        await writer.execute(
             "UPDATE tasks SET phase = phase + 1 WHERE id = ?",
             (task_id,),
         )
-        await conn.commit()
-        cur = await conn.execute("SELECT phase FROM tasks WHERE id = ?", (task_id,))
+        cur = await writer.conn.execute("SELECT phase FROM tasks WHERE id = ?", (task_id,))
         row = await cur.fetchone()
         return {"task_id": task_id, "phase": row[0] if row else None}
 
     @log_tool
     async def agent_end_task(self, task_id: str) -> Dict[str, Any]:
         """Mark task as completed."""
-        conn = await self._get_db_connection()
-        await conn.execute(
+        writer = await self._get_db_writer()
+        await writer.execute(
             "UPDATE tasks SET status='completed' WHERE id = ?",
             (task_id,),
         )
-        await conn.commit()
         return {"task_id": task_id, "status": "completed"}
 
     @log_tool
     async def agent_schedule_task(self, task_id: str, schedule: str) -> Dict[str, Any]:
         """Set schedule information for a task."""
-        conn = await self._get_db_connection()
-        await conn.execute(
+        writer = await self._get_db_writer()
+        await writer.execute(
             "UPDATE tasks SET schedule=? WHERE id = ?",
             (schedule, task_id),
         )
-        await conn.commit()
         return {"task_id": task_id, "schedule": schedule}
 
     @log_tool
@@ -357,28 +653,37 @@ class ToolManager:
     @log_tool
     async def message_notify_user(self, user_id: str, message: str) -> Dict[str, Any]:
         """Store a notification for the user."""
-        conn = await self._get_db_connection()
-        await conn.execute(
+        writer = await self._get_db_writer()
+        await writer.execute(
             "INSERT INTO messages(user_id, type, content) VALUES(?, 'notify', ?)",
             (user_id, message),
         )
-        await conn.commit()
         return {"user_id": user_id, "message": message}
 
     @log_tool
     async def message_ask_user(self, user_id: str, question: str) -> Dict[str, Any]:
         """Store a question for the user and return placeholder for response."""
-        conn = await self._get_db_connection()
-        await conn.execute(
+        writer = await self._get_db_writer()
+        await writer.execute(
             "INSERT INTO messages(user_id, type, content) VALUES(?, 'ask', ?)",
             (user_id, question),
         )
-        await conn.commit()
         return {"user_id": user_id, "question": question, "status": "awaiting"}
 
     # ------------------------------------------------------------------
     # Shell management
     # ------------------------------------------------------------------
+    def _reap_shell_sessions(self) -> None:
+        """Forget sessions that finished more than ``shell_reap_after`` seconds ago."""
+        cutoff = time.monotonic() - settings.shell_reap_after
+        for sid, session in list(self.shell_sessions.items()):
+            if session.finished_at is not None and session.finished_at < cutoff:
+                del self.shell_sessions[sid]
+
+    def _get_shell_session(self, session_id: str) -> Optional[ShellSession]:
+        self._reap_shell_sessions()
+        return self.shell_sessions.get(session_id)
+
     @log_tool
     async def shell_exec(self, command: str, session_id: str, working_dir: str = ".") -> Dict[str, Any]:
         """Execute a shell command asynchronously and store the session."""
@@ -386,59 +691,92 @@ class ToolManager:
             working_dir = self._validate_path(working_dir)
         except ValueError as e:
             return {"error": str(e)}
+        self._reap_shell_sessions()
         process = await asyncio.create_subprocess_shell(
             command,
             cwd=working_dir,
             stdout=asyncio.subprocess.PIPE,
             stderr=asyncio.subprocess.PIPE,
             stdin=asyncio.subprocess.PIPE,
+            start_new_session=True,
         )
-        self.shell_sessions[session_id] = process
+        self.shell_sessions[session_id] = ShellSession(process, settings.shell_buffer_bytes)
         return {"session_id": session_id, "status": "running"}
 
     @log_tool
-    async def shell_view(self, session_id: str) -> Dict[str, Any]:
-        """Return current stdout and stderr for the session."""
-        process = self.shell_sessions.get(session_id)
-        if not process:
+    async def shell_view(self, session_id: str, since: Optional[int] = None) -> Dict[str, Any]:
+        """Return output produced since offset ``since`` (default: since the last view).
+
+        Returns immediately with the new ``stdout``/``stderr`` text, the
+        ``offset`` to pass next time and whether the command is still running.
+        """
+        session = self._get_shell_session(session_id)
+        if not session:
             return {"error": "session not found"}
-        stdout = await process.stdout.read() if not process.stdout.at_eof() else b""
-        stderr = await process.stderr.read() if not process.stderr.at_eof() else b""
-        return {"stdout": stdout.decode(), "stderr": stderr.decode()}
+        return session.view(since)
 
     @log_tool
     async def shell_wait(self, session_id: str) -> Dict[str, Any]:
         """Wait for the process to complete and return outputs."""
-        process = self.shell_sessions.get(session_id)
-        if not process:
+        session = self._get_shell_session(session_id)
+        if not session:
             raise ToolExecutionError("session not found")
-        stdout, stderr = await process.communicate()
+        result = await session.wait()
         return {
-            "returncode": process.returncode,
-            "stdout": stdout.decode(),
-            "stderr": stderr.decode(),
+            "returncode": result["returncode"],
+            "stdout": result["stdout"],
+            "stderr": result["stderr"],
         }
 
     @log_tool
     async def shell_input(self, session_id: str, text: str) -> Dict[str, Any]:
         """Send input to the running shell session."""
-        process = self.shell_sessions.get(session_id)
-        if not process or process.stdin is None:
+        session = self._get_shell_session(session_id)
+        if not session or session.process.stdin is None:
             return {"error": "session not found"}
-        process.stdin.write(text.encode())
-        await process.stdin.drain()
+        session.process.stdin.write(text.encode())
+        await session.process.stdin.drain()
         return {"status": "sent"}
 
     @log_tool
     async def shell_kill(self, session_id: str) -> Dict[str, Any]:
         """Terminate the shell session."""
-        process = self.shell_sessions.get(session_id)
-        if not process:
+        session = self._get_shell_session(session_id)
+        if not session:
             return {"error": "session not found"}
-        process.kill()
-        await process.wait()
+        await session.kill()
         return {"status": "killed"}
 
+    @log_tool
+    async def shell_run(
+        self,
+        command: str,
+        session_id: str,
+        working_dir: str = ".",
+        timeout: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """Run a command in the session's persistent shell and wait for it.
+
+        The shell keeps its working directory, environment variables and
+        activated virtualenvs between calls; ``working_dir`` only sets where
+        a new session's shell starts. Output is stdout and stderr combined.
+        """
+        try:
+            working_dir = self._validate_path(working_dir)
+        except ValueError as e:
+            return {"error": str(e)}
+        if timeout is None:
+            timeout = settings.shell_command_timeout or None
+        result = await self.shell_pool.run(session_id, command, working_dir, timeout)
+        return {"session_id": session_id, **result}
+
+    @log_tool
+    async def shell_close(self, session_id: str) -> Dict[str, Any]:
+        """Terminate a persistent shell started by ``shell_run``."""
+        if not await self.shell_pool.close(session_id):
+            return {"error": "session not found"}
+        return {"status": "closed"}
+
     # ------------------------------------------------------------------
     # File operations
     # ------------------------------------------------------------------
@@ -511,15 +849,10 @@ class ToolManager:
             return {"error": str(e)}
 
         async def _generate_sd() -> None:
-            model_id = os.getenv("STABLE_DIFFUSION_MODEL")
-            if not model_id:
-                raise RuntimeError("model not configured")
-            from diffusers import StableDiffusionPipeline  # type: ignore
-            import torch  # type: ignore
+            def _render(pipe) -> None:
+                pipe(text).images[0].save(output_path)
 
-            pipe = StableDiffusionPipeline.from_pretrained(model_id, torch_dtype=torch.float32)
-            image = pipe(text).images[0]
-            image.save(output_path)
+            await self.models.run("stable_diffusion", _render)
 
         async def _generate_placeholder() -> None:
             img = Image.new("RGB", (400, 200), color="white")
@@ -560,6 +893,7 @@ class ToolManager:
 
 
     @log_tool
+    @cached_tool("image_path")
     async def media_analyze_image(self, image_path: str) -> Dict[str, Any]:
         """Extract text from an image using pytesseract."""
         try:
@@ -574,58 +908,240 @@ class ToolManager:
 
         return await asyncio.to_thread(_ocr)
 
+    async def iter_media_analyze_image(self, image_paths: List[str]) -> AsyncIterator[Dict[str, Any]]:
+        """Yield OCR results in completion order, spreading images over a process pool."""
+        try:
+            import pytesseract  # noqa: F401
+        except Exception:
+            yield {"error": "pytesseract not available"}
+            return
+
+        loop = asyncio.get_running_loop()
+        pool = self._get_process_pool()
+        futures = [loop.run_in_executor(pool, _ocr_image, path) for path in image_paths]
+        try:
+            for fut in asyncio.as_completed(futures):
+                yield await fut
+        finally:
+            for fut in futures:
+                fut.cancel()
+
+    @log_tool
+    async def media_analyze_image_batch(self, image_paths: List[str]) -> Dict[str, Any]:
+        """Extract text from many images in parallel."""
+        results = [r async for r in self.iter_media_analyze_image(image_paths)]
+        if len(results) == 1 and "path" not in results[0]:
+            return results[0]
+        return {"results": results}
+
     @log_tool
+    @cached_tool("audio_path")
     async def media_recognize_speech(self, audio_path: str) -> Dict[str, Any]:
         """Transcribe speech from an audio file using SpeechRecognition."""
         try:
-            import speech_recognition as sr
+            import speech_recognition  # noqa: F401
         except Exception:
             return {"error": "speech_recognition not available"}
 
-        def _recognize() -> Dict[str, Any]:
-            recognizer = sr.Recognizer()
-            with sr.AudioFile(audio_path) as source:
-                audio = recognizer.record(source)
-            try:
-                text = recognizer.recognize_sphinx(audio)
-            except Exception:
-                return {"error": "recognition failed"}
-            return {"text": text}
-
-        return await asyncio.to_thread(_recognize)
+        return self._join_segments([s async for s in self._iter_transcribe(audio_path, "sphinx")])
 
     @log_tool
+    @cached_tool("image_path")
     async def image_classify(self, image_path: str) -> Dict[str, Any]:
         """Classify objects in an image using torchvision."""
         try:
             import torch
-            from torchvision import models
-            from torchvision.models import MobileNet_V2_Weights
+            import torchvision  # noqa: F401
             from PIL import Image
         except Exception:
             return {"error": "torchvision not available"}
 
-        def _classify() -> Dict[str, Any]:
-            weights = MobileNet_V2_Weights.DEFAULT
-            model = models.mobilenet_v2(weights=weights)
-            model.eval()
-            preprocess = weights.transforms()
+        def _classify(bundle: Dict[str, Any]) -> Dict[str, Any]:
             img = Image.open(image_path)
             with torch.no_grad():
-                batch = preprocess(img).unsqueeze(0)
-                output = model(batch)[0]
+                batch = bundle["preprocess"](img).unsqueeze(0)
+                output = bundle["model"](batch)[0]
                 probs = torch.nn.functional.softmax(output, dim=0)
                 idx = int(probs.argmax())
-                label = weights.meta["categories"][idx]
+                label = bundle["categories"][idx]
                 score = float(probs[idx])
             return {"label": label, "score": score}
 
         try:
-            return await asyncio.to_thread(_classify)
+            return await self.models.run("mobilenet_v2", _classify)
         except Exception as e:
             return {"error": str(e)}
 
+    async def iter_image_classify(
+        self, image_paths: List[str], batch_size: int = 16
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Yield classifications batch by batch, in input order.
+
+        Images are decoded and preprocessed in parallel worker threads; the
+        next batch is decoded while the current one runs through MobileNet
+        as a single stacked tensor.
+        """
+        try:
+            import torch
+            from PIL import Image
+        except Exception:
+            yield {"error": "torchvision not available"}
+            return
+
+        try:
+            bundle = await self.models.get("mobilenet_v2")
+        except Exception as e:
+            yield {"error": str(e)}
+            return
+
+        def _load(path: str):
+            with Image.open(path) as img:
+                return bundle["preprocess"](img.convert("RGB"))
+
+        def _predict(bundle: Dict[str, Any], tensors: list) -> list:
+            with torch.no_grad():
+                probs = torch.nn.functional.softmax(bundle["model"](torch.stack(tensors)), dim=1)
+                scores, idxs = probs.max(dim=1)
+            return [(bundle["categories"][int(i)], float(sc)) for sc, i in zip(scores, idxs)]
+
+        def _decode(chunk: List[str]):
+            return asyncio.gather(
+                *[asyncio.to_thread(_load, p) for p in chunk], return_exceptions=True
+            )
+
+        chunks = [image_paths[i:i + batch_size] for i in range(0, len(image_paths), batch_size)]
+        pending = asyncio.ensure_future(_decode(chunks[0])) if chunks else None
+        for idx, chunk in enumerate(chunks):
+            decoded = await pending
+            if idx + 1 < len(chunks):
+                pending = asyncio.ensure_future(_decode(chunks[idx + 1]))
+            tensors = [t for t in decoded if not isinstance(t, BaseException)]
+            predictions = iter(
+                await self.models.run("mobilenet_v2", _predict, tensors) if tensors else []
+            )
+            for path, tensor in zip(chunk, decoded):
+                if isinstance(tensor, BaseException):
+                    yield {"path": path, "error": str(tensor)}
+                else:
+                    label, score = next(predictions)
+                    yield {"path": path, "label": label, "score": score}
+
     @log_tool
+    async def image_classify_batch(self, image_paths: List[str], batch_size: int = 16) -> Dict[str, Any]:
+        """Classify many images using batched MobileNet inference."""
+        results = [r async for r in self.iter_image_classify(image_paths, batch_size)]
+        if len(results) == 1 and "path" not in results[0]:
+            return results[0]
+        return {"results": results}
+
+    @staticmethod
+    def _join_segments(segments: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Concatenate segment text as produced, with a space only between chunks.
+
+        Whisper's segments carry their own leading spaces where the language
+        uses them, so adding separators would break up CJK text.
+        """
+        chunks: Dict[int, List[str]] = {}
+        for seg in segments:
+            if seg.get("text"):
+                chunks.setdefault(seg.get("chunk", 0), []).append(seg["text"])
+        if not chunks and any("error" in seg for seg in segments):
+            return {"error": "recognition failed"}
+        texts = ("".join(parts).strip() for _, parts in sorted(chunks.items()))
+        return {"text": " ".join(t for t in texts if t)}
+
+    def _audio_chunks(self, audio_path: str, chunk_seconds: float) -> List[tuple]:
+        """Return silence-aligned chunks for long WAV files, ``[]`` otherwise."""
+        try:
+            if wav_duration(audio_path) <= chunk_seconds:
+                return []
+        except (wave.Error, EOFError, OSError):
+            return []
+        return wav_chunks(audio_path, min_chunk=chunk_seconds / 2, max_chunk=chunk_seconds)
+
+    async def _iter_transcribe(
+        self, audio_path: str, engine: str, chunk_seconds: Optional[float] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Yield ``{"start", "end", "text", "chunk"}`` segments in file order.
+
+        Segment text is left as the engine produced it. Long WAV files are
+        cut at silences and the chunks transcribed in a process pool, with at
+        most two chunks per worker in flight; other inputs are transcribed in
+        one pass as chunk 0, streaming Whisper's segments as it produces them.
+        """
+        chunk_seconds = chunk_seconds or settings.audio_chunk_seconds
+        chunks = await asyncio.to_thread(self._audio_chunks, audio_path, chunk_seconds)
+        if not chunks:
+            if engine == "sphinx":
+                for seg in await asyncio.to_thread(recognize_wav_chunk, audio_path):
+                    yield {**seg, "chunk": 0}
+                return
+            segments = await self.models.run(
+                "whisper_tiny", lambda model: iter(model.transcribe(audio_path)[0])
+            )
+            while True:
+                seg = await asyncio.to_thread(next, segments, None)
+                if seg is None:
+                    break
+                yield {
+                    "start": getattr(seg, "start", None),
+                    "end": getattr(seg, "end", None),
+                    "text": seg.text,
+                    "chunk": 0,
+                }
+            return
+
+        loop = asyncio.get_running_loop()
+        if engine == "whisper":
+            pool, worker = self._get_whisper_pool(), transcribe_wav_chunk
+            window = 2 * self._whisper_workers()
+        else:
+            pool, worker = self._get_process_pool(), recognize_wav_chunk
+            window = 2 * (settings.media_process_workers or os.cpu_count() or 1)
+        remaining = iter(chunks)
+        pending: deque = deque()
+
+        def submit() -> None:
+            chunk = next(remaining, None)
+            if chunk is not None:
+                pending.append(loop.run_in_executor(pool, worker, audio_path, *chunk))
+
+        try:
+            for _ in range(window):
+                submit()
+            index = 0
+            while pending:
+                fut = pending.popleft()
+                submit()
+                for seg in await fut:
+                    yield {**seg, "chunk": index}
+                index += 1
+        finally:
+            for fut in pending:
+                fut.cancel()
+
+    async def iter_audio_transcribe(
+        self, audio_path: str, chunk_seconds: Optional[float] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Yield transcript segments with timestamps as they become available."""
+        try:
+            import faster_whisper  # noqa: F401
+            engine = "whisper"
+        except Exception:
+            try:
+                import speech_recognition  # noqa: F401
+                engine = "sphinx"
+            except Exception:
+                yield {"error": "no transcription model available"}
+                return
+        async for seg in self._iter_transcribe(audio_path, engine, chunk_seconds):
+            if seg.get("text"):
+                seg["text"] = seg["text"].strip()
+            seg.pop("chunk")
+            yield seg
+
+    @log_tool
+    @cached_tool("audio_path")
     async def audio_transcribe(self, audio_path: str) -> Dict[str, Any]:
         """Transcribe speech from an audio file using Whisper or SpeechRecognition."""
         try:
@@ -634,81 +1150,60 @@ class ToolManager:
             WhisperModel = None  # type: ignore
 
         if WhisperModel is not None:
-            def _whisper() -> Dict[str, Any]:
-                model = WhisperModel("tiny", device="cpu", compute_type="int8")
-                segments, _ = model.transcribe(audio_path)
-                text = "".join(seg.text for seg in segments)
-                return {"text": text.strip()}
-
             try:
-                return await asyncio.to_thread(_whisper)
+                return self._join_segments(
+                    [s async for s in self._iter_transcribe(audio_path, "whisper")]
+                )
             except Exception:
                 pass
 
         try:
-            import speech_recognition as sr
+            import speech_recognition  # noqa: F401
         except Exception:
             return {"error": "no transcription model available"}
 
-        def _recognize() -> Dict[str, Any]:
-            recognizer = sr.Recognizer()
-            with sr.AudioFile(audio_path) as source:
-                audio = recognizer.record(source)
-            try:
-                text = recognizer.recognize_sphinx(audio)
-            except Exception:
-                return {"error": "recognition failed"}
-            return {"text": text}
+        return self._join_segments([s async for s in self._iter_transcribe(audio_path, "sphinx")])
 
-        return await asyncio.to_thread(_recognize)
+    async def _sample_video(
+        self, video_path: str, max_frames: int, meta: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Summarize ``max_frames`` sampled frames decoded on parallel workers."""
+        if meta is None:
+            meta = await asyncio.to_thread(probe_video, video_path)
+        indices = sample_indices(meta["frames"], max_frames)
+        workers = max(1, min(settings.video_workers, len(indices)))
+        size = -(-len(indices) // workers)
+        parts = await asyncio.gather(
+            *[
+                asyncio.to_thread(read_sampled_frames, video_path, indices[i:i + size])
+                for i in range(0, len(indices), size)
+            ]
+        )
+        return summarize([s for part in parts for s in part], meta["fps"])
 
     @log_tool
-    async def media_describe_video(self, video_path: str) -> Dict[str, Any]:
-        """Return the average color of the first frame of a video."""
+    @cached_tool("video_path")
+    async def media_describe_video(self, video_path: str, max_frames: Optional[int] = None) -> Dict[str, Any]:
+        """Summarize colors, brightness, motion and scene cuts over sampled frames."""
         try:
-            import cv2
+            import cv2  # noqa: F401
         except Exception:
             return {"error": "opencv not available"}
 
-        def _describe() -> Dict[str, Any]:
-            cap = cv2.VideoCapture(video_path)
-            if not cap.isOpened():
-                raise ValueError("unable to open video")
-            ret, frame = cap.read()
-            cap.release()
-            if not ret:
-                raise ValueError("unable to read frame")
-            avg_color = frame.mean(axis=(0, 1))
-            return {"avg_color": [float(x) for x in avg_color]}
-
-        return await asyncio.to_thread(_describe)
-
-    async def media_analyze_video(self, video_path: str) -> Dict[str, Any]:
-        """Return basic metadata for a video file."""
+        return await self._sample_video(video_path, max_frames or settings.video_frame_budget)
+
+    @cached_tool("video_path")
+    async def media_analyze_video(self, video_path: str, max_frames: int = 0) -> Dict[str, Any]:
+        """Return basic metadata for a video file, plus a sampled summary if ``max_frames`` > 0."""
         try:
-            import cv2
+            import cv2  # noqa: F401
         except Exception:
             return {"error": "opencv not available"}
 
-        def _analyze() -> Dict[str, Any]:
-            cap = cv2.VideoCapture(video_path)
-            if not cap.isOpened():
-                raise ValueError("unable to open video")
-            frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-            fps = float(cap.get(cv2.CAP_PROP_FPS)) or 0.0
-            width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-            height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-            cap.release()
-            duration = frame_count / fps if fps else 0.0
-            return {
-                "frames": frame_count,
-                "fps": fps,
-                "width": width,
-                "height": height,
-                "duration": duration,
-            }
-
-        return await asyncio.to_thread(_analyze)
+        meta = await asyncio.to_thread(probe_video, video_path)
+        if max_frames > 0:
+            meta["summary"] = await self._sample_video(video_path, max_frames, meta)
+        return meta
 
 
     # ------------------------------------------------------------------
@@ -722,36 +1217,31 @@ class ToolManager:
         if cached:
             return json.loads(cached)
 
-        import aiohttp
-        from bs4 import BeautifulSoup
-
-        url = "https://duckduckgo.com/html/?q=" + query
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url) as resp:
-                text = await resp.text()
-        soup = BeautifulSoup(text, "html.parser")
-        results = []
-        for a in soup.select("a.result__a"):
-            results.append({"title": a.text, "href": a.get("href")})
-        output = {"results": results}
-        await self.set_cached_result(cache_key, json.dumps(output))
-        return output
+        async def _search() -> Dict[str, Any]:
+            from bs4 import BeautifulSoup
 
-    @log_tool
-    async def info_search_image(self, query: str) -> Dict[str, Any]:
+            url = "https://duckduckgo.com/html/?q=" + query
+            status, text = await self.http.fetch("GET", url, with_status=True)
+            if status >= 400:
+                return {"error": f"search failed with HTTP {status}", "status": status, "body": text}
+            soup = BeautifulSoup(text, "html.parser")
+            results = []
+            for a in soup.select("a.result__a"):
+                results.append({"title": a.text, "href": a.get("href")})
+            output = {"results": results}
+            await self.set_cached_result(cache_key, json.dumps(output))
+            return output
 
+        return await self.single_flight.do(cache_key, _search)
 
+    @log_tool
+    async def info_search_image(self, query: str) -> Dict[str, Any]:
         """Search images using the Unsplash API."""
-        import aiohttp
-
         url = f"https://unsplash.com/napi/search/photos?query={query}"
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url) as resp:
-                try:
-                    data = await resp.json()
-                except Exception:
-                    return {"error": "image search failed"}
-
+        try:
+            data = await self.http.get_json(url)
+        except Exception:
+            return {"error": "image search failed"}
 
         results = [
             {
@@ -766,107 +1256,159 @@ class ToolManager:
 
     @log_tool
     async def info_search_api(self, url: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
-        """Perform a generic API GET request."""
-        import aiohttp
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, params=params) as resp:
-                data = await resp.text()
-        return {"response": data}
+        """Perform a generic API GET request.
+
+        The body is returned for error statuses too, next to the ``status``.
+        """
+        status, data = await self.http.fetch("GET", url, params=params, with_status=True)
+        return {"status": status, "response": data}
 
     # ------------------------------------------------------------------
     # Browser automation using Playwright
     # ------------------------------------------------------------------
     @log_tool
-    async def browser_navigate(self, url: str = "") -> Dict[str, Any]:
-        """Navigate an embedded headless browser to the given URL."""
+    async def browser_navigate(
+        self, url: str = "", wait_until: Optional[str] = None, session_id: str = "default"
+    ) -> Dict[str, Any]:
+        """Navigate an embedded headless browser to the given URL.
+
+        ``wait_until`` is one of ``commit``, ``domcontentloaded``, ``load``
+        or ``networkidle`` and defaults to ``BROWSER_WAIT_UNTIL``.
+        """
+        if wait_until is not None and wait_until not in WAIT_UNTIL:
+            return {"error": f"wait_until must be one of {', '.join(WAIT_UNTIL)}"}
         try:
-            browser = await self._get_browser()
-            self.browser_content = await browser.navigate(url)
-            self.browser_url = url
-            return {"status": "success", "url": self.browser_url}
+            browser = await self._get_browser(session_id)
+            browser.html = await browser.navigate(url, wait_until)
+            browser.url = url
+            browser.stale = False
+            return {"status": "success", "url": browser.url}
         except Exception as e:  # pragma: no cover - unexpected
             logging.error(f"browser_navigate error: {e}")
             return {"error": str(e)}
 
 
     @log_tool
-    async def browser_view(self) -> Dict[str, Any]:
-        """Return a preview of the last fetched page."""
-        if not self.browser_content:
+    async def browser_view(
+        self, session_id: str = "default", page: int = 1, page_size: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """Return the readable text of the current page, one page of text at a time.
+
+        The first page also carries the heading outline and the links found
+        in the main content. Extraction runs once per distinct snapshot and
+        is cached by URL and content hash.
+        """
+        if page < 1:
+            return {"error": "page must be at least 1"}
+        if page_size is not None and page_size < 1:
+            return {"error": "page_size must be at least 1"}
+        browser = self.browsers.get(session_id)
+        if browser is None or not browser.url:
             return {"error": "no page loaded"}
-        return {"url": self.browser_url, "preview": self.browser_content[:500]}
+        html = await browser.snapshot()
+        digest = hashlib.sha256(f"{browser.url}\0{html}".encode("utf-8")).hexdigest()
+        cache_key = f"browser_view:{digest}"
+        cached = await self.get_cached_result(cache_key)
+        if cached:
+            doc = json.loads(cached)
+        else:
+            doc = await asyncio.to_thread(extract_readable, html, browser.url)
+            await self.set_cached_result(cache_key, json.dumps(doc))
+        pages = paginate(doc["text"], page_size or settings.browser_view_chars)
+        page = min(page, len(pages))
+        result = {
+            "url": browser.url,
+            "title": doc["title"],
+            "page": page,
+            "pages": len(pages),
+            "text": pages[page - 1],
+        }
+        if page == 1:
+            result["outline"] = doc["outline"]
+            result["links"] = doc["links"][: settings.browser_view_links]
+        return result
 
 
     @log_tool
 
-    async def browser_click(self, selector: str) -> Dict[str, Any]:
-        browser = await self._get_browser()
+    async def browser_click(self, selector: str, session_id: str = "default") -> Dict[str, Any]:
+        browser = await self._get_browser(session_id)
         await browser.click(selector)
-        self.browser_content = await browser.page.content()
+        browser.stale = True
         return {"status": "clicked"}
 
     @log_tool
-    async def browser_input(self, selector: str, text: str) -> Dict[str, Any]:
-        browser = await self._get_browser()
+    async def browser_input(self, selector: str, text: str, session_id: str = "default") -> Dict[str, Any]:
+        browser = await self._get_browser(session_id)
         await browser.fill(selector, text)
-        self.browser_content = await browser.page.content()
+        browser.stale = True
         return {"status": "input"}
 
     @log_tool
-    async def browser_move_mouse(self, x: int, y: int) -> Dict[str, Any]:
-        browser = await self._get_browser()
+    async def browser_move_mouse(self, x: int, y: int, session_id: str = "default") -> Dict[str, Any]:
+        browser = await self._get_browser(session_id)
         await browser.move_mouse(x, y)
         return {"status": "moved"}
 
     @log_tool
-    async def browser_press_key(self, key: str) -> Dict[str, Any]:
-        browser = await self._get_browser()
+    async def browser_press_key(self, key: str, session_id: str = "default") -> Dict[str, Any]:
+        browser = await self._get_browser(session_id)
         await browser.press_key(key)
-        self.browser_content = await browser.page.content()
+        browser.stale = True
         return {"status": "pressed"}
 
     @log_tool
-    async def browser_select_option(self, selector: str, option: str) -> Dict[str, Any]:
-        browser = await self._get_browser()
+    async def browser_select_option(self, selector: str, option: str, session_id: str = "default") -> Dict[str, Any]:
+        browser = await self._get_browser(session_id)
         await browser.select_option(selector, option)
-        self.browser_content = await browser.page.content()
+        browser.stale = True
         return {"status": "selected"}
 
     @log_tool
-    async def browser_save_image(self, selector: str, output_path: str) -> Dict[str, Any]:
+    async def browser_save_image(self, selector: str, output_path: str, session_id: str = "default") -> Dict[str, Any]:
         try:
-            browser = await self._get_browser()
+            browser = await self._get_browser(session_id)
             await browser.save_image(selector, output_path)
             return {"status": "saved", "path": output_path}
         except Exception as e:
             return {"error": str(e)}
 
     @log_tool
-    async def browser_scroll_up(self, amount: int) -> Dict[str, Any]:
-        browser = await self._get_browser()
+    async def browser_scroll_up(self, amount: int, session_id: str = "default") -> Dict[str, Any]:
+        browser = await self._get_browser(session_id)
         await browser.scroll_by(-amount)
         return {"status": "scrolled"}
 
     @log_tool
-    async def browser_scroll_down(self, amount: int) -> Dict[str, Any]:
-        browser = await self._get_browser()
+    async def browser_scroll_down(self, amount: int, session_id: str = "default") -> Dict[str, Any]:
+        browser = await self._get_browser(session_id)
         await browser.scroll_by(amount)
         return {"status": "scrolled"}
 
     @log_tool
-    async def browser_console_exec(self, script: str) -> Dict[str, Any]:
-        browser = await self._get_browser()
+    async def browser_console_exec(self, script: str, session_id: str = "default") -> Dict[str, Any]:
+        browser = await self._get_browser(session_id)
         result = await browser.eval_js(script)
-        self.browser_content = await browser.page.content()
+        browser.stale = True
         return {"result": result}
 
     @log_tool
-    async def browser_console_view(self) -> Dict[str, Any]:
-        browser = await self._get_browser()
+    async def browser_console_view(self, session_id: str = "default") -> Dict[str, Any]:
+        browser = await self._get_browser(session_id)
         if not browser.console:
             return {"error": "no console messages"}
         return {"messages": browser.console}
 
+    @log_tool
+    async def browser_close(self, session_id: str = "default") -> Dict[str, Any]:
+        """Close a browsing session's page and context."""
+        async with self._browser_lock:
+            browser = self.browsers.pop(session_id, None)
+        if browser is None:
+            return {"error": "session not found"}
+        await browser.close()
+        return {"status": "closed"}
+
     # ------------------------------------------------------------------
     # Service deployment (placeholders)
     # ------------------------------------------------------------------
@@ -0,0 +1,217 @@
+"""Sampled per-run tracing with spans propagated through contextvars.
+
+A trace starts at the top of an agent run or API request; :func:`span`
+blocks inside it record timed child spans. Because the current span lives
+in a ``ContextVar``, tasks created during the run inherit their parent
+span automatically. Finished traces are kept in a bounded buffer and can
+be exported in the Chrome trace-event format (``chrome://tracing`` or
+Perfetto).
+"""
+
+import asyncio
+import contextvars
+import os
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional
+
+from config import settings
+
+
+class Span:
+    __slots__ = ("name", "span_id", "parent_id", "start", "end", "lane", "attrs")
+
+    def __init__(self, name: str, parent_id: Optional[str], lane: int, attrs: Dict[str, Any]) -> None:
+        self.name = name
+        self.span_id = os.urandom(4).hex()
+        self.parent_id = parent_id
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+        self.lane = lane
+        self.attrs = attrs
+
+
+class Trace:
+    """Spans recorded for one sampled run."""
+
+    def __init__(self, name: str) -> None:
+        self.trace_id = os.urandom(8).hex()
+        self.name = name
+        self.started_at = time.time()
+        self.spans: List[Span] = []
+        self._lanes: Dict[Any, int] = {}
+        self._lock = threading.Lock()
+
+    def lane(self) -> int:
+        """Return a small id for the running task or thread, one timeline row each."""
+        try:
+            owner: Any = asyncio.current_task()
+        except RuntimeError:
+            owner = None
+        if owner is None:
+            owner = threading.get_ident()
+        with self._lock:
+            return self._lanes.setdefault(id(owner), len(self._lanes) + 1)
+
+    @property
+    def duration(self) -> Optional[float]:
+        if not self.spans or self.spans[0].end is None:
+            return None
+        return self.spans[0].end - self.spans[0].start
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "started_at": self.started_at,
+            "duration": self.duration,
+            "spans": len(self.spans),
+        }
+
+
+_trace: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar("trace", default=None)
+_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("span", default=None)
+
+
+class _NoopSpan:
+    """Shared stand-in returned by :func:`span` when the run is not sampled."""
+
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, *exc: Any) -> None:
+        return None
+
+
+_NOOP = _NoopSpan()
+
+
+@contextmanager
+def _record(trace: Trace, name: str, attrs: Dict[str, Any]) -> Iterator[Span]:
+    parent = _span.get()
+    current = Span(name, parent.span_id if parent else None, trace.lane(), attrs)
+    trace.spans.append(current)
+    token = _span.set(current)
+    try:
+        yield current
+    except BaseException as exc:
+        current.attrs["error"] = type(exc).__name__
+        raise
+    finally:
+        current.end = time.perf_counter()
+        _span.reset(token)
+
+
+def span(name: str, **attrs: Any) -> Any:
+    """Time the enclosed block as a child of the current span, if the run is traced."""
+    trace = _trace.get()
+    if trace is None:
+        return _NOOP
+    return _record(trace, name, attrs)
+
+
+def traced(name: Optional[str] = None):
+    """Decorate a coroutine function so each call is recorded as a span."""
+
+    def decorator(func):
+        label = name or func.__qualname__
+
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            trace = _trace.get()
+            if trace is None:
+                return await func(*args, **kwargs)
+            with _record(trace, label, {}):
+                return await func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def current_trace_id() -> Optional[str]:
+    trace = _trace.get()
+    return trace.trace_id if trace else None
+
+
+class Tracer:
+    """Decide which runs are traced and keep the most recent finished traces."""
+
+    def __init__(self, sample_rate: Optional[float] = None, max_traces: Optional[int] = None) -> None:
+        self.sample_rate = settings.trace_sample_rate if sample_rate is None else sample_rate
+        self.traces: Deque[Trace] = deque(maxlen=max_traces or settings.trace_buffer_size)
+
+    @contextmanager
+    def trace(self, name: str, *, force: bool = False, **attrs: Any) -> Iterator[Optional[Trace]]:
+        """Trace the enclosed run when sampled, or join the trace already active.
+
+        Nested calls, such as ``call_llm`` inside a traced ``run``, become
+        spans of the outer trace instead of starting a new one.
+        """
+        if _trace.get() is not None:
+            with span(name, **attrs):
+                yield _trace.get()
+            return
+        if not force and (self.sample_rate <= 0 or random.random() >= self.sample_rate):
+            yield None
+            return
+        current = Trace(name)
+        token = _trace.set(current)
+        try:
+            with _record(current, name, attrs):
+                yield current
+        finally:
+            _trace.reset(token)
+            self.traces.append(current)
+
+    def get(self, trace_id: str) -> Optional[Trace]:
+        return next((t for t in self.traces if t.trace_id == trace_id), None)
+
+    def summaries(self) -> List[Dict[str, Any]]:
+        return [t.summary() for t in reversed(self.traces)]
+
+    def clear(self) -> None:
+        self.traces.clear()
+
+
+def _jsonable(value: Any) -> Any:
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    text = repr(value)
+    return text if len(text) <= 200 else text[:200] + "..."
+
+
+def to_chrome_trace(traces: Iterable[Trace]) -> Dict[str, Any]:
+    """Return traces as Chrome trace-event JSON, one process row per trace."""
+    events: List[Dict[str, Any]] = []
+    for pid, trace in enumerate(traces, start=1):
+        events.append({
+            "name": "process_name", "ph": "M", "pid": pid, "tid": 0,
+            "args": {"name": f"{trace.name} {trace.trace_id}"},
+        })
+        origin = trace.spans[0].start if trace.spans else 0.0
+        now = time.perf_counter()
+        for item in trace.spans:
+            end = item.end if item.end is not None else now
+            args = {k: _jsonable(v) for k, v in item.attrs.items()}
+            args["span_id"] = item.span_id
+            if item.parent_id:
+                args["parent_id"] = item.parent_id
+            events.append({
+                "name": item.name,
+                "cat": item.name.split(".", 1)[0],
+                "ph": "X",
+                "ts": round((item.start - origin) * 1e6, 3),
+                "dur": round((end - item.start) * 1e6, 3),
+                "pid": pid,
+                "tid": item.lane,
+                "args": args,
+            })
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+tracer = Tracer()
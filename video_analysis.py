@@ -0,0 +1,166 @@
+"""Frame-sampling video summaries computed with NumPy.
+
+Only ``budget`` frames are decoded per video: the capture seeks to evenly
+spaced frame indices, each frame is reduced to a few statistics right away
+and then dropped, so time and memory are bounded by the budget rather than
+the video length.
+"""
+
+from typing import Any, Dict, List
+
+import numpy as np
+
+HIST_SHIFT = 4
+HIST_BINS = 256 >> HIST_SHIFT
+THUMB_SIZE = 32
+# Seeking is slower than decoding a handful of frames in most containers.
+MAX_GRAB_GAP = 8
+_LUMA = np.array([0.114, 0.587, 0.299], dtype=np.float32)  # BGR order
+
+
+def probe_video(path: str) -> Dict[str, Any]:
+    """Return frame count, fps, size and duration without decoding frames."""
+    import cv2
+
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise ValueError("unable to open video")
+    try:
+        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        fps = float(cap.get(cv2.CAP_PROP_FPS)) or 0.0
+        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    finally:
+        cap.release()
+    return {
+        "frames": frame_count,
+        "fps": fps,
+        "width": width,
+        "height": height,
+        "duration": frame_count / fps if fps else 0.0,
+    }
+
+
+def sample_indices(frame_count: int, budget: int) -> List[int]:
+    """Return up to ``budget`` evenly spaced frame indices, starting at 0.
+
+    Streams that do not report a frame count are described by their first
+    frame only.
+    """
+    if budget <= 0:
+        return []
+    if frame_count <= 0:
+        return [0]
+    n = min(frame_count, budget)
+    step = frame_count / n
+    return [int(i * step) for i in range(n)]
+
+
+def frame_stats(frame: np.ndarray) -> Dict[str, Any]:
+    """Reduce one frame to its mean color, brightness, histogram and thumbnail."""
+    frame = np.asarray(frame)
+    if frame.ndim == 2:
+        frame = frame[..., None]
+    stride = max(1, max(frame.shape[:2]) // 128)
+    small = frame[::stride, ::stride]
+    pixels = small.reshape(-1, small.shape[2]).astype(np.float32)
+    luma = pixels @ _LUMA if pixels.shape[1] == 3 else pixels.mean(axis=1)
+    levels = np.clip(pixels, 0, 255).astype(np.uint8) >> HIST_SHIFT
+    hist = np.stack(
+        [np.bincount(levels[:, c], minlength=HIST_BINS) for c in range(pixels.shape[1])]
+    ).astype(np.float32) / len(pixels)
+    rows = np.linspace(0, small.shape[0] - 1, THUMB_SIZE).astype(int)
+    cols = np.linspace(0, small.shape[1] - 1, THUMB_SIZE).astype(int)
+    thumb = luma.reshape(small.shape[:2])[np.ix_(rows, cols)]
+    return {
+        "avg_color": pixels.mean(axis=0),
+        "brightness": float(luma.mean()),
+        "hist": hist,
+        "thumb": thumb,
+    }
+
+
+def read_sampled_frames(path: str, indices: List[int]) -> List[Dict[str, Any]]:
+    """Decode the frames at ascending ``indices`` and return their statistics.
+
+    Short gaps are skipped with ``grab()``; longer ones seek. Runs in worker
+    threads, each with its own capture, since OpenCV releases the GIL while
+    decoding.
+    """
+    import cv2
+
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise ValueError("unable to open video")
+    results = []
+    pos = 0
+    try:
+        for idx in indices:
+            gap = idx - pos
+            if gap < 0 or gap > MAX_GRAB_GAP:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, idx)
+            else:
+                for _ in range(gap):
+                    cap.grab()
+            ok, frame = cap.read()
+            pos = idx + 1
+            if not ok:
+                break
+            stats = frame_stats(frame)
+            stats["index"] = idx
+            results.append(stats)
+    finally:
+        cap.release()
+    return results
+
+
+def summarize(stats: List[Dict[str, Any]], fps: float, cut_threshold: float = 0.4) -> Dict[str, Any]:
+    """Combine per-frame statistics into a compact video summary.
+
+    A scene cut is reported between consecutive samples whose color
+    histograms differ by more than ``cut_threshold`` (half the L1 distance,
+    so 0 means identical and 1 disjoint). Times are in seconds when ``fps``
+    is known and frame indices otherwise.
+    """
+    if not stats:
+        raise ValueError("unable to read frame")
+    stats = sorted(stats, key=lambda s: s["index"])
+
+    def at(index: int) -> float:
+        return index / fps if fps else float(index)
+
+    colors = np.stack([s["avg_color"] for s in stats])
+    brightness = np.array([s["brightness"] for s in stats])
+    hists = np.stack([s["hist"] for s in stats])
+    thumbs = np.stack([s["thumb"] for s in stats])
+    if len(stats) > 1:
+        hist_dist = 0.5 * np.abs(np.diff(hists, axis=0)).sum(axis=2).mean(axis=1)
+        motion = np.abs(np.diff(thumbs, axis=0)).mean(axis=(1, 2)) / 255.0
+    else:
+        hist_dist = motion = np.zeros(0)
+
+    cuts = [i + 1 for i in np.flatnonzero(hist_dist > cut_threshold)]
+    bounds = [0] + cuts + [len(stats)]
+    scenes = [
+        {
+            "start": at(stats[lo]["index"]),
+            "end": at(stats[hi - 1]["index"]),
+            "avg_color": [float(x) for x in colors[lo:hi].mean(axis=0)],
+        }
+        for lo, hi in zip(bounds, bounds[1:])
+    ]
+    return {
+        "frames_sampled": len(stats),
+        "avg_color": [float(x) for x in colors.mean(axis=0)],
+        "brightness": {
+            "mean": float(brightness.mean()),
+            "min": float(brightness.min()),
+            "max": float(brightness.max()),
+        },
+        "motion": {
+            "mean": float(motion.mean()) if motion.size else 0.0,
+            "max": float(motion.max()) if motion.size else 0.0,
+        },
+        "scene_cuts": [at(stats[i]["index"]) for i in cuts],
+        "scenes": scenes,
+    }